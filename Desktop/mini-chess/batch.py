@@ -0,0 +1,144 @@
+# batch.py — analyse en masse de positions (une FEN ou une ligne EPD par ligne).
+# Lecture en flux : le fichier n'est jamais chargé en entier ; les lignes sont regroupées
+# en paquets distribués à un pool de processus (multiprocessing), avec un nombre borné
+# de paquets en vol. Pour chaque position : état (échec, mat, pat, ...), nombre de coups
+# légaux et perft optionnel, écrits en JSON (une ligne par position).
+#   python batch.py positions.epd -j 8 --perft 2 -o resultats.jsonl
+#   zcat gros.epd.gz | python batch.py - --unordered
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import List, Tuple, Optional, Iterable, Iterator, Dict, TextIO
+
+from chess_cli_v2 import (
+    State, state_from_fen, state_to_fen, state_from_epd, position_status, legal_move_table, perft,
+)
+
+Chunk = Tuple[int, List[str], int]      # (numéro de la première ligne, lignes, profondeur perft)
+
+def parse_line(line: str) -> Tuple[State, Dict[str, str]]:
+    """FEN complète (6 champs, compteurs numériques) ou EPD (4 champs + opérations)."""
+    fields = line.split()
+    if len(fields) == 6 and fields[4].isdigit() and fields[5].isdigit():
+        return state_from_fen(line), {}
+    return state_from_epd(line)
+
+def analyse_line(line: str, perft_depth: int=0) -> Dict:
+    st, ops = parse_line(line)
+    out: Dict = {"fen": state_to_fen(st), "status": position_status(st),
+                 "moves": sum(len(d) for d in legal_move_table(st).values())}
+    if "id" in ops: out["id"] = ops["id"]
+    if perft_depth > 0: out["perft"] = perft(st, perft_depth)
+    return out
+
+def worker_stats() -> Optional[Dict]:
+    """Compteurs d'instrument.py accumulés depuis le dernier appel (None si les mesures sont coupées)."""
+    instrument = sys.modules.get("instrument")
+    if instrument is None or not instrument.enabled(): return None
+    snap = instrument.snapshot()
+    instrument.reset()
+    return snap
+
+def enable_stats():
+    import instrument
+    instrument.enable()
+
+def analyse_chunk(chunk: Chunk) -> Tuple[List[str], int, Optional[Dict]]:
+    """Résultats JSON du paquet, nombre de lignes invalides et compteurs de mesure."""
+    start, lines, perft_depth = chunk
+    out = []
+    errors = 0
+    for n, line in enumerate(lines, start):
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        try:
+            res = {"line": n, **analyse_line(line, perft_depth)}
+        except (ValueError, KeyError, IndexError) as e:
+            res = {"line": n, "error": str(e)}
+            errors += 1
+        out.append(json.dumps(res, ensure_ascii=False))
+    return out, errors, worker_stats()
+
+def read_chunks(f: Iterable[str], size: int, perft_depth: int) -> Iterator[Chunk]:
+    lines: List[str] = []
+    start = 1
+    for n, line in enumerate(f, 1):
+        if not lines: start = n
+        lines.append(line)
+        if len(lines) >= size:
+            yield (start, lines, perft_depth)
+            lines = []
+    if lines: yield (start, lines, perft_depth)
+
+def bounded(chunks: Iterator[Chunk], slots: threading.Semaphore) -> Iterator[Chunk]:
+    # Le pool consomme son itérable d'entrée aussi vite qu'il peut : sans cette borne
+    # tout le fichier finirait dans la file des tâches
+    for c in chunks:
+        slots.acquire()
+        yield c
+
+def run(f: Iterable[str], out: TextIO, jobs: int, chunk_size: int=256, perft_depth: int=0,
+        ordered: bool=True, stats: Optional[Dict[str, List[int]]]=None) -> Tuple[int, int]:
+    """Analyse toutes les lignes de f ; rend (positions, erreurs). Avec stats (dict), les
+    fonctions des règles sont mesurées dans chaque processus et les compteurs y sont cumulés."""
+    chunks = read_chunks(f, chunk_size, perft_depth)
+    positions = errors = 0
+    def emit(res: Tuple[List[str], int, Optional[Dict]]):
+        nonlocal positions, errors
+        results, n_errors, snap = res
+        positions += len(results)
+        errors += n_errors
+        if snap is not None and stats is not None:
+            import instrument
+            instrument.merge(stats, snap)
+        if results: out.write("\n".join(results) + "\n")
+    if jobs <= 1:
+        if stats is not None: enable_stats()
+        for c in chunks: emit(analyse_chunk(c))
+        return positions, errors
+    slots = threading.Semaphore(4 * jobs)
+    with multiprocessing.Pool(jobs, initializer=enable_stats if stats is not None else None) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for res in imap(analyse_chunk, bounded(chunks, slots)):
+            slots.release()
+            emit(res)
+    return positions, errors
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="analyse en masse de positions FEN/EPD")
+    ap.add_argument("input", help="fichier FEN/EPD (une position par ligne), '-' pour l'entrée standard")
+    ap.add_argument("-o", "--output", default="-", help="fichier de sortie JSON lignes (défaut: sortie standard)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="processus (défaut: nombre de coeurs)")
+    ap.add_argument("--chunk", type=int, default=256, help="lignes par paquet envoyé à un processus")
+    ap.add_argument("--perft", type=int, default=0, metavar="N", help="compter aussi perft(N) pour chaque position")
+    ap.add_argument("--unordered", action="store_true", help="écrire les résultats dans l'ordre où ils arrivent")
+    ap.add_argument("--stats", metavar="FICHIER", help="mesurer les fonctions des règles, compteurs en JSON dans FICHIER")
+    args = ap.parse_args(argv)
+    stats: Optional[Dict[str, List[int]]] = {} if args.stats else None
+
+    fin = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        positions, errors = run(fin, fout, args.jobs, max(1, args.chunk), args.perft, not args.unordered, stats)
+    finally:
+        if fin is not sys.stdin: fin.close()
+        if fout is not sys.stdout: fout.close()
+    dt = time.perf_counter() - t0
+    if stats is not None:
+        import instrument
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump({"positions": positions, "seconds": dt, "jobs": args.jobs,
+                       "functions": {name: {"calls": c[0], "seconds": c[1] / 1e9, **({"items": c[2]} if c[2] else {})}
+                                     for name, c in stats.items() if c[0]}}, f, ensure_ascii=False, indent=2)
+        print(instrument.format_report(stats), file=sys.stderr)
+    print(f"{positions} positions ({errors} erreurs) en {dt:.2f}s, "
+          f"{positions/dt if dt > 0 else 0:.0f} positions/s, {args.jobs} processus", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# batch_status.py — état (échec, mat, pat, ...) de nombreuses positions à la fois, avec NumPy.
+# Les N positions sont rangées dans un tableau (N, 64) int8 (codes PIECE_CODE, case y*8+x) ;
+# chaque bitboard devient un vecteur (N,) uint64 et les attaques sont calculées pour toutes
+# les positions ensemble : décalages masqués pour pions, cavaliers et rois, remplissage
+# Kogge-Stone (décalage puis masque) pour les rayons des pièces glissantes.
+# Un coup légal existe si le roi a une case non attaquée (roi retiré du plateau), si une pièce
+# non clouée atteint une case qui pare l'échec, ou si une pièce glissante clouée peut glisser
+# le long du clouage. Le roque n'y change rien : il suppose une case voisine du roi libre et
+# sûre, donc déjà un coup de roi. Repli sur position_status pour les lignes rares sans coup
+# trouvé où une prise en passant ou un pion cloué pourraient en donner un.
+# NumPy est une dépendance optionnelle (requirements-optional.txt), importée au premier usage.
+#   python batch_status.py tests/data/status_corpus.epd   (comparaison à game_status et débits)
+#   python batch_status.py --random 20000
+from __future__ import annotations    # annotations np.* : NumPy n'est importé qu'à l'usage
+
+import argparse
+import random
+import sys
+import time
+from typing import List, Tuple, Optional, Sequence
+
+from chess_cli_v2 import (
+    State, PIECE_CODE, position_status, status_message, tablebase_status, repetition_count,
+    register_position, generate_legal_moves, apply_move, state_from_fen,
+)
+
+np = None      # module numpy, chargé par _numpy()
+
+def _numpy():
+    """Importe NumPy et construit les masques au premier appel ; message clair s'il manque."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("batch_status.py nécessite NumPy : pip install -r requirements-optional.txt") from None
+        np = numpy
+        _init_masks()
+    return np
+
+def _mask(pred) -> np.uint64:
+    return np.uint64(sum(1 << s for s in range(64) if pred(s // 8, s % 8)))
+
+def _init_masks():
+    global ZERO, ONE, FULL, NOT_A, NOT_H, NOT_AB, NOT_GH, RANK_3, RANK_6, ORTHO, DIAG
+    global SQUARE_BIT, KNIGHT_MASK, KING_MASK, _TO_CODES
+    ZERO, ONE, FULL = np.uint64(0), np.uint64(1), np.uint64(0xFFFFFFFFFFFFFFFF)
+    NOT_A, NOT_H = _mask(lambda y, x: x != 0), _mask(lambda y, x: x != 7)
+    NOT_AB, NOT_GH = _mask(lambda y, x: x > 1), _mask(lambda y, x: x < 6)
+    RANK_3, RANK_6 = _mask(lambda y, x: y == 5), _mask(lambda y, x: y == 2)    # après un premier pas
+    # Directions des rayons : (décalage, vers les indices croissants, masque contre le repli de colonne)
+    ORTHO = [(8, False, FULL), (8, True, FULL), (1, True, NOT_A), (1, False, NOT_H)]
+    DIAG = [(7, False, NOT_A), (9, False, NOT_H), (9, True, NOT_A), (7, True, NOT_H)]
+    SQUARE_BIT = ONE << np.arange(64, dtype=np.uint64)
+    KNIGHT_MASK = knight_attacks(SQUARE_BIT)
+    KING_MASK = king_attacks(SQUARE_BIT)
+    _TO_CODES = str.maketrans({p: chr(c) for p, c in PIECE_CODE.items()})
+
+def _shift(b: np.ndarray, n: int, up: bool) -> np.ndarray:
+    return b << np.uint64(n) if up else b >> np.uint64(n)
+
+def slide(gen: np.ndarray, empty: np.ndarray, d: Tuple[int, bool, np.uint64]) -> np.ndarray:
+    """Cases atteintes depuis gen dans la direction d, premier obstacle compris (Kogge-Stone)."""
+    n, up, mask = d
+    pro = empty & mask
+    gen = gen | (pro & _shift(gen, n, up)); pro = pro & _shift(pro, n, up)
+    gen = gen | (pro & _shift(gen, 2*n, up)); pro = pro & _shift(pro, 2*n, up)
+    gen = gen | (pro & _shift(gen, 4*n, up))
+    return _shift(gen, n, up) & mask
+
+def knight_attacks(b: np.ndarray) -> np.ndarray:
+    u = np.uint64
+    return ((b << u(17)) & NOT_A | (b << u(15)) & NOT_H | (b << u(10)) & NOT_AB | (b << u(6)) & NOT_GH |
+            (b >> u(17)) & NOT_H | (b >> u(15)) & NOT_A | (b >> u(10)) & NOT_GH | (b >> u(6)) & NOT_AB)
+
+def king_attacks(b: np.ndarray) -> np.ndarray:
+    side = b | (b << np.uint64(1)) & NOT_A | (b >> np.uint64(1)) & NOT_H
+    return (side | side << np.uint64(8) | side >> np.uint64(8)) & ~b
+
+def white_pawn_attacks(b: np.ndarray) -> np.ndarray:
+    return (b >> np.uint64(7)) & NOT_A | (b >> np.uint64(9)) & NOT_H
+
+def black_pawn_attacks(b: np.ndarray) -> np.ndarray:
+    return (b << np.uint64(9)) & NOT_A | (b << np.uint64(7)) & NOT_H
+
+def pack(states: Sequence[State]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(N, 64) int8 des pièces, trait aux blancs (N,) bool, case en passant (N,) int8 (-1 : aucune)."""
+    _numpy()
+    n = len(states)
+    raw = "".join("".join("".join(row) for row in st.board) for st in states).translate(_TO_CODES)
+    boards = np.frombuffer(raw.encode("latin-1"), dtype=np.int8).reshape(n, 64)
+    white = np.fromiter((st.turn == 'white' for st in states), dtype=bool, count=n)
+    ep = np.fromiter((-1 if st.en_passant is None else st.en_passant[0]*8 + st.en_passant[1] for st in states),
+                     dtype=np.int8, count=n)
+    return boards, white, ep
+
+def bitboards(boards: np.ndarray, code: int) -> np.ndarray:
+    """Bitboard (N,) uint64 des cases qui portent code (bit s = case s)."""
+    return np.packbits(boards == code, axis=1, bitorder="little").view("<u8").ravel()
+
+def analyse(boards: np.ndarray, white: np.ndarray, ep: Optional[np.ndarray]=None
+            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pour chaque ligne de boards (N, 64) int8 : (camp au trait en échec, a un coup légal,
+    à recalculer par position_status). Positions légales, un roi de chaque couleur.
+    """
+    _numpy()
+    n = len(boards)
+    bb = {p: bitboards(boards, c) for p, c in PIECE_CODE.items() if p != '.'}
+    def ours(p: str) -> Tuple[np.ndarray, np.ndarray]:
+        return np.where(white, bb[p], bb[p.lower()]), np.where(white, bb[p.lower()], bb[p])
+    (P, tP), (N, tN), (B, tB), (R, tR), (Q, tQ) = (ours(p) for p in "PNBRQ")
+    w = bb['P'] | bb['N'] | bb['B'] | bb['R'] | bb['Q'] | bb['K']
+    b = bb['p'] | bb['n'] | bb['b'] | bb['r'] | bb['q'] | bb['k']
+    us, them = np.where(white, w, b), np.where(white, b, w)
+    empty = ~(w | b)
+    king_code = np.where(white, PIECE_CODE['K'], PIECE_CODE['k']).astype(np.int8)[:, None]
+    ksq = np.argmax(boards == king_code, axis=1)
+    their_ksq = np.argmax(boards == (PIECE_CODE['K'] + PIECE_CODE['k'] - king_code), axis=1)
+    king = SQUARE_BIT[ksq]
+    t_ortho, t_diag = tR | tQ, tB | tQ
+
+    # Cases attaquées par l'adversaire, notre roi retiré : il ne peut pas fuir le long d'un rayon
+    empty_nk = empty | king
+    danger = np.where(white, black_pawn_attacks(tP), white_pawn_attacks(tP)) | knight_attacks(tN) | KING_MASK[their_ksq]
+    for d in ORTHO: danger |= slide(t_ortho, empty_nk, d)
+    for d in DIAG: danger |= slide(t_diag, empty_nk, d)
+    in_check = (danger & king) != ZERO
+
+    # Rayons depuis notre roi : pièces qui donnent échec, cases qui parent, pièces clouées
+    checkers = (np.where(white, white_pawn_attacks(king), black_pawn_attacks(king)) & tP) | (KNIGHT_MASK[ksq] & tN)
+    block = np.zeros(n, dtype=np.uint64)
+    pinned_ortho = np.zeros(n, dtype=np.uint64)
+    pinned_diag = np.zeros(n, dtype=np.uint64)
+    for dirs, sliders, pinned in ((ORTHO, t_ortho, pinned_ortho), (DIAG, t_diag, pinned_diag)):
+        for d in dirs:
+            ray = slide(king, empty, d)
+            hit = ray & sliders
+            checkers |= hit
+            block |= np.where(hit != ZERO, ray, ZERO)
+            first = ray & us
+            xray = slide(king, empty | first, d)
+            pinned |= np.where((first != ZERO) & ((xray & sliders) != ZERO), first, ZERO)
+    evasion = np.where(in_check, checkers | block, FULL)
+    double = (checkers & (checkers - ONE)) != ZERO
+
+    # Coups des pièces non clouées vers une case permise (hors échec double)
+    free = ~(pinned_ortho | pinned_diag)
+    targets = knight_attacks(N & free)
+    for d in ORTHO: targets |= slide((R | Q) & free, empty, d)
+    for d in DIAG: targets |= slide((B | Q) & free, empty, d)
+    targets &= ~us
+    fp = P & free
+    push_w = (fp >> np.uint64(8)) & empty
+    push_b = (fp << np.uint64(8)) & empty
+    targets |= np.where(white, push_w | ((push_w & RANK_3) >> np.uint64(8)) & empty,
+                        push_b | ((push_b & RANK_6) << np.uint64(8)) & empty)
+    targets |= np.where(white, white_pawn_attacks(fp), black_pawn_attacks(fp)) & them
+    # Hors échec, une tour/dame clouée sur une ligne (fou/dame sur une diagonale) peut au moins
+    # prendre la pièce qui la cloue ; en échec, une pièce clouée ne peut rien parer
+    pinned_slider = ((pinned_ortho & (R | Q)) | (pinned_diag & (B | Q))) != ZERO
+    has_moves = ((KING_MASK[ksq] & ~us & ~danger) != ZERO) \
+        | (((targets & evasion) != ZERO) & ~double) | (pinned_slider & ~in_check)
+
+    # Cas rares laissés au chemin scalaire : aucun coup trouvé mais pion cloué ou prise en passant
+    fallback = ~has_moves & ~in_check & (((pinned_ortho | pinned_diag) & P) != ZERO)
+    if ep is not None:
+        ep_bit = np.where(ep >= 0, SQUARE_BIT[np.maximum(ep, 0)], ZERO)
+        fallback |= ~has_moves & ((np.where(white, white_pawn_attacks(P), black_pawn_attacks(P)) & ep_bit) != ZERO)
+    return in_check, has_moves, fallback
+
+def batch_status(states: Sequence[State], chunk: int=1 << 16) -> List[str]:
+    """Même résultat que [position_status(st) for st in states], échec et coups calculés par lots."""
+    out: List[str] = []
+    for i in range(0, len(states), chunk):
+        part = states[i:i + chunk]
+        check, moves, fallback = (a.tolist() for a in analyse(*pack(part)))
+        for st, c, m, f in zip(part, check, moves, fallback):
+            if st.halfmove_clock >= 100: out.append("fifty")
+            elif repetition_count(st) >= 3: out.append("repetition")
+            elif f: out.append(position_status(st))
+            elif not m: out.append("checkmate" if c else "stalemate")
+            else: out.append(tablebase_status(st) or ("check" if c else "ok"))
+    return out
+
+def batch_game_status(states: Sequence[State]) -> List[Optional[str]]:
+    """Même résultat que [game_status(st) for st in states]."""
+    return [status_message(st, s) for st, s in zip(states, batch_status(states))]
+
+def random_corpus(games: int, plies: int, seed: int=1) -> List[State]:
+    """Positions de parties aléatoires (toutes les positions de chaque partie, mats et pats compris)."""
+    from bench_perft import POSITIONS
+    rng = random.Random(seed)
+    out: List[State] = []
+    starts = [fen for _, fen, _ in POSITIONS]
+    for g in range(games):
+        st = state_from_fen(starts[g % len(starts)])
+        register_position(st)
+        for _ in range(plies):
+            out.append(st.clone())
+            moves = generate_legal_moves(st)
+            if not moves: break
+            a, b, promo = rng.choice(moves)
+            apply_move(st, a, b, promotion_choice=promo)
+    return out
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="état de positions par lots NumPy, comparé à game_status")
+    ap.add_argument("input", nargs="?", help="fichier FEN/EPD (une position par ligne)")
+    ap.add_argument("--random", type=int, default=0, metavar="N", help="ajouter les positions de N parties aléatoires")
+    ap.add_argument("--plies", type=int, default=200, help="demi-coups au plus par partie aléatoire")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    try:
+        _numpy()
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        return 2
+    states: List[State] = []
+    if args.input:
+        from batch import parse_line
+        with open(args.input, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'): continue
+                try: states.append(parse_line(line)[0])
+                except (ValueError, KeyError, IndexError): pass
+    if args.random or not states: states += random_corpus(args.random or 200, args.plies, args.seed)
+    for st in states: st.move_cache = None
+
+    t0 = time.perf_counter()
+    from chess_cli_v2 import game_status
+    expected = [game_status(st) for st in states]
+    scalar = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = batch_game_status(states)
+    vector = time.perf_counter() - t0
+
+    fallback = int(analyse(*pack(states))[2].sum())
+    mismatches = [i for i, (e, g) in enumerate(zip(expected, got)) if e != g]
+    n = len(states)
+    print(f"{n} positions, {fallback} repli(s) sur le chemin scalaire")
+    print(f"  game_status (boucle) : {scalar:.2f}s  {n/scalar:.0f} positions/s")
+    print(f"  batch_game_status    : {vector:.2f}s  {n/vector:.0f} positions/s  (x{scalar/vector:.1f})")
+    for i in mismatches[:10]:
+        from chess_cli_v2 import state_to_fen
+        print(f"  différence : {state_to_fen(states[i])} : {expected[i]!r} / {got[i]!r}")
+    print(f"  {len(mismatches)} différence(s)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# bench_memory.py — mémoire occupée par les parties : octets par partie vivante et par clone.
+# Mesure avec tracemalloc l'allocation nette de N parties gardées en mémoire (comme un serveur
+# qui héberge N parties), après quelques demi-coups aléatoires, puis celle de N clones.
+#   python bench_memory.py -n 2000 --plies 40
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from typing import List, Callable, Optional
+
+from chess_cli_v2 import State, Move, register_position, apply_move, generate_legal_moves
+import board_array
+
+def new_game() -> State:
+    st = State()
+    register_position(st)
+    return st
+
+def random_moves(seed: int, plies: int) -> List[Move]:
+    rng = random.Random(seed)
+    st = new_game()
+    moves: List[Move] = []
+    for _ in range(plies):
+        legal = generate_legal_moves(st)
+        if not legal: break
+        m = rng.choice(legal)
+        apply_move(st, m[0], m[1], promotion_choice=m[2])
+        moves.append(m)
+    return moves
+
+def played_game(moves: List[Move]) -> State:
+    st = new_game()
+    for a, b, promo in moves: apply_move(st, a, b, promotion_choice=promo)
+    return st
+
+def bytes_per_object(make: Callable[[int], object], n: int) -> float:
+    """Octets alloués (nets) par objet gardé vivant, sur n objets."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    objs = [make(i) for i in range(n)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del objs
+    return used / n
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="octets par partie vivante et par clone")
+    ap.add_argument("-n", type=int, default=2000, help="parties gardées en mémoire")
+    ap.add_argument("--plies", type=int, default=40, help="demi-coups joués dans chaque partie")
+    args = ap.parse_args(argv)
+
+    # Coups tirés hors mesure : seules les parties rejouées sont comptées
+    lines = [random_moves(i, args.plies) for i in range(args.n)]
+    games = [played_game(moves) for moves in lines]
+    rows = [
+        ("nouvelle partie", bytes_per_object(lambda i: new_game(), args.n)),
+        (f"partie après {args.plies} demi-coups", bytes_per_object(lambda i: played_game(lines[i]), args.n)),
+        ("clone d'une partie", bytes_per_object(lambda i: games[i].clone(), args.n)),
+        ("ArrayState (board_array)", bytes_per_object(lambda i: board_array.from_state(games[i]), args.n)),
+    ]
+    print(f"{'':<32}{'octets/partie':>14}")
+    for name, b in rows: print(f"{name:<32}{b:>14.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# bench_perft.py — vérification et mesure du générateur de coups.
+# Compte les noeuds perft sur les positions de référence (startpos, Kiwipete, ...)
+# et compare aux valeurs connues ; affiche les noeuds/s de chaque plateau côte à côte.
+#   python bench_perft.py               (profondeur 3 partout, tous les plateaux)
+#   python bench_perft.py -d 4 -p kiwipete -b array
+#   python bench_perft.py -d 4 -b bitboard --jobs 1,2,4,8   (efficacité du perft réparti)
+import argparse
+import sys
+import time
+from typing import List, Tuple, Dict, Callable
+
+from chess_cli_v2 import state_from_fen, perft, divide
+import board_array
+import bitboard
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# (nom, FEN, noeuds attendus à la profondeur 1, 2, 3, ...)
+POSITIONS: List[Tuple[str, str, List[int]]] = [
+    ("startpos", START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("endgame-ep", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("castle-promo", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("promo-check", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# Backends de plateau : nom -> (position depuis FEN, perft, divide)
+BACKENDS: Dict[str, Tuple[Callable, Callable, Callable]] = {
+    "list": (state_from_fen, perft, divide),
+    "array": (board_array.from_fen, board_array.perft, board_array.divide),
+    "bitboard": (bitboard.from_fen, bitboard.perft, bitboard.divide),
+}
+
+def run(backend: str, fen: str, depth: int, show_divide: bool) -> Tuple[int, float]:
+    load, perft_fn, divide_fn = BACKENDS[backend]
+    pos = load(fen)
+    t0 = time.perf_counter()
+    if show_divide:
+        counts = divide_fn(pos, depth)
+        nodes = sum(counts.values())
+    else:
+        nodes = perft_fn(pos, depth)
+    dt = time.perf_counter() - t0
+    if show_divide:
+        print(f"  [{backend}]")
+        for mv in sorted(counts): print(f"    {mv}: {counts[mv]}")
+    return nodes, dt
+
+def scaling(selected, depth: int, backend: str, jobs_list: List[int]) -> int:
+    """Temps du perft réparti pour chaque nombre de processus ; efficacité = t(1) / (N * t(N))."""
+    import parallel
+    failures = 0
+    times: Dict[int, float] = {}
+    print(f"{'position':<14}{'prof':>5}" + "".join(f"{str(j) + ' proc':>10}{'eff':>6}" for j in jobs_list))
+    results = {name: {} for name, _, _ in selected}
+    for jobs in jobs_list:
+        with parallel.start_pool(jobs) as ex:
+            for name, fen, expected in selected:
+                d = min(depth, len(expected))
+                t0 = time.perf_counter()
+                nodes = parallel.parallel_perft(fen, d, ex, jobs, backend)
+                results[name][jobs] = time.perf_counter() - t0
+                if nodes != expected[d-1]:
+                    failures += 1
+                    print(f"ÉCHEC {name} {jobs} processus : {nodes} au lieu de {expected[d-1]}")
+    for name, fen, expected in selected:
+        base = results[name][jobs_list[0]] * jobs_list[0]
+        print(f"{name:<14}{min(depth, len(expected)):>5}" +
+              "".join(f"{results[name][j]:>9.2f}s{base / (j * results[name][j]):>6.0%}" for j in jobs_list))
+        for j in jobs_list: times[j] = times.get(j, 0.0) + results[name][j]
+    base = times[jobs_list[0]] * jobs_list[0]
+    print(f"{'total':<14}{'':>5}" + "".join(f"{times[j]:>9.2f}s{base / (j * times[j]):>6.0%}" for j in jobs_list))
+    return 1 if failures else 0
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="perft sur les positions de référence")
+    ap.add_argument("-d", "--depth", type=int, default=3, help="profondeur (défaut 3)")
+    ap.add_argument("-p", "--position", action="append", help="restreindre à ces positions (nom)")
+    ap.add_argument("-b", "--backend", choices=sorted(BACKENDS) + ["all"], default="all",
+                    help="plateau à mesurer (défaut: tous, côte à côte)")
+    ap.add_argument("--divide", action="store_true", help="afficher le détail par coup racine")
+    ap.add_argument("-j", "--jobs", default=None, metavar="N[,N...]",
+                    help="perft réparti sur N processus ; plusieurs valeurs (ex. 1,2,4,8) : tableau d'efficacité")
+    args = ap.parse_args(argv)
+
+    selected = [p for p in POSITIONS if not args.position or p[0] in args.position]
+    if not selected:
+        print("Aucune position :", ", ".join(args.position)); return 2
+    backends = list(BACKENDS) if args.backend == "all" else [args.backend]
+    if args.jobs:
+        return scaling(selected, args.depth, "list" if args.backend == "all" else args.backend,
+                       [int(j) for j in args.jobs.split(',')])
+
+    failures = 0
+    totals = {b: [0, 0.0] for b in backends}
+    print(f"{'position':<14}{'prof':>5}{'attendu':>12}" + "".join(f"{b + ' n/s':>14}{'temps':>9}" for b in backends))
+    for name, fen, expected in selected:
+        depth = min(args.depth, len(expected))
+        line = f"{name:<14}{depth:>5}{expected[depth-1]:>12}"
+        bad = []
+        for b in backends:
+            nodes, dt = run(b, fen, depth, args.divide)
+            if nodes != expected[depth-1]:
+                failures += 1
+                bad.append(f"{b}={nodes}")
+            totals[b][0] += nodes
+            totals[b][1] += dt
+            line += f"{nodes/dt:>14.0f}{dt:>8.2f}s"
+        print(line + ("  ÉCHEC " + " ".join(bad) if bad else ""))
+    print(f"{'total':<14}{'':>5}{'':>12}" + "".join(f"{n/t:>14.0f}{t:>8.2f}s" for n, t in totals.values()))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+# bitboard.py — moteur d'attaques et de génération de coups sur bitboards.
+# Douze entiers 64 bits par position (un par type de pièce et couleur), tables
+# précalculées d'attaques cavalier/roi/pion et rayons pour les pièces glissantes
+# (premier bloqueur trouvé par bit de poids faible/fort). Mêmes règles que State :
+# roque (ni échec ni case traversée attaquée), en passant, promotion q/r/b/n.
+# Case s = y*8 + x (a8 = 0, h1 = 63), comme les clés Zobrist de chess_cli_v2.
+#
+# Les tables sont construites à l'import (de l'ordre d'une milliseconde) : pas de cache disque.
+#   python bitboard.py            (coût de construction des tables + perft)
+import sys
+import time
+from typing import List, Tuple, Optional, Dict
+
+from chess_cli_v2 import (
+    Board, Move, State, ZOBRIST_PIECE, ZOBRIST_BLACK, ZOBRIST_CASTLING, ZOBRIST_EP,
+    state_from_fen, move_to_alg, sync_state,
+)
+
+PIECES = "PNBRQKpnbrqk"                # indice de bitboard -> lettre
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
+FULL = (1 << 64) - 1
+WK, WQ, BK, BQ = 1, 2, 4, 8             # droits de roque, comme board_array
+
+# Directions (dy, dx) ; POSITIVE : l'indice de case augmente le long du rayon
+DIRS: List[Tuple[int,int]] = [(-1,0),(1,0),(0,-1),(0,1),(-1,-1),(-1,1),(1,-1),(1,1)]
+POSITIVE = [dy*8 + dx > 0 for dy, dx in DIRS]
+ORTHO = (0, 1, 2, 3)
+DIAG = (4, 5, 6, 7)
+
+def build_tables() -> Dict[str, list]:
+    def bit(y:int, x:int) -> int: return 1 << (y*8 + x) if 0 <= y < 8 and 0 <= x < 8 else 0
+    knight = [0]*64
+    king = [0]*64
+    pawn = [[0]*64, [0]*64]             # cases attaquées par un pion blanc / noir posé en s
+    rays = [[0]*64 for _ in DIRS]
+    for y in range(8):
+        for x in range(8):
+            s = y*8 + x
+            for dy, dx in [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]:
+                knight[s] |= bit(y+dy, x+dx)
+            for dy, dx in DIRS:
+                king[s] |= bit(y+dy, x+dx)
+            pawn[WHITE][s] = bit(y-1, x-1) | bit(y-1, x+1)
+            pawn[BLACK][s] = bit(y+1, x-1) | bit(y+1, x+1)
+            for d, (dy, dx) in enumerate(DIRS):
+                yy, xx = y+dy, x+dx
+                while 0 <= yy < 8 and 0 <= xx < 8:
+                    rays[d][s] |= bit(yy, xx)
+                    yy += dy; xx += dx
+    return {"knight": knight, "king": king, "pawn": pawn, "rays": rays}
+
+_t0 = time.perf_counter()
+_TABLES = build_tables()
+TABLES_SECONDS = time.perf_counter() - _t0     # coût à l'import (~1 ms)
+KNIGHT_ATTACKS: List[int] = _TABLES["knight"]
+KING_ATTACKS: List[int] = _TABLES["king"]
+PAWN_ATTACKS: List[List[int]] = _TABLES["pawn"]
+RAYS: List[List[int]] = _TABLES["rays"]
+
+# Cases à vérifier pour le roque : (droit, case roi, cases vides, cases non attaquées, arrivée)
+_CASTLES = {
+    WHITE: [(WK, 60, (1<<61)|(1<<62), (60, 61, 62), 62), (WQ, 60, (1<<57)|(1<<58)|(1<<59), (60, 59, 58), 58)],
+    BLACK: [(BK, 4, (1<<5)|(1<<6), (4, 5, 6), 6), (BQ, 4, (1<<1)|(1<<2)|(1<<3), (4, 3, 2), 2)],
+}
+_ROOK_HOP = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+CASTLE_MASK = [15]*64
+CASTLE_MASK[63] = 15 & ~WK; CASTLE_MASK[56] = 15 & ~WQ; CASTLE_MASK[7] = 15 & ~BK; CASTLE_MASK[0] = 15 & ~BQ
+CASTLE_MASK[60] = 15 & ~(WK|WQ); CASTLE_MASK[4] = 15 & ~(BK|BQ)
+RANK_3, RANK_6 = 0xFF << 40, 0xFF << 16     # cases d'arrivée d'un premier pas (pour le double pas)
+LAST_RANK = (0xFF, 0xFF << 56)              # rangée de promotion blanche / noire
+PROMOS = ((QUEEN, 'q'), (ROOK, 'r'), (BISHOP, 'b'), (KNIGHT, 'n'))
+
+class BitPosition:
+    def __init__(self):
+        self.bb: List[int] = [0]*12     # indice PIECES
+        self.occ: List[int] = [0, 0]    # occupation blanche / noire
+        self.side: int = WHITE
+        self.castling: int = WK | WQ | BK | BQ
+        self.ep: int = -1               # case en passant ou -1
+        self.halfmove_clock: int = 0
+        self.fullmove_number: int = 1
+        self.hash: int = 0
+
+def from_state(st: State) -> BitPosition:
+    pos = BitPosition()
+    for y in range(8):
+        for x in range(8):
+            p = st.board[y][x]
+            if p != '.':
+                i = PIECES.index(p)
+                pos.bb[i] |= 1 << (y*8 + x)
+                pos.occ[i // 6] |= 1 << (y*8 + x)
+    pos.side = WHITE if st.turn == 'white' else BLACK
+    pos.castling = (WK if st.wkc else 0) | (WQ if st.wqc else 0) | (BK if st.bkc else 0) | (BQ if st.bqc else 0)
+    pos.ep = -1 if st.en_passant is None else st.en_passant[0]*8 + st.en_passant[1]
+    pos.halfmove_clock = st.halfmove_clock
+    pos.fullmove_number = st.fullmove_number
+    pos.hash = st.hash
+    return pos
+
+def board_view(pos: BitPosition) -> Board:
+    board = [['.']*8 for _ in range(8)]
+    for i, p in enumerate(PIECES):
+        bb = pos.bb[i]
+        while bb:
+            low = bb & -bb
+            s = low.bit_length() - 1
+            board[s >> 3][s & 7] = p
+            bb ^= low
+    return board
+
+def to_state(pos: BitPosition) -> State:
+    st = State()
+    st.board = board_view(pos)
+    st.turn = 'white' if pos.side == WHITE else 'black'
+    st.wkc, st.wqc, st.bkc, st.bqc = bool(pos.castling & WK), bool(pos.castling & WQ), bool(pos.castling & BK), bool(pos.castling & BQ)
+    st.en_passant = None if pos.ep < 0 else (pos.ep >> 3, pos.ep & 7)
+    st.halfmove_clock = pos.halfmove_clock
+    st.fullmove_number = pos.fullmove_number
+    sync_state(st)
+    return st
+
+def from_fen(fen: str) -> BitPosition:
+    return from_state(state_from_fen(fen))
+
+def slider_attacks(s: int, occ: int, dirs: Tuple[int, ...]) -> int:
+    att = 0
+    for d in dirs:
+        ray = RAYS[d][s]
+        blockers = ray & occ
+        if blockers:
+            b = (blockers & -blockers).bit_length() - 1 if POSITIVE[d] else blockers.bit_length() - 1
+            ray ^= RAYS[d][b]
+        att |= ray
+    return att
+
+def attacked(pos: BitPosition, s: int, by: int) -> bool:
+    """La case s est-elle attaquée par le camp by (WHITE/BLACK) ?"""
+    bb = pos.bb
+    o = by * 6
+    if PAWN_ATTACKS[by ^ 1][s] & bb[o + PAWN]: return True
+    if KNIGHT_ATTACKS[s] & bb[o + KNIGHT]: return True
+    if KING_ATTACKS[s] & bb[o + KING]: return True
+    occ = pos.occ[0] | pos.occ[1]
+    queens = bb[o + QUEEN]
+    if slider_attacks(s, occ, DIAG) & (bb[o + BISHOP] | queens): return True
+    if slider_attacks(s, occ, ORTHO) & (bb[o + ROOK] | queens): return True
+    return False
+
+def square_attacked_by(pos: BitPosition, y:int, x:int, attacker_color:str) -> bool:
+    return attacked(pos, y*8 + x, WHITE if attacker_color == 'white' else BLACK)
+
+def in_check(pos: BitPosition, color: str) -> bool:
+    side = WHITE if color == 'white' else BLACK
+    king = pos.bb[side*6 + KING]
+    return bool(king) and attacked(pos, king.bit_length() - 1, side ^ 1)
+
+# Coup interne : (départ, arrivée, type de promotion ou -1)
+BMove = Tuple[int, int, int]
+
+def pseudo_moves(pos: BitPosition) -> List[BMove]:
+    side = pos.side
+    o = side * 6
+    bb = pos.bb
+    own, enemy = pos.occ[side], pos.occ[side ^ 1]
+    occ = own | enemy
+    empty = ~occ & FULL
+    moves: List[BMove] = []
+    add = moves.append
+
+    # Pions : poussées en masse, prises par table (en passant comprise)
+    pawns = bb[o + PAWN]
+    last = LAST_RANK[side]
+    if side == WHITE:
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_3) >> 8) & empty
+        step = 8
+    else:
+        single = (pawns << 8) & empty
+        double = ((single & RANK_6) << 8) & empty
+        step = -8
+    targets_ep = enemy | (1 << pos.ep if pos.ep >= 0 else 0)
+    pushes = [(single, step), (double, 2*step)]
+    for dests, back in pushes:
+        while dests:
+            low = dests & -dests
+            t = low.bit_length() - 1
+            if low & last:
+                for pr, _ in PROMOS: add((t + back, t, pr))
+            else:
+                add((t + back, t, -1))
+            dests ^= low
+    p = pawns
+    while p:
+        low = p & -p
+        s = low.bit_length() - 1
+        caps = PAWN_ATTACKS[side][s] & targets_ep
+        while caps:
+            c = caps & -caps
+            t = c.bit_length() - 1
+            if c & last:
+                for pr, _ in PROMOS: add((s, t, pr))
+            else:
+                add((s, t, -1))
+            caps ^= c
+        p ^= low
+
+    not_own = ~own & FULL
+    for kind in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        pieces = bb[o + kind]
+        while pieces:
+            low = pieces & -pieces
+            s = low.bit_length() - 1
+            if kind == KNIGHT: att = KNIGHT_ATTACKS[s]
+            elif kind == KING: att = KING_ATTACKS[s]
+            elif kind == BISHOP: att = slider_attacks(s, occ, DIAG)
+            elif kind == ROOK: att = slider_attacks(s, occ, ORTHO)
+            else: att = slider_attacks(s, occ, DIAG) | slider_attacks(s, occ, ORTHO)
+            att &= not_own
+            while att:
+                a = att & -att
+                add((s, a.bit_length() - 1, -1))
+                att ^= a
+            pieces ^= low
+
+    # Roque : droit, roi et tour en place, cases libres, aucune case du roi attaquée
+    king = bb[o + KING]
+    rooks = bb[o + ROOK]
+    for right, ks, between, safe, dest in _CASTLES[side]:
+        if pos.castling & right and king >> ks & 1 and rooks >> _ROOK_HOP[dest][0] & 1 and not occ & between \
+           and not any(attacked(pos, c, side ^ 1) for c in safe):
+            add((ks, dest, -1))
+    return moves
+
+def make_move(pos: BitPosition, m: BMove) -> tuple:
+    """Joue m sur place ; renvoie de quoi restaurer la position (unmake_move)."""
+    s, t, promo = m
+    bb = pos.bb
+    side = pos.side
+    o = side * 6
+    undo = (bb[:], pos.occ[:], pos.castling, pos.ep, pos.halfmove_clock, pos.fullmove_number, pos.hash)
+    sbit, tbit = 1 << s, 1 << t
+    i = o
+    while not bb[i] & sbit: i += 1
+    h = pos.hash ^ ZOBRIST_CASTLING[pos.castling] ^ ZOBRIST_PIECE[PIECES[i]][s]
+    if pos.ep >= 0: h ^= ZOBRIST_EP[pos.ep & 7]
+    capture = False
+    if pos.occ[side ^ 1] & tbit:
+        j = 6 - o
+        while not bb[j] & tbit: j += 1
+        bb[j] ^= tbit
+        pos.occ[side ^ 1] ^= tbit
+        h ^= ZOBRIST_PIECE[PIECES[j]][t]
+        capture = True
+    bb[i] ^= sbit
+    pos.occ[side] ^= sbit | tbit
+    kind = i - o
+    new_ep = -1
+    if kind == PAWN:
+        if t == pos.ep:
+            c = t + 8 if side == WHITE else t - 8        # pion pris en passant
+            bb[6 - o + PAWN] ^= 1 << c
+            pos.occ[side ^ 1] ^= 1 << c
+            h ^= ZOBRIST_PIECE[PIECES[6 - o + PAWN]][c]
+            capture = True
+        elif t - s == 16 or s - t == 16:
+            new_ep = (s + t) >> 1
+        if promo >= 0:
+            i = o + promo
+    elif kind == KING and (t - s == 2 or s - t == 2):
+        rf, rt = _ROOK_HOP[t]
+        bb[o + ROOK] ^= (1 << rf) | (1 << rt)
+        pos.occ[side] ^= (1 << rf) | (1 << rt)
+        h ^= ZOBRIST_PIECE[PIECES[o + ROOK]][rf] ^ ZOBRIST_PIECE[PIECES[o + ROOK]][rt]
+    bb[i] |= tbit
+    if kind == KING: pos.castling &= ~(WK | WQ) if side == WHITE else ~(BK | BQ)
+    pos.castling &= CASTLE_MASK[s] & CASTLE_MASK[t]
+    pos.ep = new_ep
+    h ^= ZOBRIST_PIECE[PIECES[i]][t] ^ ZOBRIST_CASTLING[pos.castling] ^ ZOBRIST_BLACK
+    if new_ep >= 0: h ^= ZOBRIST_EP[new_ep & 7]
+    pos.hash = h
+    pos.halfmove_clock = 0 if capture or kind == PAWN else pos.halfmove_clock + 1
+    pos.side ^= 1
+    if pos.side == WHITE: pos.fullmove_number += 1
+    return undo
+
+def unmake_move(pos: BitPosition, u: tuple):
+    pos.bb, pos.occ, pos.castling, pos.ep, pos.halfmove_clock, pos.fullmove_number, pos.hash = u
+    pos.side ^= 1
+
+def legal_moves(pos: BitPosition) -> List[BMove]:
+    side = pos.side
+    king_index = side*6 + KING
+    k = pos.bb[king_index].bit_length() - 1
+    # Hors échec, une pièce qui ne « voit » pas son roi par un rayon ne peut pas le découvrir :
+    # ses coups sont légaux sans les jouer (sauf en passant, qui retire aussi le pion pris).
+    if attacked(pos, k, side ^ 1):
+        exposed = FULL
+    else:
+        occ = pos.occ[0] | pos.occ[1]
+        exposed = (slider_attacks(k, occ, DIAG) | slider_attacks(k, occ, ORTHO)) | (1 << k)
+    out: List[BMove] = []
+    for m in pseudo_moves(pos):
+        if not exposed >> m[0] & 1 and m[1] != pos.ep:
+            out.append(m)
+            continue
+        u = make_move(pos, m)
+        if not attacked(pos, pos.bb[king_index].bit_length() - 1, side ^ 1):
+            out.append(m)
+        unmake_move(pos, u)
+    return out
+
+def to_move(m: BMove) -> Move:
+    s, t, promo = m
+    return (s >> 3, s & 7), (t >> 3, t & 7), "pnbrqk"[promo] if promo >= 0 else None
+
+def generate_legal_moves(pos: BitPosition) -> List[Move]:
+    return [to_move(m) for m in legal_moves(pos)]
+
+def has_legal_moves(pos: BitPosition, color: str) -> bool:
+    side = WHITE if color == 'white' else BLACK
+    saved = pos.side
+    pos.side = side
+    try:
+        for m in pseudo_moves(pos):
+            u = make_move(pos, m)
+            ok = not attacked(pos, pos.bb[side*6 + KING].bit_length() - 1, side ^ 1)
+            unmake_move(pos, u)
+            if ok: return True
+        return False
+    finally:
+        pos.side = saved
+
+def perft(pos: BitPosition, depth: int) -> int:
+    if depth <= 0: return 1
+    moves = legal_moves(pos)
+    if depth == 1: return len(moves)
+    nodes = 0
+    for m in moves:
+        u = make_move(pos, m)
+        nodes += perft(pos, depth-1)
+        unmake_move(pos, u)
+    return nodes
+
+def divide(pos: BitPosition, depth: int) -> Dict[str,int]:
+    counts: Dict[str,int] = {}
+    for m in legal_moves(pos):
+        u = make_move(pos, m)
+        counts[move_to_alg(to_move(m))] = perft(pos, depth-1)
+        unmake_move(pos, u)
+    return counts
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="coût de construction des tables bitboard et perft")
+    ap.add_argument("-d", "--depth", type=int, default=3)
+    ap.add_argument("--fen", default="r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter(); build_tables(); built = time.perf_counter() - t0
+    print(f"tables : {TABLES_SECONDS*1000:.2f} ms à l'import, {built*1000:.2f} ms reconstruites")
+    pos = from_fen(args.fen)
+    t0 = time.perf_counter()
+    nodes = perft(pos, args.depth)
+    dt = time.perf_counter() - t0
+    print(f"perft({args.depth}) = {nodes}  ({dt:.2f}s, {nodes/dt:.0f} noeuds/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
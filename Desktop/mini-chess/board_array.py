@@ -0,0 +1,337 @@
+# board_array.py — plateau compact pour le moteur de règles.
+# Tableau 10x12 (bytearray de 120 cases) avec codes entiers de pièces et cases
+# sentinelles hors plateau : un rayon s'arrête sur la bordure sans test de limites.
+# Mêmes règles que chess_cli_v2 (roque, en passant, promotion, compteurs, hash) ;
+# le plateau liste-de-listes reste la vue d'import/export (board_view, to_state).
+# Sert au perft (commande perft N array, bench_perft.py) et à l'analyse sur une copie de la
+# position : la partie elle-même (game_loop, engine, server) se joue sur le plateau liste.
+from typing import List, Tuple, Optional, Dict
+from array import array
+
+from chess_cli_v2 import (
+    Board, Square, Move, State, ZOBRIST_PIECE, ZOBRIST_BLACK, ZOBRIST_CASTLING, ZOBRIST_EP,
+    state_from_fen, sync_state, zobrist_hash,
+)
+import chess_cli_v2
+
+# Codes de pièces : type | couleur (BLACK = 8), OFF pour la bordure
+EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 0, 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 0, 8
+OFF = 0x40
+
+CHAR_TO_CODE: Dict[str, int] = {'.': EMPTY}
+for _t, _c in zip((PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING), "PNBRQK"):
+    CHAR_TO_CODE[_c] = _t
+    CHAR_TO_CODE[_c.lower()] = _t | BLACK
+CODE_TO_CHAR: Dict[int, str] = {v: k for k, v in CHAR_TO_CODE.items()}
+PROMO_CODE: Dict[str, int] = {'q': QUEEN, 'r': ROOK, 'b': BISHOP, 'n': KNIGHT}
+PROMO_CHAR: Dict[int, str] = {v: k for k, v in PROMO_CODE.items()}
+
+# Case 10x12 <-> (y, x) ; la rangée 8 (y=0) commence à l'indice 21
+def sq120(y:int, x:int) -> int: return 21 + y*10 + x
+def sq_yx(s:int) -> Square: return (s - 21)//10, (s - 21) % 10
+SQ64 = [-1]*120   # case 10x12 -> y*8+x (index Zobrist)
+for _y in range(8):
+    for _x in range(8):
+        SQ64[sq120(_y, _x)] = _y*8 + _x
+ZP: List[List[int]] = [[0]*120 for _ in range(16)]   # clés Zobrist par code et case 10x12
+for _ch, _code in CHAR_TO_CODE.items():
+    if _code == EMPTY: continue
+    for _s in range(120):
+        if SQ64[_s] >= 0: ZP[_code][_s] = ZOBRIST_PIECE[_ch][SQ64[_s]]
+
+N_, S_ = -10, 10
+KNIGHT_DIRS = (-21, -19, -12, -8, 8, 12, 19, 21)
+KING_DIRS = (-11, -10, -9, -1, 1, 9, 10, 11)
+DIAG_DIRS = (-11, -9, 9, 11)
+ORTHO_DIRS = (-10, -1, 1, 10)
+
+# Droits de roque (bits) : 1=K, 2=Q, 4=k, 8=q ; masque appliqué aux cases de départ/arrivée
+WK, WQ, BK, BQ = 1, 2, 4, 8
+CASTLE_MASK = [15]*120
+CASTLE_MASK[sq120(7,7)] = 15 & ~WK; CASTLE_MASK[sq120(7,0)] = 15 & ~WQ
+CASTLE_MASK[sq120(0,7)] = 15 & ~BK; CASTLE_MASK[sq120(0,0)] = 15 & ~BQ
+E1, E8 = sq120(7,4), sq120(0,4)
+
+# Coup interne : (départ, arrivée, code de promotion ou 0) en cases 10x12
+AMove = Tuple[int, int, int]
+
+class ArrayState:
+    def __init__(self):
+        self.sq = bytearray([OFF]*120)
+        self.side: int = WHITE              # WHITE (0) ou BLACK (8)
+        self.castling: int = WK | WQ | BK | BQ
+        self.ep: int = 0                    # case en passant (10x12) ou 0
+        self.halfmove_clock: int = 0
+        self.fullmove_number: int = 1
+        self.kings: List[int] = [E1, E8]    # [blanc, noir]
+        self.hash: int = 0
+        self.history: array = array('Q')
+
+def from_state(st: State) -> ArrayState:
+    a = ArrayState()
+    for y in range(8):
+        for x in range(8):
+            code = CHAR_TO_CODE[st.board[y][x]]
+            a.sq[sq120(y,x)] = code
+            if code & 7 == KING: a.kings[code >> 3] = sq120(y,x)
+    a.side = WHITE if st.turn == 'white' else BLACK
+    a.castling = (WK if st.wkc else 0) | (WQ if st.wqc else 0) | (BK if st.bkc else 0) | (BQ if st.bqc else 0)
+    a.ep = 0 if st.en_passant is None else sq120(*st.en_passant)
+    a.halfmove_clock = st.halfmove_clock
+    a.fullmove_number = st.fullmove_number
+    a.hash = st.hash
+    a.history = st.history[:]
+    return a
+
+def board_view(a: ArrayState) -> Board:
+    """Vue liste-de-listes (export) du plateau."""
+    return [[CODE_TO_CHAR[a.sq[sq120(y,x)]] for x in range(8)] for y in range(8)]
+
+def to_state(a: ArrayState) -> State:
+    st = State()
+    st.board = board_view(a)
+    st.turn = 'white' if a.side == WHITE else 'black'
+    st.wkc, st.wqc, st.bkc, st.bqc = bool(a.castling & WK), bool(a.castling & WQ), bool(a.castling & BK), bool(a.castling & BQ)
+    st.en_passant = None if a.ep == 0 else sq_yx(a.ep)
+    st.halfmove_clock = a.halfmove_clock
+    st.fullmove_number = a.fullmove_number
+    sync_state(st)
+    st.history = array('Q', a.history)
+    return st
+
+def from_fen(fen: str) -> ArrayState:
+    return from_state(state_from_fen(fen))
+
+def print_board(a: ArrayState):
+    chess_cli_v2.print_board(board_view(a))
+
+def save_state(a: ArrayState, path: str):
+    chess_cli_v2.save_state(to_state(a), path)
+
+def square_attacked(a: ArrayState, s: int, by: int) -> bool:
+    """La case s (10x12) est-elle attaquée par le camp by (WHITE/BLACK) ?"""
+    b = a.sq
+    # Pions : un pion blanc attaque vers le haut, il se trouve donc sous la case
+    if by == WHITE:
+        if b[s+9] == PAWN or b[s+11] == PAWN: return True
+    else:
+        if b[s-9] == PAWN|BLACK or b[s-11] == PAWN|BLACK: return True
+    n = KNIGHT | by
+    for d in KNIGHT_DIRS:
+        if b[s+d] == n: return True
+    k = KING | by
+    for d in KING_DIRS:
+        if b[s+d] == k: return True
+    bi, q = BISHOP | by, QUEEN | by
+    for d in DIAG_DIRS:
+        t = s + d
+        while b[t] == EMPTY: t += d
+        if b[t] == bi or b[t] == q: return True
+    r = ROOK | by
+    for d in ORTHO_DIRS:
+        t = s + d
+        while b[t] == EMPTY: t += d
+        if b[t] == r or b[t] == q: return True
+    return False
+
+def square_attacked_by(a: ArrayState, y:int, x:int, attacker_color:str) -> bool:
+    return square_attacked(a, sq120(y,x), WHITE if attacker_color == 'white' else BLACK)
+
+def in_check(a: ArrayState, color: str) -> bool:
+    side = WHITE if color == 'white' else BLACK
+    return square_attacked(a, a.kings[side >> 3], side ^ BLACK)
+
+def pseudo_moves(a: ArrayState) -> List[AMove]:
+    b = a.sq
+    side = a.side
+    enemy = side ^ BLACK
+    moves: List[AMove] = []
+    push = N_ if side == WHITE else S_
+    start_lo, start_hi = (81, 88) if side == WHITE else (31, 38)   # 2e / 7e rangée
+    promo_lo, promo_hi = (21, 28) if side == WHITE else (91, 98)
+    for s in range(21, 99):
+        p = b[s]
+        if p == EMPTY or p == OFF or (p & BLACK) != side: continue
+        t = p & 7
+        if t == PAWN:
+            targets = []
+            s1 = s + push
+            if b[s1] == EMPTY:
+                targets.append(s1)
+                if start_lo <= s <= start_hi and b[s1 + push] == EMPTY:
+                    moves.append((s, s1 + push, 0))
+            for c in (s1 - 1, s1 + 1):
+                q = b[c]
+                if (q != EMPTY and q != OFF and (q & BLACK) == enemy) or (c == a.ep and q == EMPTY):
+                    targets.append(c)
+            for c in targets:
+                if promo_lo <= c <= promo_hi:
+                    moves.extend((s, c, pr) for pr in (QUEEN, ROOK, BISHOP, KNIGHT))
+                else:
+                    moves.append((s, c, 0))
+        elif t == KNIGHT or t == KING:
+            for d in (KNIGHT_DIRS if t == KNIGHT else KING_DIRS):
+                q = b[s+d]
+                if q == EMPTY or (q != OFF and (q & BLACK) == enemy):
+                    moves.append((s, s+d, 0))
+        else:
+            dirs = DIAG_DIRS if t == BISHOP else ORTHO_DIRS if t == ROOK else KING_DIRS
+            for d in dirs:
+                c = s + d
+                while b[c] == EMPTY:
+                    moves.append((s, c, 0))
+                    c += d
+                q = b[c]
+                if q != OFF and (q & BLACK) == enemy:
+                    moves.append((s, c, 0))
+    # Roque : roi et tour en place, cases libres, roi ni en échec ni traversant une case attaquée
+    k = a.kings[side >> 3]
+    if side == WHITE and k == E1:
+        if a.castling & WK and b[E1+3] == ROOK and b[E1+1] == EMPTY and b[E1+2] == EMPTY \
+           and not square_attacked(a, E1, enemy) and not square_attacked(a, E1+1, enemy) \
+           and not square_attacked(a, E1+2, enemy):
+            moves.append((E1, E1+2, 0))
+        if a.castling & WQ and b[E1-4] == ROOK and b[E1-1] == EMPTY and b[E1-2] == EMPTY and b[E1-3] == EMPTY \
+           and not square_attacked(a, E1, enemy) and not square_attacked(a, E1-1, enemy) \
+           and not square_attacked(a, E1-2, enemy):
+            moves.append((E1, E1-2, 0))
+    if side == BLACK and k == E8:
+        if a.castling & BK and b[E8+3] == ROOK|BLACK and b[E8+1] == EMPTY and b[E8+2] == EMPTY \
+           and not square_attacked(a, E8, enemy) and not square_attacked(a, E8+1, enemy) \
+           and not square_attacked(a, E8+2, enemy):
+            moves.append((E8, E8+2, 0))
+        if a.castling & BQ and b[E8-4] == ROOK|BLACK and b[E8-1] == EMPTY and b[E8-2] == EMPTY and b[E8-3] == EMPTY \
+           and not square_attacked(a, E8, enemy) and not square_attacked(a, E8-1, enemy) \
+           and not square_attacked(a, E8-2, enemy):
+            moves.append((E8, E8-2, 0))
+    return moves
+
+def make_move(a: ArrayState, m: AMove) -> tuple:
+    """Joue m sur place et renvoie l'enregistrement pour unmake_move."""
+    b = a.sq
+    s, t, promo = m
+    p = b[s]
+    side = p & BLACK
+    captured = b[t]
+    cap_sq = t
+    rook = None
+    saved = (a.castling, a.ep, a.halfmove_clock, a.fullmove_number, a.hash)
+    h = a.hash ^ ZOBRIST_CASTLING[a.castling] ^ ZP[p][s]
+    if a.ep: h ^= ZOBRIST_EP[(a.ep - 21) % 10]
+    if captured != EMPTY: h ^= ZP[captured][t]
+    b[t] = p
+    b[s] = EMPTY
+    kind = p & 7
+    new_ep = 0
+    if kind == KING:
+        a.kings[side >> 3] = t
+        a.castling &= ~(WK | WQ) if side == WHITE else ~(BK | BQ)
+        if t - s == 2 or s - t == 2:
+            # Roque : la tour saute par-dessus le roi
+            rook = (t + 1, t - 1) if t > s else (t - 2, t + 1)
+            r = b[rook[0]]
+            b[rook[1]] = r
+            b[rook[0]] = EMPTY
+            h ^= ZP[r][rook[0]] ^ ZP[r][rook[1]]
+    elif kind == PAWN:
+        if t == a.ep and captured == EMPTY and (t - s) % 10:
+            # Prise en passant : le pion pris est à côté du pion qui prend
+            cap_sq = t + 10 if side == WHITE else t - 10
+            captured = b[cap_sq]
+            b[cap_sq] = EMPTY
+            h ^= ZP[captured][cap_sq]
+        elif t - s == 20 or s - t == 20:
+            new_ep = (s + t) >> 1
+        if promo:
+            b[t] = promo | side
+    a.castling &= CASTLE_MASK[s] & CASTLE_MASK[t]
+    a.ep = new_ep
+    h ^= ZP[b[t]][t] ^ ZOBRIST_CASTLING[a.castling] ^ ZOBRIST_BLACK
+    if new_ep: h ^= ZOBRIST_EP[(new_ep - 21) % 10]
+    a.hash = h
+    if captured != EMPTY or kind == PAWN: a.halfmove_clock = 0
+    else: a.halfmove_clock += 1
+    a.side ^= BLACK
+    if a.side == WHITE: a.fullmove_number += 1
+    return (m, p, captured, cap_sq, rook) + saved
+
+def unmake_move(a: ArrayState, u: tuple):
+    b = a.sq
+    (s, t, _), p, captured, cap_sq, rook, a.castling, a.ep, a.halfmove_clock, a.fullmove_number, a.hash = u
+    if rook:
+        b[rook[0]] = b[rook[1]]
+        b[rook[1]] = EMPTY
+    b[t] = EMPTY
+    b[cap_sq] = captured
+    b[s] = p
+    if p & 7 == KING: a.kings[(p & BLACK) >> 3] = s
+    a.side ^= BLACK
+
+def legal_moves(a: ArrayState) -> List[AMove]:
+    side = a.side
+    enemy = side ^ BLACK
+    out: List[AMove] = []
+    for m in pseudo_moves(a):
+        u = make_move(a, m)
+        if not square_attacked(a, a.kings[side >> 3], enemy):
+            out.append(m)
+        unmake_move(a, u)
+    return out
+
+def to_move(m: AMove) -> Move:
+    return sq_yx(m[0]), sq_yx(m[1]), PROMO_CHAR.get(m[2])
+
+def from_move(m: Move) -> AMove:
+    return sq120(*m[0]), sq120(*m[1]), PROMO_CODE.get(m[2] or '', 0)
+
+def generate_legal_moves(a: ArrayState) -> List[Move]:
+    return [to_move(m) for m in legal_moves(a)]
+
+def has_legal_moves(a: ArrayState, color: str) -> bool:
+    side = WHITE if color == 'white' else BLACK
+    saved = a.side
+    a.side = side
+    try:
+        for m in pseudo_moves(a):
+            u = make_move(a, m)
+            ok = not square_attacked(a, a.kings[side >> 3], side ^ BLACK)
+            unmake_move(a, u)
+            if ok: return True
+        return False
+    finally:
+        a.side = saved
+
+def apply_move(a: ArrayState, frm: Square, to: Square, promotion_choice: Optional[str]=None) -> bool:
+    """Comme chess_cli_v2.apply_move (sans interaction) : joue et enregistre la position."""
+    s, t = sq120(*frm), sq120(*to)
+    p = a.sq[s]
+    if p == EMPTY: return False
+    last = 21 <= t <= 28 if p == PAWN else 91 <= t <= 98 if p == PAWN|BLACK else False
+    make_move(a, (s, t, PROMO_CODE.get((promotion_choice or 'q').lower(), QUEEN) if last else 0))
+    if a.halfmove_clock == 0: a.history = array('Q', (a.hash,))
+    else: a.history.append(a.hash)
+    return True
+
+def perft(a: ArrayState, depth: int) -> int:
+    if depth <= 0: return 1
+    moves = legal_moves(a)
+    if depth == 1: return len(moves)
+    nodes = 0
+    for m in moves:
+        u = make_move(a, m)
+        nodes += perft(a, depth-1)
+        unmake_move(a, u)
+    return nodes
+
+def divide(a: ArrayState, depth: int) -> Dict[str,int]:
+    counts: Dict[str,int] = {}
+    for m in legal_moves(a):
+        u = make_move(a, m)
+        counts[chess_cli_v2.move_to_alg(to_move(m))] = perft(a, depth-1)
+        unmake_move(a, u)
+    return counts
+
+def check_hash(a: ArrayState) -> bool:
+    """Vérification : le hash incrémental correspond au hash recalculé sur la vue liste."""
+    return a.hash == zobrist_hash(to_state(a))
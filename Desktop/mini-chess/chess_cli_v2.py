@@ -3,13 +3,20 @@
 # - promotion au choix (q/r/b/n)
 # - règle des 50 coups (auto nulle à 100 demi-coups)
 # - nulle par triple répétition (auto)
-# - sauvegarde/chargement (save/load)
-from typing import List, Tuple, Optional, Iterable, Dict
+# - sauvegarde/chargement (save/load), binaire compacte ou JSON, journal des coups
+from typing import List, Tuple, Optional, Iterable, Sequence, Dict, NamedTuple, Set
+from array import array
 import json
 import os
+import random
+import re
+import struct
+import sys
+import time
 
 Board = List[List[str]]
 Square = Tuple[int, int]
+Move = Tuple[Square, Square, Optional[str]]   # (départ, arrivée, promotion q/r/b/n ou None)
 
 def init_board() -> Board:
     return [
@@ -82,13 +89,13 @@ def find_king(board: Board, color: str) -> Square:
     raise ValueError("King not found")
 
 def square_attacked_by(board: Board, y:int, x:int, attacker_color:str) -> bool:
-    # Pions
+    # Pions (un pion blanc attaque vers le haut : il se trouve sous la case visée)
     if attacker_color=='white':
-        for dy,dx in [(-1,-1),(-1,1)]:
+        for dy,dx in [(1,-1),(1,1)]:
             yy,xx=y+dy,x+dx
             if in_bounds(yy,xx) and board[yy][xx]=='P': return True
     else:
-        for dy,dx in [(1,-1),(1,1)]:
+        for dy,dx in [(-1,-1),(-1,1)]:
             yy,xx=y+dy,x+dx
             if in_bounds(yy,xx) and board[yy][xx]=='p': return True
     # Cavaliers
@@ -129,12 +136,19 @@ def square_attacked_by(board: Board, y:int, x:int, attacker_color:str) -> bool:
                 if attacker_color=='black' and p=='k': return True
     return False
 
-def in_check(board: Board, color: str) -> bool:
-    ky,kx = find_king(board, color)
+def in_check(board: Board, color: str, king: Optional[Square]=None) -> bool:
+    ky,kx = find_king(board, color) if king is None else king
     other = 'white' if color=='black' else 'black'
     return square_attacked_by(board, ky, kx, other)
 
+# Une seule instance de chaque case : les ensembles de pièces des parties partagent les tuples
+SQUARES: List[Square] = [(y, x) for y in range(8) for x in range(8)]
+
 class State:
+    # Pas de __dict__ : un serveur garde des milliers de parties en mémoire
+    __slots__ = ('board', 'turn', 'wkc', 'wqc', 'bkc', 'bqc', 'en_passant', 'halfmove_clock', 'fullmove_number',
+                 'hash', 'eval_mg', 'eval_eg', 'phase', 'pieces', 'kings', 'history', 'history_shared', 'move_cache')
+
     def __init__(self):
         self.board: Board = init_board()
         self.turn: str = 'white'
@@ -146,20 +160,200 @@ class State:
         self.halfmove_clock: int = 0
         # numéro de coup (1 au départ, +1 après un coup noir)
         self.fullmove_number: int = 1
-        # répétitions : clé de position -> compte
-        self.position_counts: Dict[str,int] = {}
+        # hash Zobrist de la position, tenu à jour par make_move
+        self.hash: int = 0
+        # termes d'évaluation (milieu/fin de partie, phase), tenus à jour par make_move
+        self.eval_mg: int = 0
+        self.eval_eg: int = 0
+        self.phase: int = 0
+        # cases occupées par chaque camp et case de chaque roi, tenues à jour par make_move
+        self.pieces: Dict[str, Set[Square]] = {'white': set(), 'black': set()}
+        self.kings: Dict[str, Square] = {}
+        # répétitions : hash des positions depuis le dernier coup irréversible (apply_move repart
+        # de zéro après une prise ou un coup de pion) ; partagé avec les clones jusqu'à écriture
+        self.history: array = array('Q')
+        self.history_shared = False
+        # coups légaux de la position courante : (hash, table) ou None, voir legal_move_table
+        self.move_cache: Optional[Tuple[int, Dict[Square, List[Square]]]] = None
+        sync_state(self)
 
     def clone(self) -> 'State':
-        s = State()
+        s = State.__new__(State)    # pas de __init__ : tous les champs sont copiés
         s.board = [row[:] for row in self.board]
         s.turn = self.turn
         s.wkc, s.wqc, s.bkc, s.bqc = self.wkc, self.wqc, self.bkc, self.bqc
         s.en_passant = None if self.en_passant is None else (self.en_passant[0], self.en_passant[1])
         s.halfmove_clock = self.halfmove_clock
         s.fullmove_number = self.fullmove_number
-        s.position_counts = dict(self.position_counts)
+        s.hash = self.hash
+        s.eval_mg, s.eval_eg, s.phase = self.eval_mg, self.eval_eg, self.phase
+        s.pieces = {'white': set(self.pieces['white']), 'black': set(self.pieces['black'])}
+        s.kings = dict(self.kings)
+        s.history = self.history
+        s.history_shared = self.history_shared = True
+        s.move_cache = self.move_cache
         return s
 
+# Zobrist : une clé 64 bits par (pièce, case), trait noir, combinaison de roques et colonne en passant.
+# Graine fixe pour que les hash soient identiques d'un processus à l'autre.
+_zrng = random.Random(20240601)
+ZOBRIST_PIECE: Dict[str, List[int]] = {p: [_zrng.getrandbits(64) for _ in range(64)] for p in "KQRBNPkqrbnp"}
+ZOBRIST_BLACK: int = _zrng.getrandbits(64)
+_ZOBRIST_RIGHTS = [_zrng.getrandbits(64) for _ in range(4)]   # wkc, wqc, bkc, bqc
+ZOBRIST_CASTLING: List[int] = [
+    (_ZOBRIST_RIGHTS[0] if i & 1 else 0) ^ (_ZOBRIST_RIGHTS[1] if i & 2 else 0)
+    ^ (_ZOBRIST_RIGHTS[2] if i & 4 else 0) ^ (_ZOBRIST_RIGHTS[3] if i & 8 else 0)
+    for i in range(16)
+]
+ZOBRIST_EP: List[int] = [_zrng.getrandbits(64) for _ in range(8)]
+
+def castling_index(st: 'State') -> int:
+    return st.wkc | (st.wqc << 1) | (st.bkc << 2) | (st.bqc << 3)
+
+def zobrist_hash(st: 'State') -> int:
+    """Hash calculé depuis zéro (vérification de st.hash, chargement de partie)."""
+    h = 0
+    for y in range(8):
+        for x in range(8):
+            p = st.board[y][x]
+            if p != '.': h ^= ZOBRIST_PIECE[p][y*8 + x]
+    if st.turn == 'black': h ^= ZOBRIST_BLACK
+    h ^= ZOBRIST_CASTLING[castling_index(st)]
+    if st.en_passant is not None: h ^= ZOBRIST_EP[st.en_passant[1]]
+    return h
+
+# Évaluation statique : matériel + tables pièce-case, interpolées entre milieu et fin de partie
+# selon la phase (cavalier/fou 1, tour 2, dame 4 ; 24 = toutes les pièces). Les termes vivent
+# dans State (eval_mg, eval_eg, phase) et make_move/unmake_move les tiennent à jour par delta.
+PIECE_VALUE: Dict[str, int] = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+
+# Tables pièce-case du point de vue des Blancs, rangée 8 en premier (même indice y*8+x que le plateau)
+# Milieu de partie :
+PST_MG: Dict[str, List[int]] = {
+    'P': [  0,  0,  0,  0,  0,  0,  0,  0,
+           50, 50, 50, 50, 50, 50, 50, 50,
+           10, 10, 20, 30, 30, 20, 10, 10,
+            5,  5, 10, 25, 25, 10,  5,  5,
+            0,  0,  0, 20, 20,  0,  0,  0,
+            5, -5,-10,  0,  0,-10, -5,  5,
+            5, 10, 10,-20,-20, 10, 10,  5,
+            0,  0,  0,  0,  0,  0,  0,  0],
+    'N': [-50,-40,-30,-30,-30,-30,-40,-50,
+          -40,-20,  0,  0,  0,  0,-20,-40,
+          -30,  0, 10, 15, 15, 10,  0,-30,
+          -30,  5, 15, 20, 20, 15,  5,-30,
+          -30,  0, 15, 20, 20, 15,  0,-30,
+          -30,  5, 10, 15, 15, 10,  5,-30,
+          -40,-20,  0,  5,  5,  0,-20,-40,
+          -50,-40,-30,-30,-30,-30,-40,-50],
+    'B': [-20,-10,-10,-10,-10,-10,-10,-20,
+          -10,  0,  0,  0,  0,  0,  0,-10,
+          -10,  0,  5, 10, 10,  5,  0,-10,
+          -10,  5,  5, 10, 10,  5,  5,-10,
+          -10,  0, 10, 10, 10, 10,  0,-10,
+          -10, 10, 10, 10, 10, 10, 10,-10,
+          -10,  5,  0,  0,  0,  0,  5,-10,
+          -20,-10,-10,-10,-10,-10,-10,-20],
+    'R': [  0,  0,  0,  0,  0,  0,  0,  0,
+            5, 10, 10, 10, 10, 10, 10,  5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+            0,  0,  0,  5,  5,  0,  0,  0],
+    'Q': [-20,-10,-10, -5, -5,-10,-10,-20,
+          -10,  0,  0,  0,  0,  0,  0,-10,
+          -10,  0,  5,  5,  5,  5,  0,-10,
+           -5,  0,  5,  5,  5,  5,  0, -5,
+            0,  0,  5,  5,  5,  5,  0, -5,
+          -10,  5,  5,  5,  5,  5,  0,-10,
+          -10,  0,  5,  0,  0,  0,  0,-10,
+          -20,-10,-10, -5, -5,-10,-10,-20],
+    'K': [-30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -20,-30,-30,-40,-40,-30,-30,-20,
+          -10,-20,-20,-20,-20,-20,-20,-10,
+           20, 20,  0,  0,  0,  0, 20, 20,
+           20, 30, 10,  0,  0, 10, 30, 20],
+}
+
+# Fin de partie : le roi se centralise, les pions passés avancent ; autres pièces comme au milieu
+PST_EG: Dict[str, List[int]] = dict(PST_MG)
+PST_EG['K'] = [-50,-40,-30,-20,-20,-30,-40,-50,
+               -30,-20,-10,  0,  0,-10,-20,-30,
+               -30,-10, 20, 30, 30, 20,-10,-30,
+               -30,-10, 30, 40, 40, 30,-10,-30,
+               -30,-10, 30, 40, 40, 30,-10,-30,
+               -30,-10, 20, 30, 30, 20,-10,-30,
+               -30,-30,  0,  0,  0,  0,-30,-30,
+               -50,-30,-30,-30,-30,-30,-30,-50]
+PST_EG['P'] = [v for r in (0, 80, 50, 30, 15, 5, 0, 0) for v in [r]*8]
+PHASE_WEIGHT: Dict[str, int] = {p: w for p, w in zip("PNBRQKpnbrqk", (0,1,1,2,4,0)*2)}
+PHASE_MAX = 24
+
+def _signed_table(pst: Dict[str, List[int]]) -> Dict[str, List[int]]:
+    """Valeur + case par pièce (blancs positifs, noirs négatifs, table retournée pour les noirs)."""
+    out: Dict[str, List[int]] = {}
+    for p, table in pst.items():
+        out[p] = [PIECE_VALUE[p] + table[s] for s in range(64)]
+        out[p.lower()] = [-(PIECE_VALUE[p] + table[(7 - s//8)*8 + s%8]) for s in range(64)]
+    return out
+
+EVAL_MG = _signed_table(PST_MG)
+EVAL_EG = _signed_table(PST_EG)
+
+def evaluate_full(st: 'State') -> Tuple[int, int, int]:
+    """(milieu, fin, phase) recalculés depuis zéro (vérification des termes incrémentaux)."""
+    mg = eg = phase = 0
+    for y in range(8):
+        for x in range(8):
+            p = st.board[y][x]
+            if p == '.': continue
+            mg += EVAL_MG[p][y*8 + x]
+            eg += EVAL_EG[p][y*8 + x]
+            phase += PHASE_WEIGHT[p]
+    return mg, eg, phase
+
+def evaluate(st: 'State') -> int:
+    """Score en centipions du point de vue du camp au trait, en O(1)."""
+    phase = min(st.phase, PHASE_MAX)
+    score = (st.eval_mg * phase + st.eval_eg * (PHASE_MAX - phase)) // PHASE_MAX
+    return score if st.turn == 'white' else -score
+
+def sync_state(st: 'State'):
+    """Recalcule les données dérivées (hash, évaluation, listes de pièces, rois) après avoir modifié directement le plateau ou les droits."""
+    st.hash = zobrist_hash(st)
+    st.eval_mg, st.eval_eg, st.phase = evaluate_full(st)
+    st.move_cache = None
+    st.pieces = {'white': set(), 'black': set()}
+    st.kings = {}
+    for y in range(8):
+        for x in range(8):
+            p = st.board[y][x]
+            if p == '.': continue
+            color = 'white' if p.isupper() else 'black'
+            st.pieces[color].add(SQUARES[y*8+x])
+            if p in 'Kk': st.kings[color] = SQUARES[y*8+x]
+
+def check_consistency(st: 'State') -> List[str]:
+    """Contrôle de débogage : listes de pièces, rois et hash comparés au plateau. Renvoie les écarts."""
+    errors: List[str] = []
+    for color in ('white', 'black'):
+        on_board = {(y,x) for y in range(8) for x in range(8)
+                    if st.board[y][x] != '.' and piece_color(st.board[y][x]) == color}
+        for sq in sorted(on_board - st.pieces[color]): errors.append(f"{color}: {idx_to_alg(*sq)} absente de la liste")
+        for sq in sorted(st.pieces[color] - on_board): errors.append(f"{color}: {idx_to_alg(*sq)} listée mais vide/adverse")
+        king = 'K' if color == 'white' else 'k'
+        k = st.kings.get(color)
+        if k is None or st.board[k[0]][k[1]] != king:
+            errors.append(f"{color}: roi attendu en {idx_to_alg(*k) if k else '?'}")
+    if st.hash != zobrist_hash(st): errors.append("hash incrémental différent du hash recalculé")
+    if (st.eval_mg, st.eval_eg, st.phase) != evaluate_full(st): errors.append("évaluation incrémentale différente de evaluate_full")
+    return errors
+
 def move_piece(board: Board, a: Square, b: Square):
     y1,x1 = a; y2,x2 = b
     p = board[y1][x1]
@@ -212,10 +406,78 @@ def position_key(st: State)->str:
     return f"{board_str}|{st.turn}|{castling_rights_string(st)}|{ep}"
 
 def register_position(st: State):
-    key = position_key(st)
-    st.position_counts[key] = st.position_counts.get(key, 0) + 1
+    if st.history_shared: st.history, st.history_shared = array('Q', st.history), False
+    st.history.append(st.hash)
+
+def unregister_position(st: State):
+    """Retire la dernière position enregistrée (annulation d'un coup dans une recherche)."""
+    if st.history_shared: st.history, st.history_shared = array('Q', st.history), False
+    st.history.pop()
+
+def repetition_count(st: State) -> int:
+    """Occurrences de la position courante depuis le dernier coup irréversible (capture ou coup de pion)."""
+    hist = st.history
+    return hist[max(0, len(hist) - st.halfmove_clock - 1):].count(st.hash)
+
+class LegalityInfo(NamedTuple):
+    """Échecs et clouages d'un camp, calculés une fois par position."""
+    king: Square
+    checkers: List[Square]                  # pièces adverses qui donnent échec
+    evasion: Optional[Set[Square]]          # None hors échec ; sinon cases qui parent un échec simple
+    pins: Dict[Square, Set[Square]]         # pièce clouée -> cases où elle reste sur le rayon du clouage
+
+# Directions des rayons et pièces glissantes qui les utilisent
+_RAYS = [((-1,-1),"BQ"), ((-1,1),"BQ"), ((1,-1),"BQ"), ((1,1),"BQ"),
+         ((-1,0),"RQ"), ((1,0),"RQ"), ((0,-1),"RQ"), ((0,1),"RQ")]
+
+def legality_info(st: State, color: str) -> LegalityInfo:
+    board = st.board
+    ky,kx = st.kings[color]
+    enemy_white = color=='black'
+    checkers: List[Square] = []
+    evasion: Set[Square] = set()
+    pins: Dict[Square, Set[Square]] = {}
+    # Pions et cavaliers : seule la case de la pièce pare l'échec (en la prenant)
+    dy_pawn = -1 if color=='white' else 1
+    pawn = 'P' if enemy_white else 'p'
+    for dx in (-1,1):
+        yy,xx = ky+dy_pawn, kx+dx
+        if in_bounds(yy,xx) and board[yy][xx]==pawn:
+            checkers.append((yy,xx)); evasion.add((yy,xx))
+    knight = 'N' if enemy_white else 'n'
+    for dy,dx in [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]:
+        yy,xx = ky+dy, kx+dx
+        if in_bounds(yy,xx) and board[yy][xx]==knight:
+            checkers.append((yy,xx)); evasion.add((yy,xx))
+    # Rayons : premier bloqueur adverse qui glisse dans ce sens = échec ;
+    # premier bloqueur ami suivi d'un tel glisseur = clouage
+    for (dy,dx),sliders in _RAYS:
+        if enemy_white: sliders = sliders.upper()
+        else: sliders = sliders.lower()
+        ray: List[Square] = []
+        pinned: Optional[Square] = None
+        yy,xx = ky+dy, kx+dx
+        while in_bounds(yy,xx):
+            p = board[yy][xx]
+            ray.append((yy,xx))
+            if p!='.':
+                if piece_color(p)==color:
+                    if pinned is not None: break
+                    pinned = (yy,xx)
+                else:
+                    if p in sliders:
+                        if pinned is None:
+                            checkers.append((yy,xx)); evasion.update(ray)
+                        else:
+                            pins[pinned] = set(ray)
+                    break
+            yy+=dy; xx+=dx
+    return LegalityInfo((ky,kx), checkers, evasion if checkers else None, pins)
+
+# "mask" : légalité par clouages/échecs ; "simulate" : jouer chaque coup et tester le roi (vérification)
+LEGALITY = "mask"
 
-def legal_moves_for_piece(st: State, a: Square) -> List[Square]:
+def legal_moves_for_piece(st: State, a: Square, info: Optional[LegalityInfo]=None) -> List[Square]:
     board = st.board
     y,x = a
     p = board[y][x]
@@ -303,25 +565,101 @@ def legal_moves_for_piece(st: State, a: Square) -> List[Square]:
                and not square_attacked_by(board,0,2,'white'):
                 moves.append((0,2))
 
-    # Filtrer (ne pas laisser son roi en échec). On simule avec promotion dame.
+    # Filtrer (ne pas laisser son roi en échec).
     legal: List[Square] = []
+    if LEGALITY == "mask":
+        if info is None: info = legality_info(st, color)
+        is_king = p.upper()=='K'
+        ep_capture = p.upper()=='P' and st.en_passant is not None
+        if not is_king and len(info.checkers) > 1:
+            return legal                    # échec double : seul le roi peut bouger
+        pin = info.pins.get(a)
+        for dest in moves:
+            if is_king or (ep_capture and dest==st.en_passant):
+                # Roi et prise en passant (double découverte possible) : jouer et vérifier
+                u = make_move(st, a, dest, 'q')
+                if not in_check(board, color, st.kings[color]):
+                    legal.append(dest)
+                unmake_move(st, u)
+            elif (info.evasion is None or dest in info.evasion) and (pin is None or dest in pin):
+                legal.append(dest)
+        return legal
+    # On joue/déjoue sur place avec promotion dame.
     for dest in moves:
-        sim = st.clone()
-        if not apply_move(sim, (y,x), dest, special_check_only=True):
-            continue
-        if not in_check(sim.board, color):
+        u = make_move(st, (y,x), dest, 'q')
+        if not in_check(board, color, st.kings[color]):
             legal.append(dest)
+        unmake_move(st, u)
     return legal
 
 def has_legal_moves(st: State, color: str) -> bool:
-    for y in range(8):
-        for x in range(8):
-            p = st.board[y][x]
-            if p!='.' and piece_color(p)==color:
-                if legal_moves_for_piece(st, (y,x)):
-                    return True
+    info = legality_info(st, color) if LEGALITY == "mask" else None
+    for sq in sorted(st.pieces[color]):
+        if legal_moves_for_piece(st, sq, info):
+            return True
     return False
 
+def legal_move_table(st: State) -> Dict[Square, List[Square]]:
+    """
+    Coups légaux du camp au trait, par case de départ (pièces sans coup absentes).
+    Calculée une fois par position et partagée par game_status, la commande moves et
+    make_move_if_legal ; la table est à clé sur st.hash et vidée par apply_move/sync_state.
+    À lire seulement : elle est partagée.
+    """
+    cache = st.move_cache
+    if cache is not None and cache[0] == st.hash:
+        return cache[1]
+    info = legality_info(st, st.turn) if LEGALITY == "mask" else None
+    table: Dict[Square, List[Square]] = {}
+    for a in sorted(st.pieces[st.turn]):
+        dests = legal_moves_for_piece(st, a, info)
+        if dests: table[a] = dests
+    st.move_cache = (st.hash, table)
+    return table
+
+def generate_legal_moves(st: State) -> List[Move]:
+    """Tous les coups légaux du camp au trait, promotions développées en q/r/b/n."""
+    board = st.board
+    color = st.turn
+    last_row = 0 if color=='white' else 7
+    pawn = 'P' if color=='white' else 'p'
+    info = legality_info(st, color) if LEGALITY == "mask" else None
+    moves: List[Move] = []
+    # Copie triée : make/unmake modifient l'ensemble pendant la génération
+    for a in sorted(st.pieces[color]):
+        p = board[a[0]][a[1]]
+        for dest in legal_moves_for_piece(st, a, info):
+            if p==pawn and dest[0]==last_row:
+                moves.extend((a, dest, c) for c in 'qrbn')
+            else:
+                moves.append((a, dest, None))
+    return moves
+
+def move_to_alg(m: Move) -> str:
+    a,b,promo = m
+    return idx_to_alg(*a) + idx_to_alg(*b) + (promo or '')
+
+def perft(st: State, depth: int) -> int:
+    """Nombre de feuilles de l'arbre des coups légaux à la profondeur donnée."""
+    if depth <= 0: return 1
+    moves = generate_legal_moves(st)
+    if depth == 1: return len(moves)
+    nodes = 0
+    for a,b,promo in moves:
+        u = make_move(st, a, b, promo)
+        nodes += perft(st, depth-1)
+        unmake_move(st, u)
+    return nodes
+
+def divide(st: State, depth: int) -> Dict[str,int]:
+    """perft détaillé par coup racine (ex: {'e2e4': 20, ...})."""
+    counts: Dict[str,int] = {}
+    for m in generate_legal_moves(st):
+        u = make_move(st, m[0], m[1], m[2])
+        counts[move_to_alg(m)] = perft(st, depth-1)
+        unmake_move(st, u)
+    return counts
+
 def update_castling_rights(st: State, a: Square, b: Square):
     y1,x1=a; y2,x2=b
     p = st.board[y2][x2]  # pièce après déplacement
@@ -337,66 +675,107 @@ def update_castling_rights(st: State, a: Square, b: Square):
     if (y2,x2)==(0,7) and st.board[0][7].isupper(): st.bkc = False
     if (y2,x2)==(0,0) and st.board[0][0].isupper(): st.bqc = False
 
-def apply_move(st: State, a: Square, b: Square, special_check_only: bool=False, promotion_choice: Optional[str]=None) -> bool:
+class Undo(NamedTuple):
+    """Tout ce qu'il faut pour annuler un coup joué par make_move."""
+    a: Square
+    b: Square
+    piece: str                                  # pièce déplacée (le pion en cas de promotion)
+    captured: str                               # pièce prise, '.' si aucune
+    captured_at: Square                         # case de la prise (≠ b en passant)
+    rook: Optional[Tuple[Square, Square]]       # déplacement de la tour si roque
+    castling: Tuple[bool, bool, bool, bool]     # wkc, wqc, bkc, bqc avant le coup
+    en_passant: Optional[Square]
+    halfmove_clock: int
+    fullmove_number: int
+    hash: int
+    eval: Tuple[int, int, int]                  # eval_mg, eval_eg, phase avant le coup
+
+def make_move(st: State, a: Square, b: Square, promotion_choice: Optional[str]=None, interactive: bool=False) -> Undo:
     """
-    Applique un coup (gère roque/en passant/promotion). Si special_check_only=True,
-    on n'interagit pas (promotion = dame automatique) et on ne touche pas aux compteurs.
+    Joue le coup a->b sur place (roque/en passant/promotion, droits, compteurs, trait)
+    et renvoie l'enregistrement permettant unmake_move. Le coup doit être pseudo-légal ;
+    la position n'est pas enregistrée pour les répétitions (voir apply_move).
     """
     board = st.board
     y1,x1 = a; y2,x2 = b
     p = board[y1][x1]
-    if p=='.': return False
     color = piece_color(p)
+    captured = board[y2][x2]
+    captured_at = b
+    rook: Optional[Tuple[Square, Square]] = None
+    undo = (st.wkc, st.wqc, st.bkc, st.bqc), st.en_passant, st.halfmove_clock, st.fullmove_number, st.hash, \
+           (st.eval_mg, st.eval_eg, st.phase)
+    # Évaluation : la pièce quitte sa case, une pièce prise disparaît
+    i1 = y1*8 + x1
+    mg = st.eval_mg - EVAL_MG[p][i1]
+    eg = st.eval_eg - EVAL_EG[p][i1]
+    phase = st.phase
+    if captured != '.':
+        mg -= EVAL_MG[captured][y2*8 + x2]; eg -= EVAL_EG[captured][y2*8 + x2]; phase -= PHASE_WEIGHT[captured]
+    # Hash : retirer roques/en passant actuels et la pièce de sa case de départ
+    h = st.hash ^ ZOBRIST_CASTLING[castling_index(st)] ^ ZOBRIST_PIECE[p][y1*8 + x1]
+    if st.en_passant is not None: h ^= ZOBRIST_EP[st.en_passant[1]]
+    if captured != '.': h ^= ZOBRIST_PIECE[captured][y2*8 + x2]
+
+    # Listes de pièces : la pièce quitte a pour b, une éventuelle prise sort de la liste adverse
+    other = 'black' if color=='white' else 'white'
+    own = st.pieces[color]
+    b = SQUARES[y2*8 + x2]
+    own.discard(a); own.add(b)
+    if captured != '.': st.pieces[other].discard(b)
+    if p in 'Kk': st.kings[color] = b
 
     # Réinitialiser l'en-passant (sera recalculé si double pas)
     new_en_passant: Optional[Square] = None
-    is_capture = board[y2][x2] != '.'
     is_pawn_move = (p.upper() == 'P')
 
     # Roque (roi se déplace de 2 colonnes)
     if p.upper()=='K' and y1==y2 and abs(x2-x1)==2:
+        rook = (SQUARES[y1*8+7], SQUARES[y1*8+5]) if x2==6 else (SQUARES[y1*8], SQUARES[y1*8+3])
         move_piece(board, a, b)
-        if color=='white':
-            if x2==6: move_piece(board, (7,7), (7,5))
-            else:     move_piece(board, (7,0), (7,3))
-            st.wkc = st.wqc = False
-        else:
-            if x2==6: move_piece(board, (0,7), (0,5))
-            else:     move_piece(board, (0,0), (0,3))
+        move_piece(board, rook[0], rook[1])
+        r = board[y1][rook[1][1]]
+        h ^= ZOBRIST_PIECE[r][y1*8 + rook[0][1]] ^ ZOBRIST_PIECE[r][y1*8 + rook[1][1]]
+        r0, r1 = y1*8 + rook[0][1], y1*8 + rook[1][1]
+        mg += EVAL_MG[r][r1] - EVAL_MG[r][r0]; eg += EVAL_EG[r][r1] - EVAL_EG[r][r0]
+        own.discard(rook[0]); own.add(rook[1])
+        if color=='white': st.wkc = st.wqc = False
+        else:              st.bkc = st.bqc = False
     else:
-        # Prise en passant
-        if p.upper()=='P' and st.en_passant is not None and b==st.en_passant and board[y2][x2]=='.' and x2!=x1:
-            move_piece(board, a, b)
-            if color=='white':
-                board[y2+1][x2] = '.'
-            else:
-                board[y2-1][x2] = '.'
-            is_capture = True
-        else:
-            move_piece(board, a, b)
+        # Prise en passant : le pion pris est à côté du pion qui prend
+        if is_pawn_move and st.en_passant is not None and b==st.en_passant and captured=='.' and x2!=x1:
+            captured_at = SQUARES[y1*8 + x2]
+            captured = board[y1][x2]
+            board[y1][x2] = '.'
+            h ^= ZOBRIST_PIECE[captured][y1*8 + x2]
+            mg -= EVAL_MG[captured][y1*8 + x2]; eg -= EVAL_EG[captured][y1*8 + x2]
+            st.pieces[other].discard(captured_at)
+        move_piece(board, a, b)
 
         # Promotion
-        if p.upper()=='P' and ((color=='white' and y2==0) or (color=='black' and y2==7)):
-            if special_check_only:
-                board[y2][x2] = 'Q' if color=='white' else 'q'
-            else:
-                apply_promotion(board, y2, x2, color, promotion_choice, interactive=True)
+        if is_pawn_move and ((color=='white' and y2==0) or (color=='black' and y2==7)):
+            apply_promotion(board, y2, x2, color, promotion_choice, interactive)
 
         # En passant disponible si double pas
-        if p.upper()=='P' and abs(y2 - y1) == 2:
-            mid_y = (y1 + y2)//2
-            new_en_passant = (mid_y, x1)
+        if is_pawn_move and abs(y2 - y1) == 2:
+            new_en_passant = ((y1 + y2)//2, x1)
 
         update_castling_rights(st, a, b)
 
     # Mettre à jour l'en passant
     st.en_passant = new_en_passant
 
-    if special_check_only:
-        return True
+    # Hash : pièce (éventuellement promue) sur sa case d'arrivée, nouveaux droits, en passant, trait
+    landed = board[y2][x2]
+    h ^= ZOBRIST_PIECE[landed][y2*8 + x2] ^ ZOBRIST_CASTLING[castling_index(st)] ^ ZOBRIST_BLACK
+    if new_en_passant is not None: h ^= ZOBRIST_EP[x1]
+    st.hash = h
+    st.eval_mg = mg + EVAL_MG[landed][y2*8 + x2]
+    st.eval_eg = eg + EVAL_EG[landed][y2*8 + x2]
+    st.phase = phase + PHASE_WEIGHT[landed] - PHASE_WEIGHT[p]     # promotion : la pièce promue compte
 
     # 50 coups: reset si capture ou coup de pion, sinon +1
-    if is_capture or is_pawn_move:
+    if captured != '.' or is_pawn_move:
         st.halfmove_clock = 0
     else:
         st.halfmove_clock += 1
@@ -405,37 +784,194 @@ def apply_move(st: State, a: Square, b: Square, special_check_only: bool=False,
     st.turn = 'black' if st.turn=='white' else 'white'
     if st.turn == 'white':
         st.fullmove_number += 1
+    return Undo(a, b, p, captured, captured_at, rook, *undo)
 
-    # Enregistrer la nouvelle position pour la nulle par répétition
-    register_position(st)
+def unmake_move(st: State, u: Undo):
+    """Annule sur place le coup décrit par u (inverse exact de make_move)."""
+    board = st.board
+    color = 'white' if u.piece.isupper() else 'black'
+    own = st.pieces[color]
+    if u.rook is not None:
+        move_piece(board, u.rook[1], u.rook[0])
+        own.discard(u.rook[1]); own.add(u.rook[0])
+    y2,x2 = u.b
+    board[y2][x2] = '.'
+    own.discard(u.b); own.add(SQUARES[u.a[0]*8 + u.a[1]])
+    cy,cx = u.captured_at
+    board[cy][cx] = u.captured
+    if u.captured != '.': st.pieces['black' if color=='white' else 'white'].add(SQUARES[u.captured_at[0]*8 + u.captured_at[1]])
+    y1,x1 = u.a
+    board[y1][x1] = u.piece
+    if u.piece in 'Kk': st.kings[color] = SQUARES[u.a[0]*8 + u.a[1]]
+    st.wkc, st.wqc, st.bkc, st.bqc = u.castling
+    st.en_passant = u.en_passant
+    st.halfmove_clock = u.halfmove_clock
+    st.fullmove_number = u.fullmove_number
+    st.hash = u.hash
+    st.eval_mg, st.eval_eg, st.phase = u.eval
+    st.turn = 'black' if st.turn=='white' else 'white'
+
+def apply_move(st: State, a: Square, b: Square, special_check_only: bool=False, promotion_choice: Optional[str]=None) -> bool:
+    """
+    Applique un coup (gère roque/en passant/promotion). Si special_check_only=True,
+    on n'interagit pas (promotion = dame automatique) et on ne touche pas aux compteurs.
+    """
+    if st.board[a[0]][a[1]]=='.': return False
+
+    if special_check_only:
+        u = make_move(st, a, b, 'q')
+        st.turn = 'black' if st.turn=='white' else 'white'
+        st.halfmove_clock, st.fullmove_number = u.halfmove_clock, u.fullmove_number
+        st.hash ^= ZOBRIST_BLACK
+        return True
+
+    make_move(st, a, b, promotion_choice, interactive=True)
+    st.move_cache = None
+
+    # Enregistrer la nouvelle position pour la nulle par répétition ; après un coup
+    # irréversible, aucune position antérieure ne peut plus se répéter
+    if st.halfmove_clock == 0: st.history, st.history_shared = array('Q', (st.hash,)), False
+    else: register_position(st)
+    # Les ensembles de pièces grossissent à force d'ajouts/retraits : les recréer à leur taille
+    # (une fois par coup joué, pas dans la recherche) garde une partie en mémoire compacte
+    st.pieces = {'white': set(st.pieces['white']), 'black': set(st.pieces['black'])}
     return True
 
 def make_move_if_legal(st: State, a: Square, b: Square) -> bool:
     p = st.board[a[0]][a[1]]
     if p=='.' or piece_color(p)!=st.turn: return False
-    legal = legal_moves_for_piece(st, a)
-    if b not in legal: return False
+    if b not in legal_move_table(st).get(a, ()): return False
     ok = apply_move(st, a, b, special_check_only=False)
     return ok
 
-def game_status(st: State) -> Optional[str]:
+# Tables de finales ouvertes par tablebase.use() (objet avec probe(st)), None sinon
+ENDGAME_TABLES = None
+
+def position_status(st: State) -> str:
+    """
+    État de la position : 'fifty', 'repetition', 'checkmate', 'stalemate', 'check' ou 'ok' ;
+    avec des tables de finales ouvertes, 'tb_win', 'tb_draw' ou 'tb_loss' (camp au trait)
+    arrêtent la partie dès que le matériel est dans une table.
+    """
     # Nulle 50 coups
-    if st.halfmove_clock >= 100:
-        return "Match nul (règle des 50 coups)."
+    if st.halfmove_clock >= 100: return "fifty"
     # Nulle trois répétitions
-    if st.position_counts.get(position_key(st), 0) >= 3:
-        return "Match nul (trois répétitions)."
+    if repetition_count(st) >= 3: return "repetition"
     # Échec / mat / pat
-    if in_check(st.board, st.turn):
-        if not has_legal_moves(st, st.turn):
-            return f"Échec et mat ! {'Noir' if st.turn=='white' else 'Blanc'} gagne."
-        return "⚠️ Vous êtes en échec."
+    if in_check(st.board, st.turn, st.kings[st.turn]):
+        if not legal_move_table(st): return "checkmate"
+        status = "check"
     else:
-        if not has_legal_moves(st, st.turn):
-            return "Pat ! Match nul."
+        if not legal_move_table(st): return "stalemate"
+        status = "ok"
+    return tablebase_status(st) or status
+
+def tablebase_status(st: State) -> Optional[str]:
+    """'tb_win', 'tb_draw' ou 'tb_loss' si une table ouverte connaît la position (qui a des coups)."""
+    if ENDGAME_TABLES is None: return None
+    r = ENDGAME_TABLES.probe(st)
+    return None if r is None else ("tb_loss", "tb_draw", "tb_win")[r.wdl + 1]
+
+def game_status(st: State) -> Optional[str]:
+    return status_message(st, position_status(st))
+
+def status_message(st: State, status: str) -> Optional[str]:
+    """Message affiché pour un état rendu par position_status (None : rien à signaler)."""
+    if status == "fifty": return "Match nul (règle des 50 coups)."
+    if status == "repetition": return "Match nul (trois répétitions)."
+    if status == "checkmate": return f"Échec et mat ! {'Noir' if st.turn=='white' else 'Blanc'} gagne."
+    if status == "check": return "⚠️ Vous êtes en échec."
+    if status == "stalemate": return "Pat ! Match nul."
+    if status == "tb_draw": return "Match nul (table de finales)."
+    if status in ("tb_win", "tb_loss"):
+        r = ENDGAME_TABLES.probe(st)
+        white_wins = (st.turn == 'white') == (status == "tb_win")
+        return f"Fin arbitrée (table de finales) : {'Blanc' if white_wins else 'Noir'} gagne, mat en {(r.plies + 1)//2}."
     return None
 
-def save_state(st: State, path: str):
+def en_passant_possible(board: Board, turn: str, sq: Square) -> bool:
+    """
+    Case en passant cohérente pour le camp au trait : 6e (3e) rangée, vide ainsi que la case
+    de départ du double pas, pion adverse juste devant. Sinon la case est ignorée à la lecture.
+    """
+    y, x = sq
+    if not 0 <= x < 8: return False
+    if turn == 'white': return y == 2 and board[2][x] == '.' and board[1][x] == '.' and board[3][x] == 'p'
+    return y == 5 and board[5][x] == '.' and board[6][x] == '.' and board[4][x] == 'P'
+
+def state_from_fen(fen: str) -> State:
+    """Position depuis une FEN (placement, trait, roques, en passant, compteurs)."""
+    fields = fen.split()
+    if len(fields) < 4: raise ValueError(f"FEN incomplète: {fen!r}")
+    rows = fields[0].split('/')
+    if len(rows) != 8: raise ValueError(f"FEN invalide (8 rangées attendues): {fen!r}")
+    st = State()
+    board: Board = []
+    for r in rows:
+        row: List[str] = []
+        for ch in r:
+            if ch.isdigit(): row.extend('.' * int(ch))
+            elif ch in "KQRBNPkqrbnp": row.append(ch)
+            else: raise ValueError(f"FEN invalide (pièce {ch!r}): {fen!r}")
+        if len(row) != 8: raise ValueError(f"FEN invalide (rangée {r!r}): {fen!r}")
+        board.append(row)
+    if sum(r.count('K') for r in board) != 1 or sum(r.count('k') for r in board) != 1:
+        raise ValueError(f"FEN invalide (un roi par camp attendu): {fen!r}")
+    st.board = board
+    if fields[1] not in ('w','b'): raise ValueError(f"FEN invalide (trait): {fen!r}")
+    st.turn = 'white' if fields[1]=='w' else 'black'
+    castling = fields[2]
+    st.wkc, st.wqc, st.bkc, st.bqc = ('K' in castling), ('Q' in castling), ('k' in castling), ('q' in castling)
+    if fields[3] == '-':
+        st.en_passant = None
+    else:
+        m = algebraic_to_idx(fields[3]*2)
+        if not m: raise ValueError(f"FEN invalide (en passant): {fen!r}")
+        st.en_passant = m[0] if en_passant_possible(board, st.turn, m[0]) else None
+    st.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    st.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+    sync_state(st)
+    other = 'black' if st.turn == 'white' else 'white'
+    if in_check(board, other, st.kings[other]):
+        raise ValueError(f"FEN invalide (le camp sans le trait est en échec): {fen!r}")
+    register_position(st)
+    return st
+
+def state_to_fen(st: State) -> str:
+    rows = []
+    for row in st.board:
+        r, empty = "", 0
+        for p in row:
+            if p == '.': empty += 1; continue
+            if empty: r += str(empty); empty = 0
+            r += p
+        rows.append(r + (str(empty) if empty else ""))
+    castling = ("K" if st.wkc else "") + ("Q" if st.wqc else "") + ("k" if st.bkc else "") + ("q" if st.bqc else "")
+    ep = idx_to_alg(*st.en_passant) if st.en_passant else "-"
+    return f"{'/'.join(rows)} {'w' if st.turn=='white' else 'b'} {castling or '-'} {ep} {st.halfmove_clock} {st.fullmove_number}"
+
+EPD_OPERAND = re.compile(r'"[^"]*"|[^\s;"]+')
+EPD_OPERATION = re.compile(r'([A-Za-z][A-Za-z0-9_]*)((?:\s+(?:"[^"]*"|[^\s;"]+))*)\s*;')
+
+def state_from_epd(line: str) -> Tuple[State, Dict[str, str]]:
+    """Position et opérations d'une ligne EPD : 4 champs FEN puis 'op opérandes;' (hmvc/fmvn = compteurs)."""
+    fields = line.split(maxsplit=4)
+    if len(fields) < 4: raise ValueError(f"EPD incomplète: {line!r}")
+    ops: Dict[str, str] = {}
+    rest = fields[4].strip() if len(fields) > 4 else ""
+    while rest:
+        m = EPD_OPERATION.match(rest)
+        if not m: raise ValueError(f"EPD invalide (opération): {line!r}")
+        ops[m.group(1)] = " ".join(t[1:-1] if t.startswith('"') else t for t in EPD_OPERAND.findall(m.group(2)))
+        rest = rest[m.end():].strip()
+    st = state_from_fen(" ".join(fields[:4] + [ops.get("hmvc", "0"), ops.get("fmvn", "1")]))
+    return st, ops
+
+def save_state(st: State, path: str, journal: Optional['Journal']=None):
+    """Sauvegarde binaire (instantané + coups, voir Journal), ou JSON si le fichier finit par .json."""
+    if not path.lower().endswith(".json"):
+        (journal or Journal(st)).write(path)
+        return
     data = {
         "board": ["".join(r) for r in st.board],
         "turn": st.turn,
@@ -443,12 +979,16 @@ def save_state(st: State, path: str):
         "en_passant": None if st.en_passant is None else [st.en_passant[0], st.en_passant[1]],
         "halfmove_clock": st.halfmove_clock,
         "fullmove_number": st.fullmove_number,
-        "position_counts": st.position_counts,
+        # hash des positions depuis le dernier coup irréversible (les seules qui peuvent se répéter)
+        "history": st.history[max(0, len(st.history) - st.halfmove_clock - 1):].tolist(),
     }
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 def load_state(path: str) -> State:
+    with open(path, "rb") as f:
+        if f.read(len(SAVE_MAGIC)) == SAVE_MAGIC:
+            return read_journal(path).replay()
     with open(path, "r", encoding="utf-8") as f:
         d = json.load(f)
     st = State()
@@ -456,37 +996,238 @@ def load_state(path: str) -> State:
     st.turn = d["turn"]
     st.wkc, st.wqc, st.bkc, st.bqc = d["wkc"], d["wqc"], d["bkc"], d["bqc"]
     ep = d.get("en_passant")
-    st.en_passant = None if ep is None else (ep[0], ep[1])
+    st.en_passant = None if ep is None or not en_passant_possible(st.board, st.turn, (ep[0], ep[1])) else (ep[0], ep[1])
     st.halfmove_clock = int(d.get("halfmove_clock", 0))
     st.fullmove_number = int(d.get("fullmove_number", 1))
-    st.position_counts = {str(k): int(v) for k,v in d.get("position_counts", {}).items()}
+    sync_state(st)
+    if "history" in d:
+        st.history = array('Q', (int(h) for h in d["history"]))
+    else:
+        st.history = array('Q', history_from_position_counts(st, d.get("position_counts", {})))
+    return st
+
+def history_from_position_counts(st: State, counts: Dict[str,int]) -> List[int]:
+    """
+    Anciennes sauvegardes (position_key -> compte) vers l'historique de hash.
+    Seules les positions avec les mêmes pions et le même nombre de pièces que la
+    position courante (donc depuis le dernier coup irréversible) sont gardées.
+    """
+    def signature(rows: Iterable[str]) -> Tuple[str, int]:
+        flat = "".join(rows)
+        return "".join(c if c in "Pp" else '.' for c in flat), sum(c != '.' for c in flat)
+
+    current = signature("".join(r) for r in st.board)
+    history: List[int] = []
+    for key, n in counts.items():
+        board_str, turn, castling, ep = str(key).split('|')
+        rows = board_str.split('/')
+        if signature(rows) != current: continue
+        old = State()
+        old.board = [list(r) for r in rows]
+        old.turn = turn
+        old.wkc, old.wqc, old.bkc, old.bqc = ('K' in castling), ('Q' in castling), ('k' in castling), ('q' in castling)
+        m = None if ep == '-' else algebraic_to_idx(ep*2)
+        old.en_passant = m[0] if m else None
+        history.extend([zobrist_hash(old)] * int(n))
+    return history
+
+# --- Sauvegarde binaire et journal de partie ---
+# Fichier : SAVE_MAGIC puis une suite d'enregistrements
+#   coup       : uint16 (bit 15 à 0) = départ (6 bits) | arrivée (6 bits) << 6 | promotion (3 bits) << 12
+#   instantané : uint16 0xFFFF puis plateau (64 quartets), drapeaux, colonne en passant, compteurs
+#   antécédents : uint16 0xFFFE, uint16 n puis n hash uint64 (positions avant l'instantané)
+# Le chargement repart du dernier instantané et rejoue les coups qui suivent : l'historique
+# des répétitions est reconstruit. Seul un instantané pris ailleurs qu'après un coup
+# irréversible (FEN, ancienne sauvegarde JSON, save sans journal) stocke ses antécédents :
+# les positions depuis le dernier coup irréversible qui peuvent encore se répéter.
+SAVE_MAGIC = b"MCS\x01"
+SNAPSHOT_TAG = 0xFFFF
+HISTORY_TAG = 0xFFFE
+SNAPSHOT = struct.Struct("<32sBBHH")
+MOVE_RECORD = struct.Struct("<H")
+PIECE_CODE = {'.':0, 'P':1, 'N':2, 'B':3, 'R':4, 'Q':5, 'K':6, 'p':9, 'n':10, 'b':11, 'r':12, 'q':13, 'k':14}
+CODE_PIECE = {v: k for k, v in PIECE_CODE.items()}
+PROMO_CODE = {None:0, 'q':1, 'r':2, 'b':3, 'n':4}
+CODE_PROMO = {v: k for k, v in PROMO_CODE.items()}
+
+def pack_position(st: State) -> bytes:
+    flat = [PIECE_CODE[p] for row in st.board for p in row]
+    board = bytes(flat[i] << 4 | flat[i+1] for i in range(0, 64, 2))
+    flags = (st.turn == 'black') | st.wkc << 1 | st.wqc << 2 | st.bkc << 3 | st.bqc << 4
+    ep = st.en_passant[1] + 1 if st.en_passant else 0
+    return SNAPSHOT.pack(board, flags, ep, st.halfmove_clock, st.fullmove_number)
+
+def unpack_position(data: bytes) -> State:
+    board, flags, ep, halfmove_clock, fullmove_number = SNAPSHOT.unpack(data)
+    st = State()
+    try:
+        flat = [CODE_PIECE[c] for byte in board for c in (byte >> 4, byte & 15)]
+    except KeyError:
+        raise ValueError("sauvegarde invalide (code de pièce)")
+    st.board = [flat[y*8:y*8+8] for y in range(8)]
+    st.turn = 'black' if flags & 1 else 'white'
+    st.wkc, st.wqc, st.bkc, st.bqc = bool(flags & 2), bool(flags & 4), bool(flags & 8), bool(flags & 16)
+    st.en_passant = None if ep == 0 else ((2 if st.turn == 'white' else 5), ep - 1)
+    if st.en_passant is not None and not en_passant_possible(st.board, st.turn, st.en_passant): st.en_passant = None
+    st.halfmove_clock, st.fullmove_number = halfmove_clock, fullmove_number
+    if sum(row.count('K') for row in st.board) != 1 or sum(row.count('k') for row in st.board) != 1:
+        raise ValueError("sauvegarde invalide (un roi par camp attendu)")
+    sync_state(st)
     return st
 
+def pack_move(m: Move) -> bytes:
+    (y1,x1),(y2,x2),promo = m
+    return MOVE_RECORD.pack(y1*8+x1 | (y2*8+x2) << 6 | PROMO_CODE[promo] << 12)
+
+def snapshot_record(anchor: bytes, prior: Sequence[int]=()) -> bytes:
+    record = MOVE_RECORD.pack(SNAPSHOT_TAG) + anchor
+    if prior:
+        record += MOVE_RECORD.pack(HISTORY_TAG) + MOVE_RECORD.pack(len(prior)) + struct.pack(f"<{len(prior)}Q", *prior)
+    return record
+
+def prior_history(st: State) -> array:
+    """Hash des positions avant st qui peuvent encore se répéter (depuis le dernier coup irréversible)."""
+    hist = st.history
+    end = len(hist) - 1 if hist and hist[-1] == st.hash else len(hist)
+    return array('Q', hist[max(0, end - st.halfmove_clock, end - 0xFFFF):end])
+
+class Journal:
+    """
+    Position au dernier coup irréversible (instantané) et coups joués depuis : de quoi
+    reconstruire la position et son historique de répétitions. Avec un fichier ouvert
+    (open), chaque coup y est ajouté (2 octets) et synchronisé sur disque.
+    """
+    def __init__(self, st: Optional[State]=None, moves: Iterable[Move]=(), anchor: Optional[bytes]=None,
+                 prior: Optional[array]=None):
+        self.anchor = anchor if anchor is not None else pack_position(st)
+        # Positions avant l'instantané (répétitions) : vide après un coup irréversible
+        self.prior = prior if prior is not None else prior_history(st) if anchor is None else array('Q')
+        self.moves: List[Move] = list(moves)
+        self.file = None
+        self.sync = True
+
+    def record(self, st: State, m: Move):
+        """À appeler après avoir joué m sur st."""
+        if st.halfmove_clock == 0: self.anchor, self.prior, self.moves = pack_position(st), array('Q'), []
+        else: self.moves.append(m)
+        if self.file: self._append(pack_move(m))
+
+    def reset(self, st: State, loaded: Optional['Journal']=None):
+        """Nouvelle position (chargement, FEN) : nouvel instantané, repris de loaded s'il est donné."""
+        if loaded: self.anchor, self.prior, self.moves = loaded.anchor, array('Q', loaded.prior), list(loaded.moves)
+        else: self.anchor, self.prior, self.moves = pack_position(st), prior_history(st), []
+        if self.file: self._append(self.encode()[len(SAVE_MAGIC):])
+
+    def encode(self) -> bytes:
+        return SAVE_MAGIC + snapshot_record(self.anchor, self.prior) + b"".join(pack_move(m) for m in self.moves)
+
+    def write(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.encode())
+
+    def open(self, path: str, sync: bool=True):
+        """Réécrit path (instantané + coups) puis y ajoute chaque coup joué."""
+        self.close()
+        self.write(path)
+        self.file = open(path, "ab")
+        self.sync = sync
+
+    def close(self):
+        if self.file: self.file.close(); self.file = None
+
+    def _append(self, data: bytes):
+        self.file.write(data)
+        self.file.flush()
+        if self.sync: os.fsync(self.file.fileno())
+
+    def replay(self) -> State:
+        """Position finale, historique des répétitions reconstruit en rejouant les coups."""
+        st = unpack_position(self.anchor)
+        st.history = array('Q', self.prior)
+        register_position(st)
+        for i, (a, b, promo) in enumerate(self.moves):
+            if b not in legal_move_table(st).get(a, ()):
+                raise ValueError(f"sauvegarde invalide (coup illégal n°{i+1} : {move_to_alg((a, b, promo))})")
+            apply_move(st, a, b, promotion_choice=promo or 'q')
+        return st
+
+DEFAULT_SAVE = "game.mcs"
+LEGACY_SAVE = "game.json"       # nom par défaut des anciennes sauvegardes JSON
+
+def default_load_path() -> str:
+    """game.mcs, ou l'ancienne game.json tant qu'aucune sauvegarde binaire n'existe."""
+    return DEFAULT_SAVE if os.path.exists(DEFAULT_SAVE) or not os.path.exists(LEGACY_SAVE) else LEGACY_SAVE
+
+def read_journal(path: str) -> Journal:
+    with open(path, "rb") as f:
+        return parse_journal(f.read(), path)
+
+def parse_journal(data: bytes, path: str="sauvegarde") -> Journal:
+    """Dernier instantané et coups qui le suivent (un enregistrement tronqué en fin est ignoré)."""
+    if not data.startswith(SAVE_MAGIC): raise ValueError(f"{path}: pas une sauvegarde binaire")
+    anchor: Optional[bytes] = None
+    prior = array('Q')
+    moves: List[Move] = []
+    i = len(SAVE_MAGIC)
+    while i + MOVE_RECORD.size <= len(data):
+        (v,) = MOVE_RECORD.unpack_from(data, i)
+        i += MOVE_RECORD.size
+        if v == SNAPSHOT_TAG:
+            if i + SNAPSHOT.size > len(data): break
+            anchor, prior, moves = data[i:i+SNAPSHOT.size], array('Q'), []
+            i += SNAPSHOT.size
+            continue
+        if v == HISTORY_TAG and anchor is not None and not moves:
+            if i + MOVE_RECORD.size > len(data): break
+            (n,) = MOVE_RECORD.unpack_from(data, i)
+            end = i + MOVE_RECORD.size + 8 * n
+            if end > len(data): break
+            prior = array('Q', struct.unpack_from(f"<{n}Q", data, i + MOVE_RECORD.size))
+            i = end
+            continue
+        if anchor is None or v >> 15 or (v >> 12) & 7 not in CODE_PROMO:
+            raise ValueError(f"{path}: enregistrement invalide à l'octet {i - MOVE_RECORD.size}")
+        a, b = v & 63, (v >> 6) & 63
+        moves.append(((a >> 3, a & 7), (b >> 3, b & 7), CODE_PROMO[(v >> 12) & 7]))
+    if anchor is None: raise ValueError(f"{path}: aucun instantané")
+    return Journal(moves=moves, anchor=anchor, prior=prior)
+
 def game_help():
     print("Commandes :")
     print("  e2e4            -> jouer un coup")
     print("  moves e2        -> lister coups légaux depuis e2")
-    print("  save [fichier]  -> sauvegarder (par défaut game.json)")
-    print("  load [fichier]  -> charger (par défaut game.json)")
+    print("  save [fichier]  -> sauvegarder (par défaut game.mcs, binaire ; JSON si le nom finit par .json)")
+    print("  load [fichier]  -> charger (par défaut game.mcs, sinon l'ancienne game.json ; binaire ou JSON)")
+    print("  journal fichier -> enregistrer chaque coup dans fichier au fil de la partie (journal off : arrêter)")
+    print("  perft N [list|array] -> compter les positions à N demi-coups (plateau du jeu, ou copie en tableau 10x12)")
+    print("  divide N [list|array]-> perft détaillé par coup")
+    print("  bot [ms]        -> l'ordinateur joue le coup (1000 ms par défaut)")
+    print("  fen [FEN]       -> afficher la FEN de la position, ou charger une FEN")
+    print("  stats [on|off|reset|json fichier] -> mesurer les fonctions des règles (appels, temps, par tour)")
+    print("  tablebase [dossier|off] -> ouvrir des tables de finales (arbitrage et recherche)")
     print("  quit            -> quitter")
     print("Coups spéciaux : roque (e1g1/e1c1/e8g8/e8c8), en passant, promotion (q/r/b/n).")
 
 def game_loop():
     st = State()
     register_position(st)  # position initiale
+    journal = Journal(st)
+    instr = None    # module instrument, chargé par la commande stats
     while True:
+        if instr is not None and instr.enabled(): instr.end_turn()
         print_board(st.board)
         print(f"Trait aux {'Blancs' if st.turn=='white' else 'Noirs'}  |  Coup #{st.fullmove_number}  |  50-coups={st.halfmove_clock}")
         msg = game_status(st)
         if msg:
             print(msg)
-            if msg.startswith("Échec et mat") or msg.startswith("Pat") or msg.startswith("Match nul"):
+            if msg.startswith(("Échec et mat", "Pat", "Match nul", "Fin arbitrée")):
                 break
         cmd = input(f"{'Blanc' if st.turn=='white' else 'Noir'} > ").strip()
 
         if cmd in ('h','help','?'):
             game_help(); continue
         if cmd in ('q','quit','exit'):
+            journal.close()
             print("Fin de partie."); break
         if cmd.startswith("moves "):
             sq = cmd.split(maxsplit=1)[1]
@@ -495,25 +1236,110 @@ def game_loop():
             (y,x),_ = m
             if piece_color(st.board[y][x]) != st.turn:
                 print("Pas votre pièce."); continue
-            dests = legal_moves_for_piece(st, (y,x))
+            dests = legal_move_table(st).get((y,x), [])
             if not dests: print("(aucun coup légal)")
             else:
                 print("Coups possibles :", ", ".join(sq + idx_to_alg(dy,dx) for (dy,dx) in dests))
             continue
+        if cmd.startswith("perft ") or cmd.startswith("divide "):
+            parts = cmd.split()
+            name = parts[0]
+            if len(parts) not in (2,3) or not parts[1].isdigit() or parts[2:] not in ([], ["array"], ["list"]):
+                print(f"Usage: {name} N [list|array]"); continue
+            depth = int(parts[1])
+            pos, perft_fn, divide_fn = st, perft, divide
+            if parts[2:] == ["array"]:
+                import board_array
+                pos, perft_fn, divide_fn = board_array.from_state(st), board_array.perft, board_array.divide
+            t0 = time.perf_counter()
+            if name == "divide":
+                counts = divide_fn(pos, depth)
+                for mv in sorted(counts): print(f"  {mv}: {counts[mv]}")
+                nodes = sum(counts.values())
+            else:
+                nodes = perft_fn(pos, depth)
+            dt = time.perf_counter() - t0
+            print(f"perft({depth}) = {nodes}  ({dt:.2f}s, {nodes/dt if dt > 0 else 0:.0f} noeuds/s)")
+            continue
+        if cmd == "bot" or cmd.startswith("bot "):
+            parts = cmd.split()
+            if len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+                print("Usage: bot [ms]"); continue
+            import engine
+            r = engine.default_engine().search(st, int(parts[1]) if len(parts) == 2 else 1000)
+            if r.move is None: print("(aucun coup légal)"); continue
+            print(engine.format_info(r))
+            print(f"🤖 {move_to_alg(r.move)}")
+            apply_move(st, r.move[0], r.move[1], promotion_choice=r.move[2])
+            journal.record(st, r.move)
+            continue
+        if cmd == "fen" or cmd.startswith("fen "):
+            parts = cmd.split(maxsplit=1)
+            if len(parts) == 1: print(state_to_fen(st)); continue
+            try:
+                st = state_from_fen(parts[1])
+                journal.reset(st)
+            except ValueError as e:
+                print("Erreur FEN:", e)
+            continue
+        if cmd == "stats" or cmd.startswith("stats "):
+            import instrument as instr
+            parts = cmd.split()
+            if parts[1:] == ["on"]: instr.enable(); print("Mesures activées.")
+            elif parts[1:] == ["off"]: instr.disable(); print("Mesures désactivées.")
+            elif parts[1:] == ["reset"]: instr.reset(); print("Compteurs remis à zéro.")
+            elif len(parts) == 3 and parts[1] == "json":
+                instr.dump_json(parts[2]); print(f"✅ Compteurs écrits dans {os.path.abspath(parts[2])}")
+            elif len(parts) == 1:
+                print(instr.format_report() if instr.enabled() or any(c[0] for c in instr.totals().values())
+                      else "Aucune mesure (stats on pour activer).")
+            else: print("Usage: stats [on|off|reset|json fichier]")
+            continue
+        if cmd == "tablebase" or cmd.startswith("tablebase "):
+            import tablebase
+            parts = cmd.split(maxsplit=1)
+            if len(parts) == 1:
+                names = sorted(ENDGAME_TABLES.tables) if ENDGAME_TABLES is not None else []
+                print("Tables de finales :", ", ".join(names) if names else "(aucune)")
+            elif parts[1] == "off":
+                tablebase.use(None); print("Tables de finales fermées.")
+            else:
+                try:
+                    tables = tablebase.use([parts[1]])
+                    print(f"✅ Tables de finales : {', '.join(sorted(tables.tables)) or '(aucune)'}")
+                except (OSError, ValueError) as e:
+                    print("Erreur tables:", e)
+            continue
+        if cmd == "journal" or cmd.startswith("journal "):
+            parts = cmd.split(maxsplit=1)
+            if len(parts) == 1:
+                print(f"Journal : {journal.file.name if journal.file else '(aucun fichier)'}, {len(journal.moves)} coup(s) depuis l'instantané")
+            elif parts[1] == "off":
+                journal.close(); print("Journal arrêté.")
+            else:
+                try:
+                    journal.open(parts[1])
+                    print(f"✅ Journal dans {os.path.abspath(parts[1])}")
+                except OSError as e:
+                    print("Erreur journal:", e)
+            continue
         if cmd.startswith("save"):
             parts = cmd.split(maxsplit=1)
-            path = parts[1] if len(parts)==2 else "game.json"
+            path = parts[1] if len(parts)==2 else DEFAULT_SAVE
             try:
-                save_state(st, path)
+                save_state(st, path, journal)
                 print(f"✅ Sauvegardé dans {os.path.abspath(path)}")
             except Exception as e:
                 print("Erreur sauvegarde:", e)
             continue
         if cmd.startswith("load"):
             parts = cmd.split(maxsplit=1)
-            path = parts[1] if len(parts)==2 else "game.json"
+            path = parts[1] if len(parts)==2 else default_load_path()
             try:
-                st = load_state(path)
+                with open(path, "rb") as f: binary = f.read(len(SAVE_MAGIC)) == SAVE_MAGIC
+                loaded = read_journal(path) if binary else None
+                st = loaded.replay() if loaded else load_state(path)
+                journal.reset(st, loaded)
                 print(f"✅ Chargé depuis {os.path.abspath(path)}")
             except Exception as e:
                 print("Erreur chargement:", e)
@@ -524,9 +1350,19 @@ def game_loop():
             print("Format invalide. Exemple: e2e4, 'moves e2', 'save', 'load', 'quit'.")
             continue
         a,b = m
+        pawn = st.board[a[0]][a[1]] in 'Pp'
         if not make_move_if_legal(st, a, b):
             print("Coup illégal.")
             continue
+        journal.record(st, (a, b, st.board[b[0]][b[1]].lower() if pawn and b[0] in (0,7) else None))
 
 if __name__ == "__main__":
+    # Les modules annexes (board_array, ...) importent chess_cli_v2 : partager ce module-ci
+    sys.modules.setdefault("chess_cli_v2", sys.modules[__name__])
+    if sys.argv[1:2] == ["--profile"]:
+        import instrument
+        sys.exit(instrument.main(sys.argv[1:]))
+    if sys.argv[1:2] == ["--uci"]:
+        import uci
+        sys.exit(uci.main(sys.argv[2:]))
     game_loop()
@@ -0,0 +1,317 @@
+# engine.py — moteur de recherche pour jouer contre l'ordinateur / analyser une position.
+# Negamax alpha-beta sur les règles de chess_cli_v2 (State, make_move/unmake_move) :
+# - approfondissement itératif sous budget de temps (ms) et/ou de noeuds
+# - tri des coups : coup de la table, prises MVV-LVA, coups killer, historique
+# - recherche de quiescence (prises et promotions)
+# - table de transposition de taille fixe (remplacement : profondeur + âge)
+# - évaluation incrémentale tenue par State (chess_cli_v2.evaluate, O(1) par noeud)
+# - tables de finales (tablebase.py) si ouvertes : score exact sans chercher plus loin
+#   python engine.py --fen "<FEN>" --time 2000 [--jobs 4]
+import sys
+import time
+from typing import List, Tuple, Optional, Dict, NamedTuple, Callable
+
+import chess_cli_v2
+from chess_cli_v2 import (
+    State, Move, generate_legal_moves, make_move, unmake_move, in_check, move_to_alg,
+    state_from_fen, repetition_count, register_position, unregister_position, evaluate, PIECE_VALUE,
+)
+
+MATE = 100000
+MATE_BOUND = MATE - 1000        # au-delà : score de mat (distance en demi-coups)
+INF = MATE + 1
+MAX_PLY = 128                   # profondeur maximale depuis la racine (quiescence comprise)
+
+# Table de transposition : entrées (clé, profondeur, score, borne, coup, génération)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class SearchAborted(Exception):
+    pass
+
+class SearchResult(NamedTuple):
+    move: Optional[Move]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    nps: float
+    tt_hit_rate: float
+    pv: List[Move]
+
+def score_to_str(score: int) -> str:
+    if score >= MATE_BOUND: return f"mat en {(MATE - score + 1)//2}"
+    if score <= -MATE_BOUND: return f"maté en {(MATE + score + 1)//2}"
+    return f"{score/100:+.2f}"
+
+class Engine:
+    def __init__(self, tt_bits: int=18):
+        self.tt_size = 1 << tt_bits
+        self.tt: List[Optional[tuple]] = [None] * self.tt_size
+        self.generation = 0
+        self.stopped = False
+        self.tables = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tb_hits = 0
+        self.killers: List[List[Optional[Move]]] = [[None, None] for _ in range(MAX_PLY)]
+        self.history: Dict[Tuple, int] = {}
+        self._undo_stack: list = []
+
+    def clear(self):
+        self.tt = [None] * self.tt_size
+        self.generation = 0
+
+    def stop(self):
+        """Demande l'arrêt de la recherche en cours (rend le meilleur coup connu)."""
+        self.stopped = True
+
+    # --- table de transposition ---
+    def tt_probe(self, key: int) -> Optional[tuple]:
+        self.tt_probes += 1
+        e = self.tt[key & (self.tt_size - 1)]
+        if e is not None and e[0] == key:
+            self.tt_hits += 1
+            return e
+        return None
+
+    def tt_store(self, key: int, depth: int, score: int, flag: int, move: Optional[Move]):
+        i = key & (self.tt_size - 1)
+        e = self.tt[i]
+        # Remplacer une entrée d'une recherche précédente, la même position, ou moins profonde
+        if e is None or e[5] != self.generation or e[0] == key or depth >= e[1]:
+            if move is None and e is not None and e[0] == key: move = e[4]
+            self.tt[i] = (key, depth, score, flag, move, self.generation)
+
+    # --- tri des coups ---
+    def order(self, st: State, moves: List[Move], tt_move: Optional[Move], ply: int) -> List[Move]:
+        board = st.board
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        hist = self.history
+        def key(m: Move) -> int:
+            if m == tt_move: return -10_000_000
+            (y1,x1),(y2,x2),promo = m
+            victim = board[y2][x2]
+            if victim != '.' or (st.en_passant == (y2,x2) and board[y1][x1] in 'Pp'):
+                v = PIECE_VALUE[victim.upper()] if victim != '.' else 100
+                return -1_000_000 - 10*v + PIECE_VALUE[board[y1][x1].upper()] // 10
+            if promo: return -900_000 - PIECE_VALUE[promo.upper()]
+            if m == killers[0]: return -800_000
+            if m == killers[1]: return -799_999
+            return -hist.get((st.turn, m[0], m[1]), 0)
+        return sorted(moves, key=key)
+
+    def is_capture(self, st: State, m: Move) -> bool:
+        (y1,x1),(y2,x2),_ = m
+        return st.board[y2][x2] != '.' or (st.en_passant == (y2,x2) and st.board[y1][x1] in 'Pp' and x1 != x2)
+
+    # --- recherche ---
+    def _check_limits(self):
+        if self.stopped or (self.deadline is not None and time.perf_counter() >= self.deadline) \
+           or (self.node_limit is not None and self.nodes >= self.node_limit):
+            raise SearchAborted()
+
+    # Coups joués dans l'arbre : positions ajoutées à l'historique (répétitions) et
+    # pile d'annulation pour remettre la position en place si la recherche est interrompue
+    def _play(self, st: State, m: Move):
+        self._undo_stack.append(make_move(st, m[0], m[1], m[2]))
+        register_position(st)
+
+    def _undo(self, st: State):
+        unregister_position(st)
+        unmake_move(st, self._undo_stack.pop())
+
+    def _restore(self, st: State):
+        while self._undo_stack: self._undo(st)
+
+    def quiesce(self, st: State, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 255 == 0: self._check_limits()
+        if ply >= MAX_PLY: return evaluate(st)
+        # En échec, pas d'évaluation statique : toutes les parades sont cherchées (mat si aucune)
+        if in_check(st.board, st.turn, st.kings[st.turn]):
+            moves = generate_legal_moves(st)
+            if not moves: return -MATE + ply
+        else:
+            stand = evaluate(st)
+            if stand >= beta: return stand
+            if stand > alpha: alpha = stand
+            moves = [m for m in generate_legal_moves(st) if m[2] is not None or self.is_capture(st, m)]
+        for m in self.order(st, moves, None, ply):
+            self._play(st, m)
+            score = -self.quiesce(st, -beta, -alpha, ply + 1)
+            self._undo(st)
+            if score >= beta: return score
+            if score > alpha: alpha = score
+        return alpha
+
+    def negamax(self, st: State, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 255 == 0: self._check_limits()
+        # Nulles : 50 coups, répétition (une seule suffit dans l'arbre)
+        if ply > 0:
+            if st.halfmove_clock >= 100: return 0
+            if repetition_count(st) >= 2: return 0
+            # Finale dans une table : résultat exact, mat compté depuis la racine
+            if self.tables is not None:
+                r = self.tables.probe(st)
+                if r is not None:
+                    self.tb_hits += 1
+                    return 0 if r.wdl == 0 else MATE - ply - r.plies if r.wdl > 0 else -MATE + ply + r.plies
+        checked = in_check(st.board, st.turn, st.kings[st.turn])
+        if checked: depth += 1          # extension d'échec
+        if depth <= 0: return self.quiesce(st, alpha, beta, ply)
+
+        key = st.hash
+        alpha0 = alpha
+        e = self.tt_probe(key)
+        tt_move = None
+        if e is not None:
+            tt_move = e[4]
+            if ply > 0 and e[1] >= depth:
+                score = e[2]
+                if score >= MATE_BOUND: score -= ply          # mat stocké relatif au noeud
+                elif score <= -MATE_BOUND: score += ply
+                if e[3] == EXACT: return score
+                if e[3] == LOWER and score >= beta: return score
+                if e[3] == UPPER and score <= alpha: return score
+
+        moves = generate_legal_moves(st)
+        if not moves:
+            return -MATE + ply if checked else 0
+
+        best, best_move = -INF, None
+        for m in self.order(st, moves, tt_move, ply):
+            self._play(st, m)
+            score = -self.negamax(st, depth - 1, -beta, -alpha, ply + 1)
+            self._undo(st)
+            if score > best:
+                best, best_move = score, m
+                if ply == 0: self.root_best = (m, score)
+            if score > alpha: alpha = score
+            if alpha >= beta:
+                if not self.is_capture(st, m) and m[2] is None:
+                    k = self.killers[ply] if ply < len(self.killers) else None
+                    if k is not None and k[0] != m: k[1] = k[0]; k[0] = m
+                    hk = (st.turn, m[0], m[1])
+                    self.history[hk] = self.history.get(hk, 0) + depth*depth
+                break
+
+        flag = LOWER if best >= beta else EXACT if best > alpha0 else UPPER
+        stored = best + ply if best >= MATE_BOUND else best - ply if best <= -MATE_BOUND else best
+        self.tt_store(key, depth, stored, flag, best_move)
+        return best
+
+    def principal_variation(self, st: State, depth: int) -> List[Move]:
+        pv: List[Move] = []
+        undos = []
+        seen = set()
+        for _ in range(depth):
+            e = self.tt[st.hash & (self.tt_size - 1)]
+            if e is None or e[0] != st.hash or e[4] is None or st.hash in seen: break
+            if e[4] not in generate_legal_moves(st): break
+            seen.add(st.hash)
+            pv.append(e[4])
+            undos.append(make_move(st, e[4][0], e[4][1], e[4][2]))
+        for u in reversed(undos): unmake_move(st, u)
+        return pv
+
+    def search_node(self, st: State, depth: int, alpha: int, beta: int,
+                    time_ms: Optional[int]=None) -> Tuple[Optional[int], List[Move]]:
+        """Score et variation d'un fils de la racine (ply 1) à profondeur fixe, pour la recherche
+        répartie (parallel.py) ; score None si le temps est écoulé."""
+        self._reset_stats()
+        self.stopped = False
+        self.tables = chess_cli_v2.ENDGAME_TABLES
+        self.deadline = None if time_ms is None else time.perf_counter() + time_ms / 1000
+        self.node_limit = None
+        try:
+            score = self.negamax(st, depth, alpha, beta, 1)
+        except SearchAborted:
+            self._restore(st)
+            return None, []
+        return score, self.principal_variation(st, depth)
+
+    def search(self, st: State, time_ms: Optional[int]=1000, max_depth: int=64, max_nodes: Optional[int]=None,
+               on_info: Optional[Callable[[SearchResult], None]]=None) -> SearchResult:
+        """Approfondissement itératif ; s'arrête au budget (temps, noeuds, profondeur) ou sur stop()."""
+        self._reset_stats()
+        self.stopped = False
+        self.tables = chess_cli_v2.ENDGAME_TABLES
+        self.generation = (self.generation + 1) & 0xFF
+        t0 = time.perf_counter()
+        self.deadline = None if time_ms is None else t0 + time_ms / 1000
+        self.node_limit = max_nodes
+        moves = generate_legal_moves(st)
+        result = SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0, 0.0, 0.0, [])
+        if not moves: return result
+        for depth in range(1, max_depth + 1):
+            self.root_best = None
+            try:
+                score = self.negamax(st, depth, -INF, INF, 0)
+            except SearchAborted:
+                self._restore(st)
+                # Le coup précédent est cherché en premier : un meilleur coup racine déjà trouvé le bat
+                if self.root_best is not None:
+                    result = result._replace(move=self.root_best[0], score=self.root_best[1])
+                break
+            elapsed = time.perf_counter() - t0
+            move = self.root_best[0] if self.root_best else result.move
+            result = SearchResult(move, score, depth, self.nodes, elapsed,
+                                  self.nodes / elapsed if elapsed > 0 else 0.0,
+                                  self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+                                  self.principal_variation(st, depth))
+            if on_info: on_info(result)
+            if abs(score) >= MATE_BOUND: break
+            # Inutile de commencer une itération qui n'aura pas le temps de finir
+            if self.deadline is not None and time.perf_counter() - t0 > (self.deadline - t0) / 2: break
+        elapsed = time.perf_counter() - t0
+        return result._replace(nodes=self.nodes, seconds=elapsed, nps=self.nodes / elapsed if elapsed > 0 else 0.0,
+                               tt_hit_rate=self.tt_hits / self.tt_probes if self.tt_probes else 0.0)
+
+_default_engine: Optional[Engine] = None
+
+def best_move(st: State, time_ms: int=1000) -> Optional[Move]:
+    """Meilleur coup trouvé en time_ms millisecondes (table de transposition conservée entre appels)."""
+    return default_engine().search(st, time_ms).move
+
+def default_engine() -> Engine:
+    global _default_engine
+    if _default_engine is None: _default_engine = Engine()
+    return _default_engine
+
+def format_info(r: SearchResult) -> str:
+    return (f"profondeur {r.depth}  score {score_to_str(r.score)}  noeuds {r.nodes}  "
+            f"{r.nps:.0f} n/s  TT {100*r.tt_hit_rate:.0f}%  pv {' '.join(move_to_alg(m) for m in r.pv)}")
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="analyse d'une position")
+    ap.add_argument("--fen", default="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    ap.add_argument("--time", type=int, default=2000, help="budget en millisecondes")
+    ap.add_argument("--depth", type=int, default=64)
+    ap.add_argument("--nodes", type=int, default=None)
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="processus (découpage à la racine, sans limite de noeuds)")
+    ap.add_argument("--tablebases", metavar="DOSSIER", help="tables de finales (tablebase.py)")
+    args = ap.parse_args(argv)
+    if args.tablebases:
+        import tablebase
+        tablebase.use([args.tablebases])
+    st = state_from_fen(args.fen)
+    if args.jobs > 1:
+        import parallel
+        pe = parallel.ParallelEngine(args.jobs)
+        try:
+            r = pe.search(st, args.time, args.depth, on_info=lambda r: print(format_info(r)))
+        finally:
+            pe.close()
+    else:
+        r = Engine().search(st, args.time, args.depth, args.nodes, on_info=lambda r: print(format_info(r)))
+    print("meilleur coup :", move_to_alg(r.move) if r.move else "(aucun)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# instrument.py — mesure des fonctions chaudes des règles (appels, temps cumulé) et métriques par tour.
+# Désactivé, il ne coûte rien : enable() remplace les fonctions de chess_cli_v2 (et les noms
+# importés par les modules du projet, PROJECT_MODULES) par des enveloppes qui comptent,
+# disable() remet les originales. Le temps d'une fonction inclut celui des fonctions qu'elle
+# appelle. Chaque thread a ses compteurs (pas de verrou par appel) ; totals() les additionne.
+#   python instrument.py --profile [rapport.txt]     (charge fixe sous cProfile)
+#   python chess_cli_v2.py --profile [rapport.txt]
+import json
+import os
+import sys
+import threading
+import time
+from typing import List, Tuple, Optional, Dict, Callable
+
+import chess_cli_v2
+
+# (nom, compter la taille du résultat) ; "State.clone" désigne la méthode
+HOT_FUNCTIONS: List[Tuple[str, bool]] = [
+    ("square_attacked_by", False),
+    ("in_check", False),
+    ("legality_info", False),
+    ("legal_moves_for_piece", True),
+    ("legal_move_table", False),
+    ("generate_legal_moves", True),
+    ("has_legal_moves", False),
+    ("make_move", False),
+    ("unmake_move", False),
+    ("apply_move", False),
+    ("State.clone", False),
+    ("position_key", False),
+    ("repetition_count", False),
+    ("position_status", False),
+    ("game_status", False),
+    ("evaluate", False),
+]
+
+# Métriques par tour : nom affiché -> (fonction, 0 = appels / 2 = taille des résultats)
+TURN_METRICS: Dict[str, Tuple[str, int]] = {
+    "coups générés": ("legal_moves_for_piece", 2),
+    "clones": ("State.clone", 0),
+    "requêtes d'attaque": ("square_attacked_by", 0),
+    "tests d'échec": ("in_check", 0),
+}
+
+# Modules qui importent des fonctions des règles par leur nom ("from chess_cli_v2 import ...")
+PROJECT_MODULES = [
+    "chess_cli_v2", "board_array", "bitboard", "engine", "parallel", "batch", "batch_status", "replay",
+    "server", "loadgen", "selfplay", "tablebase", "uci", "bench_perft", "bench_memory", "instrument",
+]
+
+# Compteurs d'un thread : nom -> [appels, nanosecondes, éléments]
+_local = threading.local()
+_thread_counters: List[Dict[str, List[int]]] = []
+_lock = threading.Lock()
+_originals: Dict[str, Callable] = {}
+_turns: List[Dict[str, int]] = []
+_turn_start: Dict[str, List[int]] = {}
+
+def enabled() -> bool:
+    return bool(_originals)
+
+def _counters() -> Dict[str, List[int]]:
+    """Compteurs du thread courant (créés et enregistrés au premier appel mesuré)."""
+    d = getattr(_local, "counters", None)
+    if d is None:
+        d = _local.counters = {name: [0, 0, 0] for name, _ in HOT_FUNCTIONS}
+        with _lock: _thread_counters.append(d)
+    return d
+
+def totals() -> Dict[str, List[int]]:
+    """Somme des compteurs de tous les threads : nom -> [appels, nanosecondes, éléments]."""
+    total = {name: [0, 0, 0] for name, _ in HOT_FUNCTIONS}
+    with _lock: per_thread = list(_thread_counters)
+    for d in per_thread:
+        for name, c in d.items():
+            t = total[name]; t[0] += c[0]; t[1] += c[1]; t[2] += c[2]
+    return total
+
+def _wrap(name: str, fn: Callable, items: bool) -> Callable:
+    clock = time.perf_counter_ns
+    if items:
+        def wrapper(*args, **kw):
+            t = clock(); r = fn(*args, **kw)
+            c = _counters()[name]
+            c[1] += clock() - t; c[0] += 1; c[2] += len(r)
+            return r
+    else:
+        def wrapper(*args, **kw):
+            t = clock(); r = fn(*args, **kw)
+            c = _counters()[name]
+            c[1] += clock() - t; c[0] += 1
+            return r
+    wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+    return wrapper
+
+def _project_modules() -> List:
+    mods = [sys.modules[name] for name in PROJECT_MODULES if name in sys.modules]
+    # Script lancé directement (python selfplay.py) : son module s'appelle __main__
+    main = sys.modules.get("__main__")
+    here = os.path.dirname(os.path.abspath(__file__))
+    if main is not None and os.path.dirname(os.path.abspath(getattr(main, "__file__", "") or ".")) == here:
+        mods.append(main)
+    return mods
+
+def _rebind(old: Callable, new: Callable):
+    # Les modules du projet ont fait "from chess_cli_v2 import ..." : remplacer aussi leurs noms
+    for mod in _project_modules():
+        d = mod.__dict__
+        for k, v in list(d.items()):
+            if v is old: d[k] = new
+
+def enable():
+    if enabled(): return
+    for name, items in HOT_FUNCTIONS:
+        if name == "State.clone":
+            fn = chess_cli_v2.State.clone
+            _originals[name] = fn
+            chess_cli_v2.State.clone = _wrap(name, fn, items)
+            continue
+        fn = getattr(chess_cli_v2, name)
+        _originals[name] = fn
+        _rebind(fn, _wrap(name, fn, items))
+    end_turn()
+
+def disable():
+    for name, fn in _originals.items():
+        if name == "State.clone": chess_cli_v2.State.clone = fn
+        else: _rebind(getattr(chess_cli_v2, name), fn)
+    _originals.clear()
+
+def reset():
+    with _lock:
+        for d in _thread_counters:
+            for c in d.values(): c[0] = c[1] = c[2] = 0
+    _turns.clear()
+    _turn_start.clear()
+
+def end_turn():
+    """Clôt le tour en cours : ses métriques sont la différence depuis le tour précédent."""
+    counters = totals()
+    if _turn_start:
+        turn = {}
+        for label, (name, i) in TURN_METRICS.items():
+            turn[label] = counters[name][i] - _turn_start[name][i]
+        _turns.append(turn)
+    _turn_start.update(counters)
+
+def snapshot() -> Dict:
+    """État des compteurs, sérialisable en JSON."""
+    return {
+        "functions": {name: {"calls": c[0], "seconds": c[1] / 1e9, **({"items": c[2]} if c[2] else {})}
+                      for name, c in totals().items() if c[0]},
+        "turns": len(_turns),
+        "last_turn": _turns[-1] if _turns else {},
+    }
+
+def merge(total: Dict[str, List[int]], snap: Dict):
+    """Additionne un snapshot() (d'un autre processus) dans total : nom -> [appels, ns, éléments]."""
+    for name, f in snap["functions"].items():
+        c = total.setdefault(name, [0, 0, 0])
+        c[0] += f["calls"]; c[1] += int(f["seconds"] * 1e9); c[2] += f.get("items", 0)
+
+def dump_json(path: str, snap: Optional[Dict]=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snap or snapshot(), f, ensure_ascii=False, indent=2)
+
+def format_report(counters: Optional[Dict[str, List[int]]]=None) -> str:
+    counters = totals() if counters is None else counters
+    lines = [f"{'fonction':<24}{'appels':>10}{'total ms':>11}{'µs/appel':>10}{'éléments':>10}"]
+    for name, (calls, ns, items) in sorted(counters.items(), key=lambda kv: -kv[1][1]):
+        if not calls: continue
+        lines.append(f"{name:<24}{calls:>10}{ns/1e6:>11.1f}{ns/1e3/calls:>10.2f}{items or '':>10}")
+    if _turns:
+        last = _turns[-1]
+        lines.append("dernier tour : " + ", ".join(f"{k} {v}" for k, v in last.items()))
+        lines.append(f"moyenne sur {len(_turns)} tours : " +
+                     ", ".join(f"{k} {sum(t[k] for t in _turns) / len(_turns):.0f}" for k in TURN_METRICS))
+    return "\n".join(lines)
+
+def workload():
+    """Charge fixe et reproductible : perft des positions de référence, parties aléatoires, recherche."""
+    import random
+    import engine
+    from bench_perft import POSITIONS
+    from chess_cli_v2 import State, state_from_fen, perft, register_position, generate_legal_moves, apply_move, position_status
+    for _, fen, _ in POSITIONS: perft(state_from_fen(fen), 2)
+    rng = random.Random(17)
+    for _ in range(20):
+        st = State(); register_position(st)
+        for _ in range(80):
+            if position_status(st) not in ("ok", "check"): break
+            moves = generate_legal_moves(st)
+            a, b, promo = rng.choice(moves)
+            apply_move(st, a, b, promotion_choice=promo)
+            end_turn()
+    engine.Engine().search(state_from_fen(POSITIONS[1][1]), None, max_depth=3)
+
+def profile(path: str) -> str:
+    """Exécute workload() sous cProfile avec les compteurs actifs ; écrit le rapport dans path."""
+    import cProfile
+    import io
+    import pstats
+    reset()
+    enable()
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        prof.runcall(workload)
+    finally:
+        disable()
+    dt = time.perf_counter() - t0
+    out = io.StringIO()
+    out.write(f"Charge fixe : {dt:.2f}s (sous cProfile)\n\n== Compteurs ==\n{format_report()}\n\n== cProfile (temps cumulé) ==\n")
+    pstats.Stats(prof, stream=out).strip_dirs().sort_stats("cumulative").print_stats(30)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    return path
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="profil des règles sur une charge fixe")
+    ap.add_argument("--profile", nargs="?", const="profile.txt", metavar="RAPPORT", required=True,
+                    help="écrire le rapport (défaut profile.txt)")
+    ap.add_argument("--json", metavar="FICHIER", help="écrire aussi les compteurs en JSON")
+    args = ap.parse_args(argv)
+    path = profile(args.profile)
+    if args.json: dump_json(args.json)
+    print(f"Rapport écrit dans {path}")
+    print(format_report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
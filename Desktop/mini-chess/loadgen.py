@@ -0,0 +1,123 @@
+# loadgen.py — générateur de charge pour server.py.
+# Fait tourner N parties simultanées (coups aléatoires parmi les coups légaux), réparties sur
+# C connexions ; chaque partie terminée est remplacée jusqu'à la fin de la durée.
+# Rapporte la latence des coups (p50/p99), les coups/s et les parties terminées/s.
+#   python server.py --tcp 127.0.0.1:8765 &
+#   python loadgen.py --tcp 127.0.0.1:8765 --games 2000 --connections 100 --duration 20
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from typing import List, Optional, Dict, Any
+
+class Client:
+    """Une connexion ; les réponses sont rendues aux requêtes par leur id."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+        self.ids = itertools.count(1)
+        self.waiting: Dict[int, asyncio.Future] = {}
+        self.task = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line: break
+                res = json.loads(line)
+                fut = self.waiting.pop(res.get("id"), None)
+                if fut and not fut.done(): fut.set_result(res)
+        finally:
+            for fut in self.waiting.values():
+                if not fut.done(): fut.set_exception(ConnectionError("connexion fermée"))
+
+    async def request(self, op: str, **kw) -> Dict[str, Any]:
+        rid = next(self.ids)
+        fut = asyncio.get_running_loop().create_future()
+        self.waiting[rid] = fut
+        self.writer.write(json.dumps({"id": rid, "op": op, **kw}).encode() + b"\n")
+        await self.writer.drain()
+        res = await fut
+        if not res.get("ok"): raise RuntimeError(f"{op}: {res.get('error')}")
+        return res
+
+    async def close(self):
+        self.writer.close()
+        self.task.cancel()
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.games = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+def percentile(values: List[float], p: float) -> float:
+    if not values: return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p / 100 * len(s)))]
+
+async def play_games(client: Client, rng: random.Random, deadline: float, max_plies: int, stats: Stats):
+    while time.perf_counter() < deadline:
+        try:
+            game = (await client.request("new"))["game"]
+            finished = True
+            for _ in range(max_plies):
+                if time.perf_counter() >= deadline: finished = False; break
+                moves = (await client.request("moves", game=game))["moves"]
+                if not moves: break
+                t0 = time.perf_counter()
+                res = await client.request("move", game=game, move=rng.choice(moves))
+                stats.latencies.append(time.perf_counter() - t0)
+                if res["status"] not in ("ok", "check"): break
+            await client.request("close", game=game)
+            stats.games += finished
+        except RuntimeError:
+            stats.errors += 1
+
+async def connect(args) -> Client:
+    for attempt in range(50):
+        try:
+            if args.unix: r, w = await asyncio.open_unix_connection(args.unix, limit=1 << 20)
+            else:
+                host, _, port = args.tcp.rpartition(':')
+                r, w = await asyncio.open_connection(host or "127.0.0.1", int(port), limit=1 << 20)
+            return Client(r, w)
+        except OSError:
+            await asyncio.sleep(0.1)    # le serveur démarre peut-être encore
+    raise ConnectionError(f"serveur injoignable: {args.unix or args.tcp}")
+
+async def run(args) -> Stats:
+    clients = [await connect(args) for _ in range(min(args.connections, args.games))]
+    stats = Stats()
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    await asyncio.gather(*(play_games(clients[i % len(clients)], random.Random(args.seed + i), deadline,
+                                      args.plies, stats) for i in range(args.games)))
+    stats.seconds = time.perf_counter() - t0
+    for c in clients: await c.close()
+    return stats
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="charge sur server.py : parties simultanées à coups aléatoires")
+    where = ap.add_mutually_exclusive_group()
+    where.add_argument("--tcp", default="127.0.0.1:8765")
+    where.add_argument("--unix", help="chemin de la socket Unix du serveur")
+    ap.add_argument("--games", type=int, default=1000, help="parties simultanées")
+    ap.add_argument("--connections", type=int, default=100)
+    ap.add_argument("--duration", type=float, default=10.0, help="secondes")
+    ap.add_argument("--plies", type=int, default=60, help="demi-coups au plus par partie")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    stats = asyncio.run(run(args))
+    n = len(stats.latencies)
+    print(f"{args.games} parties simultanées sur {min(args.connections, args.games)} connexions, {stats.seconds:.1f}s")
+    print(f"  coups      : {n}  ({n/stats.seconds:.0f}/s)")
+    print(f"  latence    : p50 {1000*percentile(stats.latencies, 50):.1f} ms  p99 {1000*percentile(stats.latencies, 99):.1f} ms")
+    print(f"  parties    : {stats.games} terminées ({stats.games/stats.seconds:.1f}/s), {stats.errors} erreurs")
+    return 1 if stats.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
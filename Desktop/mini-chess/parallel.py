@@ -0,0 +1,183 @@
+# parallel.py — perft et recherche répartis sur plusieurs processus (un coeur par processus).
+# Découpage à la racine : chaque coup racine (ou chaque position à 2 demi-coups s'il y a trop
+# peu de coups pour occuper les processus) est une tâche. Les positions partent vers les
+# processus en FEN (plus l'historique des répétitions en octets pour la recherche), jamais
+# sous forme de State picklé.
+#   python parallel.py --fen "<FEN>" -d 5 -j 4
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import List, Tuple, Optional, Dict, Callable
+
+from chess_cli_v2 import (
+    State, Move, state_from_fen, state_to_fen, generate_legal_moves, make_move, unmake_move,
+    move_to_alg, in_check, perft,
+)
+
+# --- perft ---
+
+def backend_perft(backend: str, fen: str, depth: int) -> int:
+    """perft d'une position FEN avec le plateau demandé (exécuté dans un processus)."""
+    if backend == "array":
+        import board_array
+        return board_array.perft(board_array.from_fen(fen), depth)
+    if backend == "bitboard":
+        import bitboard
+        return bitboard.perft(bitboard.from_fen(fen), depth)
+    return perft(state_from_fen(fen), depth)
+
+def split_tasks(st: State, depth: int, jobs: int) -> List[Tuple[str, str, int]]:
+    """Tâches (coup racine, FEN, profondeur restante) ; découpe à 2 demi-coups si la racine est trop étroite."""
+    moves = generate_legal_moves(st)
+    split = 2 if depth >= 3 and len(moves) < 4 * jobs else 1
+    tasks = []
+    for m in moves:
+        u = make_move(st, m[0], m[1], m[2])
+        if split == 1:
+            tasks.append((move_to_alg(m), state_to_fen(st), depth - 1))
+        else:
+            for r in generate_legal_moves(st):
+                ur = make_move(st, r[0], r[1], r[2])
+                tasks.append((move_to_alg(m), state_to_fen(st), depth - 2))
+                unmake_move(st, ur)
+            if not tasks or tasks[-1][0] != move_to_alg(m):
+                tasks.append((move_to_alg(m), "", 0))     # pas de réponse (mat/pat) : aucune feuille
+        unmake_move(st, u)
+    return tasks
+
+def parallel_divide(fen: str, depth: int, executor: ProcessPoolExecutor, jobs: int,
+                    backend: str="list") -> Dict[str, int]:
+    st = state_from_fen(fen)
+    counts: Dict[str, int] = {}
+    if depth <= 1:
+        for m in generate_legal_moves(st): counts[move_to_alg(m)] = 1 if depth == 1 else 0
+        return counts
+    tasks = split_tasks(st, depth, jobs)
+    futures = [(mv, executor.submit(backend_perft, backend, f, d)) for mv, f, d in tasks if f]
+    for mv, _, _ in tasks: counts.setdefault(mv, 0)
+    for mv, fut in futures: counts[mv] += fut.result()
+    return counts
+
+def parallel_perft(fen: str, depth: int, executor: ProcessPoolExecutor, jobs: int, backend: str="list") -> int:
+    if depth <= 0: return 1
+    return sum(parallel_divide(fen, depth, executor, jobs, backend).values())
+
+def start_pool(jobs: int) -> ProcessPoolExecutor:
+    """Pool de processus déjà démarrés (les mesures ne comptent pas le lancement)."""
+    ex = ProcessPoolExecutor(max_workers=jobs)
+    list(ex.map(abs, range(jobs)))
+    return ex
+
+# --- recherche ---
+
+_engine = None
+
+def search_child(fen: str, history: bytes, depth: int, alpha: int, beta: int,
+                 time_ms: Optional[int]) -> Tuple[Optional[int], List[Move], Tuple[int, int, int]]:
+    """Fils de la racine cherché dans un processus ; la table de transposition du processus est gardée."""
+    global _engine
+    import engine
+    if _engine is None: _engine = engine.Engine()
+    st = state_from_fen(fen)
+    st.history = array('Q')
+    st.history.frombytes(history)
+    st.history.append(st.hash)
+    score, pv = _engine.search_node(st, depth, alpha, beta, time_ms)
+    return score, pv, (_engine.nodes, _engine.tt_probes, _engine.tt_hits)
+
+class ParallelEngine:
+    """
+    Recherche répartie à la racine : à chaque itération, le meilleur coup connu est cherché
+    d'abord (fenêtre complète), puis les autres coups en parallèle avec sa valeur comme
+    borne alpha. Chaque processus garde son moteur et sa table de transposition.
+    """
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.executor = start_pool(jobs)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def search(self, st: State, time_ms: Optional[int]=1000, max_depth: int=64,
+               on_info: Optional[Callable] = None):
+        import engine
+        t0 = time.perf_counter()
+        deadline = None if time_ms is None else t0 + time_ms / 1000
+        moves = generate_legal_moves(st)
+        result = engine.SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0, 0.0, 0.0, [])
+        if not moves: return result
+        history = st.history[max(0, len(st.history) - st.halfmove_clock - 1):].tobytes()
+        children: Dict[Move, str] = {}
+        for m in moves:
+            u = make_move(st, m[0], m[1], m[2])
+            children[m] = state_to_fen(st)
+            unmake_move(st, u)
+        extend = 1 if in_check(st.board, st.turn, st.kings[st.turn]) else 0
+        scores: Dict[Move, int] = {}
+        stats = [0, 0, 0]       # noeuds, sondages et succès de table, tous processus
+        def count(n: Tuple[int, int, int]):
+            for i in range(3): stats[i] += n[i]
+
+        def remaining() -> Optional[int]:
+            return None if deadline is None else max(1, int((deadline - time.perf_counter()) * 1000))
+
+        for depth in range(1, max_depth + 1):
+            order = sorted(moves, key=lambda m: -scores.get(m, -engine.INF))
+            if result.move in order: order.remove(result.move); order.insert(0, result.move)
+            d = depth - 1 + extend
+            # Premier coup, fenêtre complète : sa valeur sert de borne aux autres
+            score, pv, n = self.executor.submit(search_child, children[order[0]], history, d,
+                                                -engine.INF, engine.INF, remaining()).result()
+            count(n)
+            if score is None: break
+            best, best_move, best_pv = -score, order[0], [order[0]] + pv
+            new_scores = {order[0]: best}
+            pending: Dict[Future, Move] = {
+                self.executor.submit(search_child, children[m], history, d, -engine.INF, -best, remaining()): m
+                for m in order[1:]}
+            aborted = False
+            while pending:
+                done, _ = wait(pending, timeout=remaining() / 1000 if deadline else None, return_when=FIRST_COMPLETED)
+                if not done: aborted = True; break
+                for fut in done:
+                    m = pending.pop(fut)
+                    score, pv, n = fut.result()
+                    count(n)
+                    if score is None: aborted = True; continue
+                    new_scores[m] = -score
+                    if -score > best: best, best_move, best_pv = -score, m, [m] + pv
+            for fut in pending: fut.cancel()
+            elapsed = time.perf_counter() - t0
+            if aborted:
+                # Itération incomplète : garder un coup qui a battu le précédent meilleur
+                if best_move != order[0]: result = result._replace(move=best_move, score=best, pv=best_pv)
+                break
+            scores = new_scores
+            result = engine.SearchResult(best_move, best, depth, stats[0], elapsed,
+                                         stats[0] / elapsed if elapsed > 0 else 0.0,
+                                         stats[2] / stats[1] if stats[1] else 0.0, best_pv)
+            if on_info: on_info(result)
+            if abs(best) >= engine.MATE_BOUND: break
+            if deadline is not None and time.perf_counter() - t0 > (deadline - t0) / 2: break
+        elapsed = time.perf_counter() - t0
+        return result._replace(nodes=stats[0], seconds=elapsed, nps=stats[0] / elapsed if elapsed > 0 else 0.0,
+                               tt_hit_rate=stats[2] / stats[1] if stats[1] else 0.0)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="perft réparti sur plusieurs processus")
+    ap.add_argument("--fen", default="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    ap.add_argument("-d", "--depth", type=int, default=4)
+    ap.add_argument("-j", "--jobs", type=int, default=2)
+    ap.add_argument("-b", "--backend", choices=["list", "array", "bitboard"], default="list")
+    args = ap.parse_args(argv)
+    with start_pool(args.jobs) as ex:
+        t0 = time.perf_counter()
+        nodes = parallel_perft(args.fen, args.depth, ex, args.jobs, args.backend)
+        dt = time.perf_counter() - t0
+    print(f"perft({args.depth}) = {nodes}  ({dt:.2f}s, {nodes/dt if dt > 0 else 0:.0f} noeuds/s, {args.jobs} processus)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
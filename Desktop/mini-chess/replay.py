@@ -0,0 +1,199 @@
+# replay.py — rejoue des parties enregistrées (PGN en SAN, ou listes de coups "e2e4 e7e5 ...")
+# sans interaction, pour valider une archive contre les règles de chess_cli_v2.
+# Les parties sont lues en flux (générateurs) et réparties sur un pool de processus.
+# Pour chaque partie : premier coup illégal, état final, nulle par répétition / 50 coups.
+#   python replay.py parties.pgn -j 8
+#   python replay.py coups.txt --format moves --errors-only
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from typing import List, Tuple, Optional, Iterable, Iterator, Dict, NamedTuple, TextIO
+
+from chess_cli_v2 import (
+    State, Move, legal_move_table, apply_move, register_position, repetition_count, position_status,
+    state_from_fen, state_to_fen, algebraic_to_idx,
+)
+from batch import bounded
+
+class Game(NamedTuple):
+    index: int                  # rang de la partie dans le fichier (1, 2, ...)
+    tags: Dict[str, str]        # en-têtes PGN ([White "..."], [FEN "..."], ...)
+    moves: List[str]            # coups en SAN ou en coordonnées
+    result: str                 # 1-0, 0-1, 1/2-1/2 ou *
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN_RE = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+|[()]|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s{}();$]+')
+SAN_RE = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQnbrq]))?')
+COORD_RE = re.compile(r'([a-h][1-8][a-h][1-8])([qrbn])?')
+
+def movetext_tokens(text: str) -> Tuple[List[str], str]:
+    """Coups de la ligne principale (sans commentaires, variantes, NAG, numéros) et résultat."""
+    moves: List[str] = []
+    result = "*"
+    depth = 0
+    for tok in TOKEN_RE.findall(text):
+        if tok == '(': depth += 1; continue
+        if tok == ')': depth = max(0, depth - 1); continue
+        if depth or tok[0] in '{;$' or tok[0].isdigit() and tok.rstrip('.').isdigit(): continue
+        if tok in RESULTS: result = tok; continue
+        moves.append(tok)
+    return moves, result
+
+def read_pgn(f: Iterable[str]) -> Iterator[Game]:
+    tags: Dict[str, str] = {}
+    text: List[str] = []
+    index = 0
+    for line in f:
+        s = line.strip()
+        if s.startswith('%'): continue
+        if s.startswith('['):
+            if text:
+                # Nouvel en-tête : la partie précédente est complète
+                index += 1
+                yield Game(index, tags, *movetext_tokens("\n".join(text)))
+                tags, text = {}, []
+            m = TAG_RE.match(s)
+            if m: tags[m.group(1)] = m.group(2).replace('\\"', '"')
+            continue
+        if s: text.append(line)
+    if text or tags:
+        index += 1
+        yield Game(index, tags, *movetext_tokens("\n".join(text)))
+
+def read_move_lists(f: Iterable[str]) -> Iterator[Game]:
+    """Une partie par ligne : coups en coordonnées (numéros et résultat tolérés)."""
+    index = 0
+    for line in f:
+        s = line.strip()
+        if not s or s.startswith('#'): continue
+        index += 1
+        yield Game(index, {}, *movetext_tokens(s))
+
+def parse_move(st: State, token: str) -> Optional[Move]:
+    """Coup légal désigné par token (SAN ou coordonnées), None s'il n'existe pas."""
+    table = legal_move_table(st)
+    board = st.board
+    m = COORD_RE.fullmatch(token)
+    if m:
+        a, b = algebraic_to_idx(m.group(1))
+        if b not in table.get(a, ()): return None
+        promoting = board[a[0]][a[1]] in 'Pp' and b[0] in (0, 7)
+        if m.group(2) and not promoting: return None
+        return (a, b, (m.group(2) or 'q') if promoting else None)
+    san = token.rstrip('+#!?')
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        y = 7 if st.turn == 'white' else 0
+        b = (y, 6 if len(san) == 3 else 2)
+        return ((y, 4), b, None) if board[y][4] in 'Kk' and b in table.get((y, 4), ()) else None
+    m = SAN_RE.fullmatch(san)
+    if not m: return None
+    piece, file, rank, dest, promo = m.groups()
+    piece = piece or 'P'
+    b = algebraic_to_idx(dest * 2)[0]
+    found = [a for a, dests in table.items()
+             if b in dests and board[a[0]][a[1]].upper() == piece
+             and (file is None or a[1] == "abcdefgh".index(file))
+             and (rank is None or a[0] == 8 - int(rank))]
+    if len(found) != 1: return None
+    a = found[0]
+    promoting = piece == 'P' and b[0] in (0, 7)
+    if promo and not promoting: return None
+    return (a, b, (promo or 'q').lower() if promoting else None)
+
+def replay_game(game: Game) -> Dict:
+    out: Dict = {"game": game.index}
+    for tag in ("White", "Black"):
+        if tag in game.tags: out[tag.lower()] = game.tags[tag]
+    out["result"] = game.result
+    try:
+        if "FEN" in game.tags:
+            st = state_from_fen(game.tags["FEN"])
+        else:
+            st = State(); register_position(st)
+    except ValueError as e:
+        out["error"] = str(e)
+        return out
+    plies = 0
+    for token in game.moves:
+        m = parse_move(st, token)
+        if m is None:
+            out["illegal"] = {"ply": plies + 1, "move": token, "fen": state_to_fen(st)}
+            break
+        apply_move(st, m[0], m[1], promotion_choice=m[2])
+        plies += 1
+        if "draw" not in out:
+            if st.halfmove_clock >= 100: out["draw"] = {"rule": "fifty", "ply": plies}
+            elif repetition_count(st) >= 3: out["draw"] = {"rule": "repetition", "ply": plies}
+    out["plies"] = plies
+    out["status"] = position_status(st)
+    out["fen"] = state_to_fen(st)
+    return out
+
+def run(games: Iterator[Game], out: TextIO, jobs: int, chunk: int=16, errors_only: bool=False) -> Dict[str, int]:
+    """Rejoue toutes les parties ; rend les totaux (parties, demi-coups, illégales, nulles)."""
+    totals = {"games": 0, "plies": 0, "illegal": 0, "errors": 0, "draws": 0}
+    def emit(res: Dict):
+        totals["games"] += 1
+        totals["plies"] += res.get("plies", 0)
+        bad = "illegal" in res or "error" in res
+        totals["illegal"] += "illegal" in res
+        totals["errors"] += "error" in res
+        totals["draws"] += "draw" in res
+        if bad or not errors_only: out.write(json.dumps(res, ensure_ascii=False) + "\n")
+    if jobs <= 1:
+        for g in games: emit(replay_game(g))
+        return totals
+    slots = threading.Semaphore(4 * jobs * chunk)
+    with multiprocessing.Pool(jobs) as pool:
+        for res in pool.imap(replay_game, bounded(games, slots), chunksize=chunk):
+            slots.release()
+            emit(res)
+    return totals
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="rejoue des parties (PGN ou listes de coups) pour les valider")
+    ap.add_argument("input", help="fichier PGN ou liste de coups (une partie par ligne), '-' pour l'entrée standard")
+    ap.add_argument("--format", choices=["auto", "pgn", "moves"], default="auto",
+                    help="auto : PGN si l'extension est .pgn ou si le fichier commence par un en-tête")
+    ap.add_argument("-o", "--output", default="-", help="résultats JSON lignes (défaut: sortie standard)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="processus (défaut: nombre de coeurs)")
+    ap.add_argument("--chunk", type=int, default=16, help="parties par paquet envoyé à un processus")
+    ap.add_argument("--errors-only", action="store_true", help="n'écrire que les parties en erreur")
+    args = ap.parse_args(argv)
+
+    fin = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", errors="replace")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    fmt = args.format
+    lines: Iterable[str] = fin
+    if fmt == "auto":
+        if args.input.lower().endswith(".pgn"): fmt = "pgn"
+        else:
+            # Regarder la première ligne non vide sans perdre le flux
+            head: List[str] = []
+            for line in fin:
+                head.append(line)
+                if line.strip(): break
+            fmt = "pgn" if head and head[-1].lstrip().startswith('[') else "moves"
+            lines = (l for src in (head, fin) for l in src)
+    games = read_pgn(lines) if fmt == "pgn" else read_move_lists(lines)
+    t0 = time.perf_counter()
+    try:
+        totals = run(games, fout, args.jobs, max(1, args.chunk), args.errors_only)
+    finally:
+        if fin is not sys.stdin: fin.close()
+        if fout is not sys.stdout: fout.close()
+    dt = time.perf_counter() - t0
+    print(f"{totals['games']} parties, {totals['plies']} demi-coups en {dt:.2f}s : "
+          f"{totals['games']/dt if dt > 0 else 0:.1f} parties/s, {totals['plies']/dt if dt > 0 else 0:.0f} demi-coups/s  "
+          f"(illégales {totals['illegal']}, erreurs {totals['errors']}, nulles {totals['draws']}, {args.jobs} processus)",
+          file=sys.stderr)
+    return 1 if totals["illegal"] or totals["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
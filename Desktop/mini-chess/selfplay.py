@@ -0,0 +1,199 @@
+# selfplay.py — parties complètes sans interaction (banc d'essai des règles et des bots).
+# Chaque partie part d'une position d'ouverture et avance par apply_move jusqu'à ce que
+# position_status (le coeur de game_status) la termine : mat, pat, 50 coups, répétition,
+# table de finales, ou limite de demi-coups. Joueurs : "random" ou "engine[:noeuds]".
+# Les parties sont réparties sur un pool de processus ; la graine de chaque partie ne dépend
+# que de --seed et de son numéro, donc le résultat ne dépend pas du nombre de processus.
+# Rapporte chaque partie (JSON lignes), les parties/s, demi-coups/s (aussi par tranche de
+# 100 demi-coups : les parties longues doivent coûter autant par coup) et le temps passé
+# dans chaque fonction des règles (instrument.py).
+#   python selfplay.py --games 200 -j 4
+#   python selfplay.py --games 50 --white engine:2000 --black random --swap -o parties.jsonl
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from typing import List, Tuple, Optional, Iterator, Dict, NamedTuple
+
+from chess_cli_v2 import (
+    State, Move, apply_move, register_position, position_status, generate_legal_moves,
+    state_from_fen, move_to_alg,
+)
+from batch import bounded, worker_stats
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+SPLIT = 100         # tranche de demi-coups pour les débits par longueur de partie
+
+class GameSpec(NamedTuple):
+    index: int
+    fen: str
+    white: str          # "random" ou "engine[:noeuds]"
+    black: str
+    seed: int
+    max_plies: int
+    record_moves: bool
+
+def parse_player(spec: str) -> Tuple[str, int]:
+    """("random", 0) ou ("engine", budget en noeuds) ; le budget en noeuds garde les parties reproductibles."""
+    name, _, arg = spec.partition(':')
+    if name == "random" and not arg: return name, 0
+    if name == "engine" and (not arg or arg.isdigit()): return name, int(arg or 2000)
+    raise ValueError(f"joueur inconnu: {spec!r} (random, engine ou engine:NOEUDS)")
+
+_engine = None
+
+def choose(st: State, player: Tuple[str, int], rng: random.Random) -> Move:
+    if player[0] == "random":
+        return rng.choice(generate_legal_moves(st))
+    return _engine.search(st, None, max_nodes=player[1]).move
+
+RESULT = {"checkmate": "loss", "stalemate": "draw", "fifty": "draw", "repetition": "draw",
+          "tb_win": "win", "tb_loss": "loss", "tb_draw": "draw"}
+
+def play_game(g: GameSpec) -> Tuple[Dict, Optional[Dict]]:
+    """Joue une partie ; rend son résultat et les compteurs de mesure du processus."""
+    global _engine
+    players = {'white': parse_player(g.white), 'black': parse_player(g.black)}
+    if any(p[0] == "engine" for p in players.values()):
+        import engine
+        if _engine is None: _engine = engine.Engine(tt_bits=16)
+        _engine.clear()         # même partie, même table de départ : résultat reproductible
+    rng = random.Random(g.seed)
+    st = state_from_fen(g.fen)
+    register_position(st)
+    moves: List[str] = []
+    splits: List[float] = []
+    t0 = time.perf_counter()
+    plies = 0
+    while True:
+        status = position_status(st)
+        if status not in ("ok", "check"): break
+        if plies >= g.max_plies: status = "max_plies"; break
+        m = choose(st, players[st.turn], rng)
+        apply_move(st, m[0], m[1], promotion_choice=m[2])
+        plies += 1
+        if g.record_moves: moves.append(move_to_alg(m))
+        if plies % SPLIT == 0: splits.append(time.perf_counter() - t0)
+    dt = time.perf_counter() - t0
+    outcome = RESULT.get(status)
+    if outcome == "draw": result = "1/2-1/2"
+    elif outcome is None: result = "*"
+    else: result = "1-0" if (outcome == "win") == (st.turn == 'white') else "0-1"
+    res = {"game": g.index, "white": g.white, "black": g.black, "seed": g.seed, "result": result,
+           "reason": status, "plies": plies, "seconds": round(dt, 4), "splits": [round(s, 4) for s in splits]}
+    if g.fen != START_FEN: res["fen"] = g.fen
+    if g.record_moves: res["moves"] = " ".join(moves)
+    return res, worker_stats()
+
+def game_specs(openings: List[str], games: int, white: str, black: str, seed: int, max_plies: int,
+               swap: bool, record_moves: bool) -> Iterator[GameSpec]:
+    for i in range(games):
+        # Avec swap, chaque ouverture est jouée deux fois, couleurs échangées
+        k, flip = (i // 2, i % 2 == 1) if swap else (i, False)
+        w, b = (black, white) if flip else (white, black)
+        yield GameSpec(i, openings[k % len(openings)], w, b, seed * 1_000_003 + i, max_plies, record_moves)
+
+def init_worker(stats: bool, tablebases: Optional[str]):
+    if stats:
+        import instrument
+        instrument.enable()
+    if tablebases:
+        import tablebase
+        tablebase.use([tablebases])
+
+class Totals:
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.results: Dict[str, int] = {}
+        self.reasons: Dict[str, int] = {}
+        self.split_seconds: List[float] = []      # tranche k : temps total des demi-coups [k*SPLIT, (k+1)*SPLIT)
+        self.split_plies: List[int] = []
+        self.functions: Dict[str, List[int]] = {}
+
+    def add(self, res: Dict, snap: Optional[Dict]):
+        self.games += 1
+        self.plies += res["plies"]
+        self.results[res["result"]] = self.results.get(res["result"], 0) + 1
+        self.reasons[res["reason"]] = self.reasons.get(res["reason"], 0) + 1
+        bounds = [0.0] + res["splits"] + [res["seconds"]]
+        for k in range(len(bounds) - 1):
+            plies = min(SPLIT, res["plies"] - k * SPLIT)
+            if plies <= 0: break
+            if k == len(self.split_seconds): self.split_seconds.append(0.0); self.split_plies.append(0)
+            self.split_seconds[k] += bounds[k + 1] - bounds[k]
+            self.split_plies[k] += plies
+        if snap is not None:
+            import instrument
+            instrument.merge(self.functions, snap)
+
+def run(specs: Iterator[GameSpec], out, jobs: int, stats: bool, tablebases: Optional[str]) -> Totals:
+    totals = Totals()
+    def emit(item: Tuple[Dict, Optional[Dict]]):
+        totals.add(*item)
+        out.write(json.dumps(item[0], ensure_ascii=False) + "\n")
+    if jobs <= 1:
+        init_worker(stats, tablebases)
+        for g in specs: emit(play_game(g))
+        return totals
+    slots = threading.Semaphore(4 * jobs)
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(stats, tablebases)) as pool:
+        for item in pool.imap(play_game, bounded(specs, slots)):
+            slots.release()
+            emit(item)
+    return totals
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="parties complètes sans interaction, en parallèle")
+    ap.add_argument("--games", type=int, default=100)
+    ap.add_argument("--white", default="random", help="random, engine ou engine:NOEUDS (défaut random)")
+    ap.add_argument("--black", default="random")
+    ap.add_argument("--swap", action="store_true", help="jouer chaque ouverture deux fois, couleurs échangées")
+    ap.add_argument("--openings", metavar="FICHIER", help="positions de départ FEN/EPD (défaut: position initiale)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--max-plies", type=int, default=1000, help="partie arrêtée (*) au-delà")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("-o", "--output", default="-", help="résultats JSON lignes (défaut: sortie standard)")
+    ap.add_argument("--moves", action="store_true", help="inclure les coups de chaque partie")
+    ap.add_argument("--no-stats", action="store_true", help="ne pas mesurer les fonctions des règles")
+    ap.add_argument("--tablebases", metavar="DOSSIER", help="arbitrer les finales avec ces tables")
+    args = ap.parse_args(argv)
+    try:
+        parse_player(args.white); parse_player(args.black)
+    except ValueError as e:
+        ap.error(str(e))
+    openings = [START_FEN]
+    if args.openings:
+        from batch import parse_line
+        from chess_cli_v2 import state_to_fen
+        with open(args.openings, encoding="utf-8") as f:
+            openings = [state_to_fen(parse_line(l)[0]) for l in f if l.strip() and not l.startswith('#')]
+        if not openings: ap.error(f"{args.openings}: aucune position")
+
+    specs = game_specs(openings, args.games, args.white, args.black, args.seed, args.max_plies, args.swap, args.moves)
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        totals = run(specs, fout, args.jobs, not args.no_stats, args.tablebases)
+    finally:
+        if fout is not sys.stdout: fout.close()
+    dt = time.perf_counter() - t0
+
+    print(f"{totals.games} parties, {totals.plies} demi-coups en {dt:.2f}s ({args.jobs} processus) : "
+          f"{totals.games/dt:.2f} parties/s, {totals.plies/dt:.0f} demi-coups/s", file=sys.stderr)
+    print("  résultats : " + ", ".join(f"{k} {v}" for k, v in sorted(totals.results.items())) +
+          "  |  fins : " + ", ".join(f"{k} {v}" for k, v in sorted(totals.reasons.items(), key=lambda kv: -kv[1])), file=sys.stderr)
+    print("  demi-coups/s par tranche (temps des processus) : " + ", ".join(
+        f"{k*SPLIT}-{(k+1)*SPLIT - 1}: {p/s:.0f}" for k, (s, p) in enumerate(zip(totals.split_seconds, totals.split_plies))
+        if s > 0), file=sys.stderr)
+    if totals.functions:
+        import instrument
+        print(instrument.format_report(totals.functions), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
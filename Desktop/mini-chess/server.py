@@ -0,0 +1,229 @@
+# server.py — serveur de parties (asyncio) sur TCP ou socket Unix, protocole JSON lignes.
+# Chaque requête est un objet JSON sur une ligne, chaque réponse reprend son "id" :
+#   {"id": 1, "op": "new"}                              -> {"id": 1, "ok": true, "game": 7, "fen": "..."}
+#   {"id": 2, "op": "move", "game": 7, "move": "e2e4"}  -> {"id": 2, "ok": true, "status": "ok", "fen": "..."}
+#   op : new [fen], move, moves, status, bot [ms], save, load (data), close, stats (avec --stats)
+# Une connexion peut tenir plusieurs parties ; chaque partie a son State et son Journal.
+# Les calculs coûteux partent dans des exécuteurs bornés : état de la partie dans un pool
+# de threads, recherche du bot dans un pool de processus. La boucle ne fait que l'E/S.
+#   python server.py --tcp 127.0.0.1:8765
+#   python server.py --unix /tmp/mini-chess.sock --workers 4
+import argparse
+import asyncio
+import base64
+import binascii
+import concurrent.futures
+import itertools
+import json
+import sys
+import threading
+from typing import List, Optional, Dict, Any
+
+from chess_cli_v2 import (
+    State, Move, apply_move, register_position, position_status, state_from_fen, state_to_fen,
+    generate_legal_moves, move_to_alg, Journal, parse_journal,
+)
+from replay import parse_move
+
+class ProtocolError(Exception):
+    pass
+
+class Game:
+    def __init__(self, st: State, journal: Optional[Journal]=None):
+        self.st = st
+        self.journal = journal or Journal(st)
+        self.lock = asyncio.Lock()      # une requête à la fois par partie
+
+    def play(self, m: Move):
+        apply_move(self.st, m[0], m[1], promotion_choice=m[2])
+        self.journal.record(self.st, m)
+
+def describe(st: State) -> Dict[str, Any]:
+    """État de la partie (exécuté dans le pool de threads)."""
+    return {"status": position_status(st), "turn": st.turn, "fen": state_to_fen(st)}
+
+def new_state(fen: Optional[str]) -> State:
+    try:
+        if fen is not None: return state_from_fen(fen)
+    except ValueError as e:
+        raise ProtocolError(str(e))
+    st = State(); register_position(st)
+    return st
+
+def play_move(game: Game, text: str) -> Dict[str, Any]:
+    """Lecture du coup, coup joué (journal compris) et nouvel état, dans le pool de threads."""
+    m = parse_move(game.st, text)
+    if m is None: raise ProtocolError(f"coup illégal: {text!r}")
+    game.play(m)
+    return describe(game.st)
+
+def play_and_describe(game: Game, m: Move) -> Dict[str, Any]:
+    game.play(m)
+    return describe(game.st)
+
+def legal_moves(st: State) -> List[str]:
+    return [move_to_alg(m) for m in generate_legal_moves(st)]
+
+_local = threading.local()
+
+def bot_move(st: State, time_ms: int) -> Optional[Move]:
+    """Recherche du bot ; un moteur (et sa table de transposition) par processus ou thread."""
+    import engine
+    if not hasattr(_local, "engine"): _local.engine = engine.Engine(tt_bits=16)
+    return _local.engine.search(st, time_ms).move
+
+def load_game(data: str) -> Game:
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ProtocolError("data: base64 invalide")
+    try:
+        journal = parse_journal(raw)
+    except ValueError as e:
+        raise ProtocolError(str(e))
+    st = journal.replay()
+    return Game(st, journal)
+
+class Server:
+    def __init__(self, threads: int=4, workers: int=1, max_games: int=100_000, max_pending: int=256,
+                 bot_max_ms: int=5000):
+        self.threads = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+        self.processes = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        # Bornes : requêtes en attente d'un exécuteur (toutes connexions confondues), parties ouvertes
+        self.pending = asyncio.Semaphore(max_pending)
+        self.max_games = max_games
+        self.bot_max_ms = bot_max_ms
+        self.games: Dict[int, Game] = {}
+        self.ids = itertools.count(1)
+
+    async def offload(self, executor, fn, *args):
+        async with self.pending:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    def new_game(self, game: Game, owned: set) -> int:
+        if len(self.games) >= self.max_games: raise ProtocolError("trop de parties ouvertes")
+        gid = next(self.ids)
+        self.games[gid] = game
+        owned.add(gid)
+        return gid
+
+    def game(self, req: Dict, owned: set) -> Game:
+        gid = req.get("game")
+        if gid not in owned: raise ProtocolError(f"partie inconnue: {gid!r}")
+        return self.games[gid]
+
+    async def handle(self, req: Dict, owned: set) -> Dict[str, Any]:
+        op = req.get("op")
+        if op == "new":
+            st = await self.offload(self.threads, new_state, str(req["fen"]) if "fen" in req else None)
+            return {"game": self.new_game(Game(st), owned), "fen": state_to_fen(st)}
+        if op == "stats":
+            instrument = sys.modules.get("instrument")
+            if instrument is None or not instrument.enabled(): raise ProtocolError("mesures désactivées (--stats)")
+            return {"games": len(self.games), **instrument.snapshot()}
+        if op == "load":
+            game = await self.offload(self.threads, load_game, str(req.get("data", "")))
+            return {"game": self.new_game(game, owned), **await self.offload(self.threads, describe, game.st)}
+        g = self.game(req, owned)
+        async with g.lock:
+            if op == "move":
+                return await self.offload(self.threads, play_move, g, str(req.get("move", "")))
+            if op == "moves":
+                return {"moves": await self.offload(self.threads, legal_moves, g.st)}
+            if op == "status":
+                return await self.offload(self.threads, describe, g.st)
+            if op == "bot":
+                ms = max(1, min(int(req.get("ms", 100)), self.bot_max_ms))
+                executor = self.processes or self.threads
+                m = await self.offload(executor, bot_move, g.st, ms)
+                if m is None: raise ProtocolError("aucun coup légal")
+                return {"move": move_to_alg(m), **await self.offload(self.threads, play_and_describe, g, m)}
+            if op == "save":
+                data = await self.offload(self.threads, g.journal.encode)
+                return {"data": base64.b64encode(data).decode("ascii")}
+            if op == "close":
+                del self.games[req["game"]]
+                owned.discard(req["game"])
+                return {}
+        raise ProtocolError(f"opération inconnue: {op!r}")
+
+    async def reply(self, line: bytes, owned: set, writer: asyncio.StreamWriter, slots: asyncio.Semaphore):
+        rid = None
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict): raise ProtocolError("objet JSON attendu")
+            rid = req.get("id")
+            res = {"id": rid, "ok": True, **await self.handle(req, owned)}
+        except (ProtocolError, ValueError, TypeError) as e:
+            res = {"id": rid, "ok": False, "error": str(e)}
+        except Exception as e:
+            res = {"id": rid, "ok": False, "error": f"erreur interne: {e!r}"}
+        finally:
+            slots.release()
+        if not writer.is_closing():
+            writer.write(json.dumps(res, ensure_ascii=False).encode() + b"\n")
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owned: set = set()
+        # Requêtes en cours par connexion : au-delà, on cesse de lire (contre-pression sur le client)
+        slots = asyncio.Semaphore(64)
+        tasks: set = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                if not line.strip(): continue
+                await slots.acquire()
+                t = asyncio.ensure_future(self.reply(line, owned, writer, slots))
+                tasks.add(t); t.add_done_callback(tasks.discard)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            if tasks: await asyncio.gather(*tasks, return_exceptions=True)
+            for gid in owned: self.games.pop(gid, None)
+            writer.close()
+
+    def close(self):
+        self.threads.shutdown(wait=False)
+        if self.processes: self.processes.shutdown(wait=False)
+
+async def serve(args) -> None:
+    server = Server(args.threads, args.workers, args.max_games, args.max_pending)
+    limit = 1 << 20     # lignes jusqu'à 1 Mo (sauvegardes en base64)
+    if args.unix:
+        srv = await asyncio.start_unix_server(server.connection, path=args.unix, limit=limit)
+        where = args.unix
+    else:
+        host, _, port = args.tcp.rpartition(':')
+        srv = await asyncio.start_server(server.connection, host or "127.0.0.1", int(port), limit=limit, backlog=4096)
+        where = args.tcp
+    print(f"♟️  serveur prêt sur {where} ({args.threads} threads, {args.workers} processus bot)", file=sys.stderr)
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        server.close()
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser(description="serveur de parties (JSON lignes sur TCP ou socket Unix)")
+    where = ap.add_mutually_exclusive_group()
+    where.add_argument("--tcp", default="127.0.0.1:8765", help="hôte:port (défaut 127.0.0.1:8765)")
+    where.add_argument("--unix", help="chemin d'une socket Unix")
+    ap.add_argument("--threads", type=int, default=4, help="threads pour l'état des parties")
+    ap.add_argument("--workers", type=int, default=1, help="processus pour le bot (0 : dans les threads)")
+    ap.add_argument("--max-games", type=int, default=100_000)
+    ap.add_argument("--max-pending", type=int, default=256, help="requêtes en attente d'un exécuteur")
+    ap.add_argument("--stats", action="store_true", help="mesurer les fonctions des règles (op stats)")
+    args = ap.parse_args(argv)
+    if args.stats:
+        import instrument
+        instrument.enable()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+# tablebase.py — tables de finales exactes : gain/nulle/perte et distance au mat, par analyse rétrograde.
+# Chaque ensemble de matériel (KQK, KRK, KPK, KBNK, KQKR, ...) a un index parfait : trait, case du
+# roi blanc ramenée par symétrie (10 cases sans pion, 32 avec pion), puis la case de chaque autre
+# pièce. Les coups avant viennent des règles du jeu (generate_legal_moves, make_move) ; les coups
+# arrière sont les mêmes déplacements à l'envers, validés par square_attacked_by. Le fichier est
+# un en-tête suivi d'un octet par index, lu par mmap sans être chargé en mémoire.
+# Sont ignorés : roques (la sonde refuse une position qui en a encore) et règle des 50 coups.
+#   python tablebase.py KQK KRK KPK KBNK -o tables/ -j 4
+#   python tablebase.py --probe "8/8/8/4k3/8/8/8/KQ6 w - - 0 1" -d tables/
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+from typing import List, Tuple, Optional, Dict, Set, Sequence, Iterable, NamedTuple
+
+import chess_cli_v2
+from chess_cli_v2 import (
+    State, SQUARES, generate_legal_moves, make_move, unmake_move, in_check, square_attacked_by,
+    state_from_fen,
+)
+
+TB_MAGIC = b"MCTB"
+TB_VERSION = 1
+TB_HEADER = struct.Struct("<4sB8sI")    # magic, version, matériel ("KBNK"), nombre de positions
+TB_SUFFIX = ".mctb"
+
+# Octet par position, pour le camp au trait : 0 nulle, n (1..127) gagne et mate en n coups,
+# 128+n perd et est maté en n coups (128 : maté), 255 position impossible ou hors index
+DRAW, LOSS, INVALID = 0, 128, 255
+
+PIECE_ORDER = "KQRBNP"
+TRIVIAL_DRAWS = {"KK", "KBK", "KNK", "KKB", "KKN"}      # mat impossible : pas de table
+
+class TBResult(NamedTuple):
+    wdl: int        # 1 gagne, 0 nulle, -1 perd (camp au trait)
+    plies: int      # demi-coups jusqu'au mat (0 pour une nulle ou si maté)
+
+def decode_value(v: int) -> TBResult:
+    if v == DRAW: return TBResult(0, 0)
+    if v < LOSS: return TBResult(1, 2*v - 1)
+    return TBResult(-1, 2*(v - LOSS))
+
+# --- géométrie sur les cases 0..63 (y*8+x, y=0 : 8e rangée) ---
+
+def _transform(t: int, s: int) -> int:
+    y, x = divmod(s, 8)
+    if t & 1: x = 7 - x
+    if t & 2: y = 7 - y
+    if t & 4: y, x = x, y
+    return y*8 + x
+
+TRANSFORMS = [[_transform(t, s) for s in range(64)] for t in range(8)]
+# Roi blanc : triangle a1-d1-d4 sans pion (8 symétries), colonnes a-d avec pion (miroir seul)
+REGION_PAWNLESS = [s for s in range(64) if s % 8 <= 3 and s // 8 >= 4 and s % 8 + s // 8 >= 7]
+REGION_PAWNS = [s for s in range(64) if s % 8 <= 3]
+
+def _steps(deltas: Sequence[Tuple[int, int]]) -> List[List[int]]:
+    return [[(s//8 + dy)*8 + s%8 + dx for dy, dx in deltas if 0 <= s//8 + dy < 8 and 0 <= s%8 + dx < 8]
+            for s in range(64)]
+
+def _rays(deltas: Sequence[Tuple[int, int]]) -> List[List[List[int]]]:
+    out = []
+    for s in range(64):
+        rays = []
+        for dy, dx in deltas:
+            y, x, ray = s//8 + dy, s%8 + dx, []
+            while 0 <= y < 8 and 0 <= x < 8:
+                ray.append(y*8 + x); y += dy; x += dx
+            rays.append(ray)
+        out.append(rays)
+    return out
+
+KING_STEPS = _steps([(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx])
+KNIGHT_STEPS = _steps([(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)])
+SLIDER_RAYS = {'B': _rays([(-1,-1),(-1,1),(1,-1),(1,1)]), 'R': _rays([(-1,0),(1,0),(0,-1),(0,1)]),
+               'Q': _rays([(-1,-1),(-1,1),(1,-1),(1,1),(-1,0),(1,0),(0,-1),(0,1)])}
+
+def material_name(white: Iterable[str], black: Iterable[str]) -> str:
+    """Nom normalisé d'un matériel : pièces blanches puis noires, rangées K Q R B N P."""
+    key = PIECE_ORDER.index
+    return "".join(sorted((p.upper() for p in white), key=key)) + "".join(sorted((p.upper() for p in black), key=key))
+
+class Layout:
+    """Index parfait d'un matériel : position (cases des pièces, trait) <-> entier."""
+    def __init__(self, name: str):
+        i = name.find('K', 1)
+        if not name.startswith('K') or i < 0 or 'K' in name[i+1:] or any(c not in PIECE_ORDER for c in name):
+            raise ValueError(f"matériel invalide: {name!r} (ex: KQK, KBNK, KQKR)")
+        name = material_name(name[:i], name[i:])
+        i = name.find('K', 1)
+        if 'P' in name[:i] and 'P' in name[i:]:
+            raise ValueError(f"{name}: pions des deux camps (prise en passant) non gérés")
+        self.name = name
+        # Une pièce par emplacement, roi blanc d'abord ; lettres du plateau (noires en minuscules)
+        self.letters = list(name[:i]) + [c.lower() for c in name[i:]]
+        self.white = [c.isupper() for c in self.letters]
+        self.pawns = 'P' in name
+        region = REGION_PAWNS if self.pawns else REGION_PAWNLESS
+        self.region = region
+        self.region_pos = {s: k for k, s in enumerate(region)}
+        self.size = 2 * len(region) * 64 ** (len(self.letters) - 1)
+        # Symétries qui amènent chaque case du roi blanc dans la région (2 sur la diagonale a1-h8)
+        allowed = (0, 1) if self.pawns else range(8)
+        self.king_transforms = [[TRANSFORMS[t] for t in allowed if TRANSFORMS[t][s] in self.region_pos]
+                                for s in range(64)]
+        # Pièces identiques (KRRK) : leurs cases sont rangées, l'ordre ne compte pas
+        self.twins = [(a, b) for a in range(1, len(name)) for b in range(a+1, len(name))
+                      if self.letters[a] == self.letters[b]]
+
+    def index(self, squares: Sequence[int], black: bool) -> int:
+        """Index canonique (le plus petit parmi les symétries qui placent le roi blanc dans la région)."""
+        best = -1
+        for T in self.king_transforms[squares[0]]:
+            s = [T[q] for q in squares]
+            for a, b in self.twins:
+                if s[a] > s[b]: s[a], s[b] = s[b], s[a]
+            i = black * len(self.region) + self.region_pos[s[0]]
+            for q in s[1:]: i = i*64 + q
+            if best < 0 or i < best: best = i
+        return best
+
+    def decode(self, idx: int) -> Tuple[List[int], bool]:
+        squares = [0] * len(self.letters)
+        for k in range(len(squares) - 1, 0, -1):
+            idx, squares[k] = divmod(idx, 64)
+        black, r = divmod(idx, len(self.region))
+        squares[0] = self.region[r]
+        return squares, bool(black)
+
+    def possible(self, squares: Sequence[int]) -> bool:
+        """Cases distinctes, pions hors 1re/8e rangée (le reste est vérifié sur le plateau)."""
+        if len(set(squares)) != len(squares): return False
+        return not self.pawns or all(not (c in 'Pp' and s // 8 in (0, 7)) for c, s in zip(self.letters, squares))
+
+class Scratch:
+    """State réutilisé : on y pose successivement les positions de l'index."""
+    def __init__(self, layout: Layout):
+        self.layout = layout
+        st = State()
+        st.board = [['.'] * 8 for _ in range(8)]
+        st.wkc = st.wqc = st.bkc = st.bqc = False
+        st.en_passant = None
+        st.pieces = {'white': set(), 'black': set()}
+        self.st = st
+        self.placed: List[int] = []
+
+    def place(self, squares: Sequence[int], black: bool) -> bool:
+        """Pose la position ; False si le camp qui n'a pas le trait est en échec."""
+        st, board = self.st, self.st.board
+        for s in self.placed: board[s // 8][s % 8] = '.'
+        st.pieces['white'].clear(); st.pieces['black'].clear()
+        for c, white, s in zip(self.layout.letters, self.layout.white, squares):
+            board[s // 8][s % 8] = c
+            color = 'white' if white else 'black'
+            st.pieces[color].add(SQUARES[s])
+            if c in 'Kk': st.kings[color] = SQUARES[s]
+        self.placed = list(squares)
+        st.turn = 'black' if black else 'white'
+        st.en_passant = None
+        other = 'white' if black else 'black'
+        return not in_check(board, other, st.kings[other])
+
+# --- tables ouvertes (lecture par mmap) ---
+
+class Table:
+    """Un fichier de table : en-tête puis un octet par index, lu par mmap."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, name, size = TB_HEADER.unpack_from(self.data)
+        except struct.error:
+            magic, version, name, size = b"", 0, b"", 0
+        if magic != TB_MAGIC or version != TB_VERSION:
+            self.data.close()
+            raise ValueError(f"{path}: pas une table de finales (version {TB_VERSION})")
+        self.layout = Layout(name.rstrip(b"\0").decode("ascii"))
+        if size != self.layout.size or len(self.data) != TB_HEADER.size + size:
+            self.data.close()
+            raise ValueError(f"{path}: taille incohérente")
+
+    def value(self, idx: int) -> int:
+        return self.data[TB_HEADER.size + idx]
+
+    def close(self):
+        self.data.close()
+
+class Tablebases:
+    """Tables ouvertes, par matériel ; probe() reconnaît aussi les finales inversées (couleurs)."""
+    def __init__(self, paths: Iterable[str]=()):
+        self.tables: Dict[str, Table] = {}
+        self.max_pieces = 2
+        for p in paths: self.add(p)
+
+    def add(self, path: str):
+        """Ouvre un fichier de table, ou toutes les tables d'un répertoire."""
+        if os.path.isdir(path):
+            for f in sorted(os.listdir(path)):
+                if f.endswith(TB_SUFFIX): self.add(os.path.join(path, f))
+            return
+        t = Table(path)
+        if t.layout.name in self.tables: self.tables[t.layout.name].close()
+        self.tables[t.layout.name] = t
+        self.max_pieces = max(self.max_pieces, len(t.layout.letters))
+
+    def close(self):
+        for t in self.tables.values(): t.close()
+        self.tables.clear()
+
+    def probe(self, st: State) -> Optional[TBResult]:
+        """Résultat exact pour le camp au trait, ou None (matériel sans table, roques possibles)."""
+        white, black = st.pieces['white'], st.pieces['black']
+        if len(white) + len(black) > self.max_pieces: return None
+        if st.wkc or st.wqc or st.bkc or st.bqc: return None
+        board = st.board
+        w = sorted(((board[y][x], y*8 + x) for y, x in white), key=lambda e: PIECE_ORDER.index(e[0]))
+        b = sorted(((board[y][x].upper(), y*8 + x) for y, x in black), key=lambda e: PIECE_ORDER.index(e[0]))
+        name = "".join(c for c, _ in w) + "".join(c for c, _ in b)
+        if name in TRIVIAL_DRAWS: return TBResult(0, 0)
+        to_move_black = st.turn == 'black'
+        table = self.tables.get(name)
+        if table is not None:
+            squares = [s for _, s in w] + [s for _, s in b]
+        else:
+            # Couleurs inversées : miroir vertical, les noirs deviennent les blancs
+            table = self.tables.get("".join(c for c, _ in b) + "".join(c for c, _ in w))
+            if table is None: return None
+            squares = [s ^ 56 for _, s in b] + [s ^ 56 for _, s in w]
+            to_move_black = not to_move_black
+        v = table.value(table.layout.index(squares, to_move_black))
+        return None if v == INVALID else decode_value(v)
+
+def use(paths: Optional[Iterable[str]]) -> Optional[Tablebases]:
+    """Ouvre les tables (fichiers ou répertoires) pour game_status et la recherche ; None les ferme."""
+    old = chess_cli_v2.ENDGAME_TABLES
+    chess_cli_v2.ENDGAME_TABLES = Tablebases(paths) if paths is not None else None
+    if old is not None: old.close()
+    return chess_cli_v2.ENDGAME_TABLES
+
+# --- génération ---
+
+_worker: Dict = {}
+
+def _init_scan(name: str, paths: List[str], tables: Optional[Tablebases]=None):
+    _worker["layout"] = layout = Layout(name)
+    _worker["scratch"] = Scratch(layout)
+    _worker["tables"] = tables if tables is not None else Tablebases(paths)
+
+def scan(span: Tuple[int, int]) -> Tuple[int, bytes, bytes, List[Tuple[int, int]], Dict[int, int]]:
+    """
+    Passe avant sur les index [start, stop) : positions possibles, nombre d'enfants distincts dans
+    la table, et coups qui en sortent (prise, promotion) évalués par les tables déjà générées.
+    Rend (start, valeurs, compteurs, [(profondeur, index) à résoudre], {index: perte au plus tard}).
+    """
+    start, stop = span
+    layout, scratch, tables = _worker["layout"], _worker["scratch"], _worker["tables"]
+    st = scratch.st
+    values = bytearray([INVALID]) * (stop - start)
+    counts = bytearray(stop - start)
+    pushes: List[Tuple[int, int]] = []
+    exit_loss: Dict[int, int] = {}
+    for idx in range(start, stop):
+        squares, black = layout.decode(idx)
+        if not layout.possible(squares) or layout.index(squares, black) != idx: continue
+        if not scratch.place(squares, black): continue
+        values[idx - start] = DRAW
+        moves = generate_legal_moves(st)
+        if not moves:
+            if in_check(st.board, st.turn, st.kings[st.turn]): pushes.append((0, idx))    # maté
+            continue                                                                    # pat : nulle
+        slot = {s: k for k, s in enumerate(squares)}
+        children: Set[int] = set()
+        win, loss, blocked = -1, 0, False
+        for a, b, promo in moves:
+            t = b[0]*8 + b[1]
+            if promo is None and st.board[b[0]][b[1]] == '.':
+                child = list(squares)
+                child[slot[a[0]*8 + a[1]]] = t
+                children.add(layout.index(child, not black))
+                continue
+            # Prise ou promotion : la position suivante est dans une autre table
+            u = make_move(st, a, b, promo)
+            r = tables.probe(st)
+            unmake_move(st, u)
+            if r is None:
+                raise ValueError(f"{layout.name}: table manquante pour {chess_cli_v2.state_to_fen(st)} "
+                                 f"après {chess_cli_v2.move_to_alg((a, b, promo))} (générer d'abord les plus petites)")
+            if r.wdl < 0:
+                if win < 0 or r.plies + 1 < win: win = r.plies + 1
+                blocked = True
+            elif r.wdl == 0: blocked = True
+            else: loss = max(loss, r.plies + 1)
+        # Une sortie nulle ou gagnante compte comme un enfant jamais perdu : la position ne peut pas perdre
+        n = len(children) + blocked
+        counts[idx - start] = n
+        if win >= 0: pushes.append((win, idx))
+        if n == 0: pushes.append((loss, idx))       # toutes les sorties perdent
+        elif loss: exit_loss[idx] = loss
+    return start, bytes(values), bytes(counts), pushes, exit_loss
+
+def predecessors(layout: Layout, scratch: Scratch, squares: List[int], black: bool) -> Set[int]:
+    """Positions canoniques (trait à l'autre camp) dont un coup sans prise ni promotion mène ici."""
+    board = scratch.st.board
+    mover_white = black                 # le camp qui vient de jouer
+    mover = 'white' if mover_white else 'black'
+    victim = scratch.st.kings['black' if mover_white else 'white']
+    occupied = set(squares)
+    out: Set[int] = set()
+    for k, (c, white, s) in enumerate(zip(layout.letters, layout.white, squares)):
+        if white != mover_white: continue
+        p = c.upper()
+        if p == 'K': froms = [f for f in KING_STEPS[s] if f not in occupied]
+        elif p == 'N': froms = [f for f in KNIGHT_STEPS[s] if f not in occupied]
+        elif p == 'P':
+            step = 8 if white else -8              # le pion venait de la rangée d'avant
+            f1 = s + step
+            froms = []
+            if 1 <= f1 // 8 <= 6 and f1 not in occupied:
+                froms.append(f1)
+                f2 = f1 + step
+                if f2 // 8 == (6 if white else 1) and f2 not in occupied: froms.append(f2)
+        else:
+            froms = []
+            for ray in SLIDER_RAYS[p][s]:
+                for f in ray:
+                    if f in occupied: break
+                    froms.append(f)
+        sy, sx = divmod(s, 8)
+        for f in froms:
+            fy, fx = divmod(f, 8)
+            board[sy][sx] = '.'; board[fy][fx] = c
+            # Avant le coup, le camp au trait ici ne pouvait pas être en échec
+            ok = not square_attacked_by(board, victim[0], victim[1], mover)
+            board[fy][fx] = '.'; board[sy][sx] = c
+            if ok:
+                prev = list(squares)
+                prev[k] = f
+                out.add(layout.index(prev, not black))
+    return out
+
+def generate(name: str, out_dir: str, tables: Tablebases, jobs: int=1, chunk: int=1 << 15,
+             log=print) -> str:
+    """Calcule la table d'un matériel et l'écrit dans out_dir ; rend le chemin du fichier."""
+    layout = Layout(name)
+    size = layout.size
+    t0 = time.perf_counter()
+    values = bytearray([INVALID]) * size
+    counts = bytearray(size)
+    exit_loss: Dict[int, int] = {}
+    buckets: List[List[int]] = [[] for _ in range(256)]
+    spans = [(i, min(size, i + chunk)) for i in range(0, size, chunk)]
+    paths = [t.path for t in tables.tables.values()]
+    if jobs > 1:
+        with multiprocessing.Pool(jobs, initializer=_init_scan, initargs=(layout.name, paths)) as pool:
+            results = list(pool.imap_unordered(scan, spans))
+    else:
+        _init_scan(layout.name, paths, tables)
+        results = map(scan, spans)
+    for start, v, c, pushes, losses in results:
+        values[start:start + len(v)] = v
+        counts[start:start + len(c)] = c
+        for d, idx in pushes: buckets[d].append(idx)
+        exit_loss.update(losses)
+    log(f"{layout.name}: passe avant {time.perf_counter() - t0:.1f}s, "
+        f"{size - values.count(INVALID)} positions sur {size} index")
+
+    # Rétrograde par distance croissante : la première valeur posée est la plus courte
+    # pour un gain ; une perte n'est posée que quand tous les enfants sont gagnants
+    scratch = Scratch(layout)
+    resolved = 0
+    for d in range(len(buckets)):
+        todo, buckets[d] = buckets[d], []
+        for idx in todo:
+            if values[idx] != DRAW: continue
+            won = d % 2 == 1
+            values[idx] = (d + 1) // 2 if won else LOSS + d // 2
+            resolved += 1
+            squares, black = layout.decode(idx)
+            scratch.place(squares, black)
+            for q in predecessors(layout, scratch, squares, black):
+                if values[q] != DRAW: continue
+                if d + 1 >= len(buckets): raise ValueError(f"{layout.name}: mat au-delà de 127 coups")
+                if not won: buckets[d + 1].append(q)
+                else:
+                    counts[q] -= 1
+                    if counts[q] == 0: buckets[max(d + 1, exit_loss.get(q, 0))].append(q)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, layout.name + TB_SUFFIX)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(TB_HEADER.pack(TB_MAGIC, TB_VERSION, layout.name.encode("ascii"), size))
+        f.write(values)
+    os.replace(tmp, path)
+    longest = max((v for v in values if v < LOSS), default=0)
+    log(f"{layout.name}: {resolved} positions gagnées ou perdues, mat le plus long en {longest} coups, "
+        f"{time.perf_counter() - t0:.1f}s -> {path}")
+    return path
+
+def verify(table: Table, tables: Tablebases, samples: int, seed: int=1) -> int:
+    """Vérifie sur des positions tirées au hasard que chaque valeur est la meilleure de ses enfants."""
+    layout = table.layout
+    scratch = Scratch(layout)
+    st = scratch.st
+    rng = random.Random(seed)
+    errors = checked = 0
+    while checked < samples:
+        idx = rng.randrange(layout.size)
+        v = table.value(idx)
+        if v == INVALID: continue
+        squares, black = layout.decode(idx)
+        scratch.place(squares, black)
+        checked += 1
+        best: Optional[Tuple[int, int]] = None         # (wdl, -plies si gain, plies si perte)
+        moves = generate_legal_moves(st)
+        for a, b, promo in moves:
+            u = make_move(st, a, b, promo)
+            r = tables.probe(st)
+            unmake_move(st, u)
+            cand = (-r.wdl, -(r.plies + 1) if r.wdl < 0 else r.plies + 1 if r.wdl > 0 else 0)
+            if best is None or cand > best: best = cand
+        if best is None: expect = TBResult(-1, 0) if in_check(st.board, st.turn, st.kings[st.turn]) else TBResult(0, 0)
+        else: expect = TBResult(best[0], abs(best[1]))
+        if decode_value(v) != expect:
+            errors += 1
+            print(f"  {chess_cli_v2.state_to_fen(st)} : table {decode_value(v)}, attendu {expect}")
+    return errors
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="tables de finales par analyse rétrograde")
+    ap.add_argument("materials", nargs="*", help="matériels à générer (ex: KQK KRK KPK KBNK KQKR)")
+    ap.add_argument("-o", "--out", default="tables", help="répertoire des tables (défaut tables/)")
+    ap.add_argument("-d", "--dir", action="append", default=[], help="tables déjà générées (répertoire ou fichier)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="processus pour la passe avant")
+    ap.add_argument("--verify", type=int, default=0, metavar="N", help="vérifier N positions par table générée")
+    ap.add_argument("--probe", metavar="FEN", help="interroger les tables sur une position")
+    args = ap.parse_args(argv)
+    dirs = args.dir or ([args.out] if os.path.isdir(args.out) else [])
+    tables = Tablebases(dirs)
+    try:
+        # Les plus petites d'abord, pions en dernier : les prises et promotions y mènent
+        for name in sorted(args.materials, key=lambda n: (len(n), 'P' in n.upper())):
+            path = generate(name, args.out, tables, args.jobs)
+            tables.add(path)
+            if args.verify:
+                errors = verify(tables.tables[Layout(name).name], tables, args.verify)
+                print(f"{Layout(name).name}: {args.verify} positions vérifiées, {errors} erreur(s)")
+                if errors: return 1
+        if args.probe:
+            r = tables.probe(state_from_fen(args.probe))
+            if r is None: print("pas de table pour cette position")
+            elif r.wdl == 0: print("nulle")
+            else: print(f"{'gagne : mat' if r.wdl > 0 else 'perd : maté'} en {(r.plies + 1) // 2} coup(s) ({r.plies} demi-coups)")
+    except ValueError as e:
+        print("Erreur:", e, file=sys.stderr)
+        return 1
+    finally:
+        tables.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
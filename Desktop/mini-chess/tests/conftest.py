@@ -0,0 +1,5 @@
+# Les modules du jeu s'importent à plat (import chess_cli_v2, import board_array, ...)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
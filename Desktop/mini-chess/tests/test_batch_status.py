@@ -0,0 +1,32 @@
+# batch_status (NumPy) contre position_status / game_status sur le corpus fixe.
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch import parse_line
+from batch_status import batch_status, batch_game_status
+from chess_cli_v2 import game_status
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "status_corpus.epd")
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [parse_line(line) for line in f if line.strip() and not line.startswith('#')]
+
+def test_corpus_covers_every_outcome():
+    statuses = {ops["c0"] for _, ops in load_corpus()}
+    assert statuses >= {"ok", "check", "checkmate", "stalemate", "fifty"}
+
+def test_batch_status_matches_recorded_status():
+    corpus = load_corpus()
+    got = batch_status([st for st, _ in corpus])
+    mismatches = [(ops["id"], ops["c0"], g) for (_, ops), g in zip(corpus, got) if ops["c0"] != g]
+    assert mismatches == []
+
+def test_batch_game_status_matches_game_status():
+    states = [st for st, _ in load_corpus()]
+    expected = [game_status(st) for st in states]
+    for st in states: st.move_cache = None
+    assert batch_game_status(states) == expected
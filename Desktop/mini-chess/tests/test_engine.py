@@ -0,0 +1,27 @@
+from chess_cli_v2 import state_from_fen, state_to_fen
+from engine import Engine, MATE, INF
+
+MATED = "3R2k1/5ppp/8/8/8/8/qq6/6K1 b - - 0 1"          # mat du couloir, Noirs avec deux dames de plus
+
+def engine() -> Engine:
+    e = Engine(tt_bits=12)
+    e.deadline = e.node_limit = None
+    return e
+
+def test_quiesce_scores_mate_when_in_check():
+    st = state_from_fen(MATED)
+    assert engine().quiesce(st, -INF, INF, 1) == -MATE + 1
+
+def test_quiesce_searches_quiet_evasions():
+    # Échec du cavalier : aucune prise possible, le roi doit fuir ; pas d'évaluation statique
+    st = state_from_fen("4k3/8/3N4/8/8/8/8/4K3 b - - 0 1")
+    e = engine()
+    e.quiesce(st, -INF, INF, 1)
+    assert e.nodes > 1
+    assert state_to_fen(st) == "4k3/8/3N4/8/8/8/8/4K3 b - - 0 1"
+
+def test_search_finds_back_rank_mate():
+    st = state_from_fen("6k1/5ppp/8/8/8/8/qq6/3R2K1 w - - 0 1")
+    r = Engine(tt_bits=12).search(st, None, max_depth=2)
+    assert r.score == MATE - 1
+    assert r.move == ((7, 3), (0, 3), None)
@@ -0,0 +1,54 @@
+import pytest
+
+from chess_cli_v2 import State, state_from_fen, state_to_fen, state_from_epd, zobrist_hash, check_consistency, perft
+from bench_perft import POSITIONS
+
+@pytest.mark.parametrize("fen", [fen for _, fen, _ in POSITIONS] + [
+    "rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 3",
+    "4k3/8/8/8/8/8/8/4K3 w - - 99 120",
+])
+def test_fen_round_trip(fen):
+    st = state_from_fen(fen)
+    assert state_to_fen(st) == fen
+    assert st.hash == zobrist_hash(st)
+    assert check_consistency(st) == []
+
+def test_start_position():
+    assert state_to_fen(State()) == "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+def test_epd_operations_and_counters():
+    st, ops = state_from_epd('4k3/8/8/8/8/8/8/4K3 w - - hmvc 12; fmvn 40; id "finale nue";')
+    assert ops["id"] == "finale nue"
+    assert (st.halfmove_clock, st.fullmove_number) == (12, 40)
+
+@pytest.mark.parametrize("fen", [
+    "8/8/8/8/8/8/8/8 w - - 0 1",                                        # pas de roi
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",         # trait
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w KQkq - 0 1",          # rangée courte
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",                  # 7 rangées
+    "4k3/8/8/8/8/8/4R3/4K3 w - - 0 1",                                  # roi noir en prise
+    "4k3/8/8/8/8/8/4r3/4K3 b - - 0 1",                                  # roi blanc en prise
+])
+def test_invalid_fen(fen):
+    with pytest.raises(ValueError):
+        state_from_fen(fen)
+
+@pytest.mark.parametrize("fen,ep", [
+    ("4k3/8/8/3P4/8/8/8/4K3 w - e6 0 1", None),                 # aucun pion noir devant e6
+    ("4k3/8/8/3Pp3/8/8/8/4K3 w - e3 0 1", None),                # mauvaise rangée pour le trait
+    ("4k3/4p3/8/3Pp3/8/8/8/4K3 w - e6 0 1", None),              # e7 occupée : pas de double pas
+    ("4k3/8/4n3/3Pp3/8/8/8/4K3 w - e6 0 1", None),              # e6 occupée
+    ("4k3/8/8/3Pp3/8/8/8/4K3 w - e6 0 1", (2, 4)),
+    ("4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1", (5, 4)),
+])
+def test_fen_en_passant_square_is_validated(fen, ep):
+    st = state_from_fen(fen)
+    assert st.en_passant == ep
+    assert st.hash == zobrist_hash(st)
+    # La génération de coups ne doit pas tomber sur une case en passant impossible
+    assert perft(st, 2) > 0
+
+def test_batch_reports_king_in_prise_as_error():
+    from batch import analyse_chunk
+    out, errors, _ = analyse_chunk((1, ["4k3/8/8/8/8/8/4R3/4K3 w - - 0 1\n", "4k3/8/8/8/8/8/4R3/4K3 b - - 0 1\n"], 2))
+    assert errors == 1 and '"error"' in out[0] and '"perft"' in out[1]
@@ -0,0 +1,45 @@
+import sys
+import threading
+import types
+
+import pytest
+
+import chess_cli_v2
+import engine
+import instrument
+from chess_cli_v2 import State, generate_legal_moves
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+def test_counts_are_exact_across_threads(enabled):
+    st = State()
+    def work():
+        for _ in range(500): chess_cli_v2.generate_legal_moves(st)
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    calls, _, items = instrument.totals()["generate_legal_moves"]
+    assert calls == 2000
+    assert items == 2000 * 20
+    assert instrument.snapshot()["functions"]["generate_legal_moves"]["calls"] == 2000
+
+def test_rebinds_project_modules_only():
+    foreign = types.ModuleType("module_tiers")
+    foreign.in_check = chess_cli_v2.in_check
+    sys.modules["module_tiers"] = foreign
+    try:
+        instrument.enable()
+        assert engine.in_check is chess_cli_v2.in_check
+        assert engine.in_check.__wrapped__ is foreign.in_check
+        assert not hasattr(foreign.in_check, "__wrapped__")
+    finally:
+        instrument.disable()
+        del sys.modules["module_tiers"]
+    assert engine.in_check is foreign.in_check
+    assert chess_cli_v2.generate_legal_moves is generate_legal_moves
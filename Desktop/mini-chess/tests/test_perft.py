@@ -0,0 +1,26 @@
+# Nombres de noeuds perft de référence, sur les trois plateaux (liste, 10x12, bitboards).
+import pytest
+
+import chess_cli_v2
+from bench_perft import POSITIONS, BACKENDS
+
+MAX_NODES = 100000      # profondeur la plus grande sous ce nombre de noeuds : suite rapide
+
+def cases():
+    for name, fen, expected in POSITIONS:
+        depth = max(d for d, n in enumerate(expected, 1) if d == 1 or n <= MAX_NODES)
+        yield name, fen, depth, expected[depth - 1]
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("name,fen,depth,nodes", list(cases()))
+def test_perft(backend, name, fen, depth, nodes):
+    load, perft, divide = BACKENDS[backend]
+    assert perft(load(fen), depth) == nodes
+    assert sum(divide(load(fen), depth).values()) == nodes
+
+@pytest.mark.parametrize("name,fen,depth,nodes", list(cases()))
+def test_mask_agrees_with_simulate(monkeypatch, name, fen, depth, nodes):
+    st = chess_cli_v2.state_from_fen(fen)
+    masked = chess_cli_v2.divide(st, depth)
+    monkeypatch.setattr(chess_cli_v2, "LEGALITY", "simulate")
+    assert chess_cli_v2.divide(st, depth) == masked
@@ -0,0 +1,96 @@
+# Sauvegardes binaire et JSON, journal ajouté coup par coup.
+import pytest
+
+from chess_cli_v2 import (
+    State, Journal, apply_move, register_position, save_state, load_state, read_journal, state_to_fen,
+    algebraic_to_idx, repetition_count, position_status, default_load_path, SAVE_MAGIC,
+)
+
+MOVES = "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7".split()
+
+def play(moves, journal=None):
+    st = State(); register_position(st)
+    if journal is None: journal = Journal(st)
+    for mv in moves:
+        a, b = algebraic_to_idx(mv)
+        assert apply_move(st, a, b)
+        journal.record(st, (a, b, None))
+    return st, journal
+
+@pytest.mark.parametrize("name", ["partie.mcs", "partie.json"])
+def test_save_load_round_trip(tmp_path, name):
+    st, journal = play(MOVES)
+    path = str(tmp_path / name)
+    save_state(st, path, journal)
+    loaded = load_state(path)
+    assert state_to_fen(loaded) == state_to_fen(st)
+    assert loaded.hash == st.hash
+
+def test_binary_save_is_snapshot_plus_moves(tmp_path):
+    st, journal = play(MOVES)
+    path = str(tmp_path / "partie.mcs")
+    save_state(st, path, journal)
+    data = open(path, "rb").read()
+    assert data.startswith(SAVE_MAGIC)
+    # dernier coup irréversible : a7a6 (pion) ; 4 coups de 2 octets depuis
+    assert len(read_journal(path).moves) == 4
+
+def test_journal_appends_each_move(tmp_path):
+    path = str(tmp_path / "journal.mcs")
+    st = State(); register_position(st)
+    journal = Journal(st)
+    journal.open(path, sync=False)
+    play(MOVES, journal)
+    journal.close()
+    assert state_to_fen(load_state(path)) == state_to_fen(play(MOVES)[0])
+
+def test_truncated_journal_ignores_partial_record(tmp_path):
+    path = str(tmp_path / "journal.mcs")
+    st, journal = play(MOVES)
+    journal.write(path)
+    with open(path, "ab") as f: f.write(b"\x0c")     # coup à moitié écrit (arrêt brutal)
+    assert state_to_fen(load_state(path)) == state_to_fen(st)
+
+# Aller-retour d'un cavalier : la position initiale revient, sans coup irréversible
+SHUFFLE = "g1f3 g8f6 f3g1 f6g8 g1f3 g8f6 f3g1 f6g8".split()
+
+@pytest.mark.parametrize("name", ["partie.mcs", "partie.json"])
+@pytest.mark.parametrize("with_journal", [True, False])
+def test_save_keeps_repetition_history(tmp_path, name, with_journal):
+    st, journal = play(SHUFFLE[:4])
+    assert repetition_count(st) == 2
+    path = str(tmp_path / name)
+    save_state(st, path, journal if with_journal else None)
+    loaded = load_state(path)
+    assert repetition_count(loaded) == 2
+    # La troisième occurrence après rechargement est bien une nulle
+    for mv in SHUFFLE[4:]:
+        a, b = algebraic_to_idx(mv)
+        apply_move(loaded, a, b)
+    assert position_status(loaded) == "repetition"
+
+def test_history_survives_fen_and_json_reload(tmp_path):
+    # Position reprise d'une sauvegarde JSON puis enregistrée en binaire par un nouveau journal
+    st, _ = play(SHUFFLE[:4])
+    save_state(st, str(tmp_path / "partie.json"))
+    loaded = load_state(str(tmp_path / "partie.json"))
+    journal = Journal(loaded)
+    journal.write(str(tmp_path / "partie.mcs"))
+    assert repetition_count(load_state(str(tmp_path / "partie.mcs"))) == 2
+
+def test_array_backend_save_keeps_history(tmp_path):
+    import board_array
+    st, _ = play(SHUFFLE[:4])
+    path = str(tmp_path / "partie.mcs")
+    board_array.save_state(board_array.from_state(st), path)
+    assert repetition_count(load_state(path)) == 2
+
+def test_default_load_falls_back_to_old_json_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert default_load_path() == "game.mcs"
+    st, _ = play(MOVES[:4])
+    save_state(st, "game.json")
+    assert default_load_path() == "game.json"
+    assert state_to_fen(load_state(default_load_path())) == state_to_fen(st)
+    save_state(st, "game.mcs")
+    assert default_load_path() == "game.mcs"
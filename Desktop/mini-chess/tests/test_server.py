@@ -0,0 +1,38 @@
+# Requêtes du serveur sans socket : Server.handle directement, exécuteurs réels.
+import asyncio
+import threading
+
+import pytest
+
+import server
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_move_runs_off_the_event_loop(monkeypatch):
+    seen = []
+    play = server.Game.play
+    def spy(self, m):
+        seen.append(threading.current_thread() is threading.main_thread())
+        play(self, m)
+    monkeypatch.setattr(server.Game, "play", spy)
+    async def session():
+        s = server.Server(threads=2, workers=0)
+        owned: set = set()
+        g = (await s.handle({"op": "new"}, owned))["game"]
+        r = await s.handle({"op": "move", "game": g, "move": "e2e4"}, owned)
+        with pytest.raises(server.ProtocolError):
+            await s.handle({"op": "move", "game": g, "move": "e2e5"}, owned)
+        data = (await s.handle({"op": "save", "game": g}, owned))["data"]
+        loaded = await s.handle({"op": "load", "data": data}, owned)
+        return r, loaded
+    r, loaded = run(session())
+    assert seen == [False]
+    assert r["turn"] == "black" and loaded["fen"] == r["fen"]
+
+def test_new_rejects_invalid_fen():
+    async def session():
+        s = server.Server(threads=1, workers=0)
+        await s.handle({"op": "new", "fen": "4k3/8/8/8/8/8/4R3/4K3 w - - 0 1"}, set())
+    with pytest.raises(server.ProtocolError):
+        run(session())
@@ -0,0 +1,51 @@
+# Tables de finales : KQK générée dans un répertoire temporaire, vérifiée et sondée.
+import random
+
+import pytest
+
+import tablebase
+from chess_cli_v2 import state_from_fen
+
+@pytest.fixture(scope="module")
+def kqk(tmp_path_factory):
+    tables = tablebase.Tablebases()
+    path = tablebase.generate("KQK", str(tmp_path_factory.mktemp("tables")), tables, log=lambda *a: None)
+    tables.add(path)
+    yield tables
+    tables.close()
+
+def test_kqk_verifies(kqk):
+    assert tablebase.verify(kqk.tables["KQK"], kqk, 2000) == 0
+
+def test_kqk_longest_mate(kqk):
+    table = kqk.tables["KQK"]
+    values = [table.value(i) for i in range(table.layout.size)]
+    assert max(v for v in values if v < tablebase.LOSS) == 10
+    assert tablebase.decode_value(tablebase.LOSS) == (-1, 0)
+
+def flip(fen):
+    """Même position, couleurs inversées : miroir vertical, casse des pièces et trait échangés."""
+    placement, turn = fen.split()[:2]
+    return f"{'/'.join(reversed(placement.split('/'))).swapcase()} {'b' if turn == 'w' else 'w'} - - 0 1"
+
+def random_fen(rng):
+    squares = rng.sample(range(64), 3)
+    board = [['.'] * 8 for _ in range(8)]
+    for p, s in zip("KQk", squares): board[s // 8][s % 8] = p
+    rows = ["".join(r) for r in board]
+    for n in range(8, 0, -1): rows = [r.replace('.' * n, str(n)) for r in rows]
+    return f"{'/'.join(rows)} {rng.choice('wb')} - - 0 1"
+
+def test_probe_matches_colour_flip(kqk):
+    rng = random.Random(3)
+    checked = 0
+    while checked < 3000:
+        fen = random_fen(rng)
+        try:
+            st = state_from_fen(fen)
+        except ValueError:
+            continue            # rois adjacents ou roi en prise
+        r = kqk.probe(st)
+        assert r is not None
+        assert kqk.probe(state_from_fen(flip(fen))) == r, fen
+        checked += 1
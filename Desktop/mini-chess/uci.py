@@ -0,0 +1,209 @@
+# uci.py — protocole UCI, pour brancher le moteur sur une interface graphique ou un gestionnaire
+# de tournois (Arena, Cute Chess, cutechess-cli, ...) au lieu de l'invite du jeu.
+# Commandes : uci, isready, ucinewgame, setoption, position startpos|fen ... [moves ...],
+# go (depth, nodes, movetime, wtime/btime, winc/binc, movestogo, infinite), stop, quit.
+# La recherche tourne dans un thread : la boucle de lecture reste libre et stop est pris en
+# compte au prochain contrôle de Engine (tous les 256 noeuds, quelques millisecondes).
+# Un seul Engine pour toute la session : la table de transposition survit d'une position à
+# l'autre (vidée par ucinewgame). Quand une commande position prolonge la précédente
+# (mêmes départ et premiers coups), seuls les nouveaux coups sont joués.
+#   python chess_cli_v2.py --uci
+#   python uci.py --tablebases tables/
+import sys
+import threading
+from typing import List, Optional, Dict, TextIO
+
+from chess_cli_v2 import (
+    State, Move, apply_move, register_position, generate_legal_moves, move_to_alg, state_from_fen,
+)
+from engine import Engine, SearchResult, MATE, MATE_BOUND
+
+NAME = "mini-chess"
+START = "startpos"
+MOVE_OVERHEAD_MS = 30       # marge pour la lecture/écriture des commandes et le délai de l'interface
+
+def uci_score(score: int) -> str:
+    if score >= MATE_BOUND: return f"mate {(MATE - score + 1)//2}"
+    if score <= -MATE_BOUND: return f"mate -{(MATE + score + 1)//2}"
+    return f"cp {score}"
+
+def format_info(r: SearchResult) -> str:
+    line = (f"info depth {r.depth} score {uci_score(r.score)} nodes {r.nodes} nps {r.nps:.0f} "
+            f"time {int(r.seconds * 1000)}")
+    return line + (" pv " + " ".join(move_to_alg(m) for m in r.pv) if r.pv else "")
+
+def parse_go(tokens: List[str]) -> Dict[str, int]:
+    """Paramètres de go : entiers par nom, infinite=1 s'il est présent."""
+    params: Dict[str, int] = {}
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if name == "infinite":
+            params[name] = 1; i += 1
+        elif i + 1 < len(tokens) and tokens[i+1].lstrip('-').isdigit():
+            params[name] = int(tokens[i+1]); i += 2
+        else:
+            i += 1
+    return params
+
+def time_budget(params: Dict[str, int], white: bool) -> Optional[int]:
+    """Budget en ms : movetime, sinon une part du temps restant plus l'essentiel de l'incrément."""
+    if "infinite" in params: return None
+    if "movetime" in params: return max(1, params["movetime"] - MOVE_OVERHEAD_MS)
+    left = params.get("wtime" if white else "btime")
+    if left is None: return None if ("depth" in params or "nodes" in params) else 1000
+    inc = params.get("winc" if white else "binc", 0)
+    budget = left // max(1, min(params.get("movestogo", 30), 30)) + inc * 3 // 4
+    return max(1, min(budget, left // 2) - MOVE_OVERHEAD_MS) if left > 2 * MOVE_OVERHEAD_MS else 1
+
+class UciSession:
+    def __init__(self, out: TextIO=sys.stdout, tt_bits: int=18):
+        self.out = out
+        self.out_lock = threading.Lock()
+        self.engine = Engine(tt_bits)
+        self.base = START
+        self.moves: List[str] = []
+        self.st = State(); register_position(self.st)
+        self.thread: Optional[threading.Thread] = None
+        self.release = threading.Event()    # go infinite : bestmove seulement après stop
+
+    def send(self, line: str):
+        with self.out_lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    # --- position ---
+    def set_position(self, base: str, moves: List[str]):
+        if base != self.base or moves[:len(self.moves)] != self.moves:
+            try:
+                st = state_from_fen(base) if base != START else State()
+            except ValueError as e:
+                self.send(f"info string {e}")
+                return
+            if base == START: register_position(st)
+            self.base, self.moves, self.st = base, [], st
+        for token in moves[len(self.moves):]:
+            m = self.parse_move(token)
+            if m is None:
+                self.send(f"info string coup illégal ignoré : {token}")
+                break
+            apply_move(self.st, m[0], m[1], promotion_choice=m[2])
+            self.moves.append(token)
+
+    def parse_move(self, token: str) -> Optional[Move]:
+        for m in generate_legal_moves(self.st):
+            if move_to_alg(m) == token: return m
+        return None
+
+    # --- recherche ---
+    def go(self, params: Dict[str, int]):
+        self.wait()
+        self.release.clear()
+        infinite = "infinite" in params
+        time_ms = None if infinite else time_budget(params, self.st.turn == 'white')
+        depth, nodes = params.get("depth", 64), params.get("nodes")
+        st = self.st.clone()    # la position de la session reste libre pendant la recherche
+        self.thread = threading.Thread(target=self._search, args=(st, time_ms, depth, nodes, infinite), daemon=True)
+        self.thread.start()
+
+    def _search(self, st: State, time_ms: Optional[int], depth: int, nodes: Optional[int], infinite: bool):
+        r = self.engine.search(st, time_ms, depth, nodes, on_info=lambda r: self.send(format_info(r)))
+        # En mode infinite, l'interface attend bestmove seulement après son stop
+        if infinite: self.release.wait()
+        if r.move is None:
+            self.send("bestmove 0000")
+        else:
+            self.send(f"bestmove {move_to_alg(r.move)}" + (f" ponder {move_to_alg(r.pv[1])}" if len(r.pv) > 1 else ""))
+
+    def stop(self):
+        # search() remet le drapeau d'arrêt à zéro en démarrant : le redemander jusqu'à la fin
+        # du thread couvre un stop arrivé juste après go
+        if self.thread is not None:
+            self.release.set()
+            while self.thread.is_alive():
+                self.engine.stop()
+                self.thread.join(0.001)
+            self.thread = None
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # --- commandes ---
+    def handle(self, line: str) -> bool:
+        """Traite une commande ; False pour quit."""
+        tokens = line.split()
+        if not tokens: return True
+        cmd, args = tokens[0], tokens[1:]
+        if cmd == "uci":
+            self.send(f"id name {NAME}")
+            self.send("id author mini-chess")
+            self.send("option name Tablebases type string default <empty>")
+            self.send("uciok")
+        elif cmd == "isready":
+            self.send("readyok")
+        elif cmd == "ucinewgame":
+            self.stop()
+            self.engine.clear()
+        elif cmd == "setoption":
+            self.stop()
+            self.set_option(args)
+        elif cmd == "position":
+            self.stop()
+            if "moves" in args:
+                k = args.index("moves")
+                head, moves = args[:k], args[k+1:]
+            else:
+                head, moves = args, []
+            if head[:1] == ["startpos"]: base = START
+            elif head[:1] == ["fen"]: base = " ".join(head[1:])
+            else:
+                self.send(f"info string position invalide : {line}")
+                return True
+            self.set_position(base, moves)
+        elif cmd == "go":
+            self.go(parse_go(args))
+        elif cmd == "stop":
+            self.stop()
+        elif cmd == "quit":
+            self.stop()
+            return False
+        elif cmd not in ("debug", "register"):
+            self.send(f"info string commande inconnue : {cmd}")
+        return True
+
+    def set_option(self, args: List[str]):
+        # setoption name <nom> [value <valeur>]
+        text = " ".join(args)
+        name, _, value = text.partition(" value ")
+        name = name.replace("name", "", 1).strip().lower()
+        if name == "tablebases":
+            import tablebase
+            tablebase.use([value.strip()] if value.strip() not in ("", "<empty>") else None)
+        else:
+            self.send(f"info string option inconnue : {name}")
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="moteur en protocole UCI (entrée/sortie standard)")
+    ap.add_argument("--tt-bits", type=int, default=18, help="table de transposition : 2^N entrées")
+    ap.add_argument("--tablebases", metavar="DOSSIER", help="tables de finales (tablebase.py)")
+    args = ap.parse_args(argv)
+    if args.tablebases:
+        import tablebase
+        tablebase.use([args.tablebases])
+    # Le thread de recherche garde le GIL jusqu'à 5 ms par défaut : 1 ms pour lire stop plus tôt
+    sys.setswitchinterval(0.001)
+    session = UciSession(sys.stdout, args.tt_bits)
+    # readline plutôt que l'itération sur stdin : chaque commande est traitée dès son arrivée
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            session.stop()
+            break
+        if not session.handle(line): break
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())